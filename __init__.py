@@ -14,6 +14,8 @@ from .locale.i18n import _
 from .tools import auto_register
 from .tools import aca_logging
 from .tools import smart_delete
+from .tools import aca_index
+from .tools import rebuild_scheduler
 
 # Blender配置元数据，用户安装插件时的设置项
 # https://developer.blender.org/docs/handbook/addons/addon_meta_info/
@@ -98,10 +100,22 @@ def register():
     ##############################################
     # 5、注册智能删除模块（包括键位映射）
     smart_delete.register()
+
+    # 260501 注册场景索引的撤销、重做回调
+    aca_index.register()
+
+    # 260501 注册自动重建调度的撤销、重做回调
+    rebuild_scheduler.register()
     
     return
     
 def unregister():
+    # 注销自动重建调度，丢弃排队中的重建
+    rebuild_scheduler.unregister()
+
+    # 注销场景索引的回调
+    aca_index.unregister()
+
     # 注销智能删除模块（包括键位映射）
     smart_delete.unregister()
     
@@ -4,6 +4,7 @@
 #   营造的主入口
 #   判断是建造一个新的单体建筑，还是院墙等附加建筑
 import time
+import hashlib
 from .locale.i18n import _
 import bpy
 import bmesh
@@ -16,7 +17,8 @@ from . import buildFloor
 from .buildOther import buildYardWall
 from . import buildRoof
 from .postproc import buildingCombo
-from .tools.boundbox import update_boundbox
+from .tools.boundbox import fitBuildingBoundBox
+from .tools.prop_layers import PROP_LAYERS
 from .postproc import buildingJoin
 
 # 全局参数 -----------------
@@ -29,20 +31,167 @@ progress = 0
 # 集合的排除属性备份
 collExclude = {}
 
+# 260501 分层重建 -----------------
+# 修改单个参数时，仅重建受影响的图层，而不是全部删除重建
+# 属性与图层的依赖关系PROP_LAYERS由tools/prop_deps.py生成
+# 未登记的属性，或值为None的属性，均按整体重建处理
+# 不参与比较的标识类属性
+__PROP_IGNORE = ('aca_id','aca_obj','aca_type','splice_id','template_name')
+# 图层间的耦合：重建该图层时，必须同时重建的图层
+# 瓦作层依赖椽望层的大连檐、翼角定位线等辅助对象，暂时无法解耦
+LAYER_COUPLE = {
+    con.LAYER_TILE: (con.LAYER_RAFTER,),
+    con.LAYER_RAFTER: (con.LAYER_TILE,),
+}
+# 各建筑最近一次营造时的参数快照
+layerSnapshot = {}
+
+# 获取属性值的快照，集合属性展开为元组
+def __getPropValue(value):
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    if isinstance(value, bpy.types.PropertyGroup):
+        return tuple(__getPropValue(getattr(value, prop.identifier))
+                     for prop in value.bl_rna.properties
+                     if prop.identifier not in ('rna_type','name'))
+    if isinstance(value, (str,int,float,bool)) or value is None:
+        return value
+    # 数组、集合
+    try:
+        return tuple(__getPropValue(item) for item in value)
+    except TypeError:
+        return str(value)
+
+# 获取建筑参数的快照
+def getPropSnapshot(buildingObj:bpy.types.Object):
+    bData:acaData = buildingObj.ACA_data
+    snapshot = {}
+    for prop in bData.bl_rna.properties:
+        key = prop.identifier
+        if key in ('rna_type','name') or key in __PROP_IGNORE:
+            continue
+        snapshot[key] = __getPropValue(getattr(bData, key))
+    return snapshot
+
+# 记录建筑参数的快照，在营造完成后调用
+def saveLayerSnapshot(buildingObj:bpy.types.Object):
+    layerSnapshot[buildingObj.name] = (
+        bpy.data.filepath, getPropSnapshot(buildingObj))
+    return
+
+# 比较参数快照，返回需要重建的图层
+# 返回None时，需要整体重建
+def getDirtyLayers(buildingObj:bpy.types.Object):
+    record = layerSnapshot.get(buildingObj.name)
+    # 没有快照（如新打开的文件），整体重建
+    if record is None or record[0] != bpy.data.filepath:
+        return None
+    snapshot = record[1]
+    bData:acaData = buildingObj.ACA_data
+
+    layers = set()
+    for key,value in snapshot.items():
+        if __getPropValue(getattr(bData, key)) == value:
+            continue
+        # 未登记依赖的属性，整体重建
+        if PROP_LAYERS.get(key) is None:
+            return None
+        layers.update(PROP_LAYERS[key])
+
+    # 参数无变化（如用户直接点击“更新建筑”），整体重建
+    if not layers:
+        return None
+
+    # 处理图层耦合
+    for layer in list(layers):
+        layers.update(LAYER_COUPLE.get(layer, ()))
+    return layers
+
+# 260501 计算图层的参数指纹，用于图层缓存
+# 包含所有可能影响该图层的属性：仅排除已推导、且该图层（及其耦合图层）
+# 营造时都不读取的属性；未推导出依赖的属性一律计入
+# 同时计入资产库的标识，资产库修改后缓存失效
+# 使用sha1而非hash()，以便跨会话的磁盘缓存复用
+# skipLists：跳过集合属性，如墙体的wall_list等，用于单个构件的指纹
+def getLayerFingerprint(buildingObj:bpy.types.Object,
+                        layer:str,
+                        skipLists=False):
+    bData:acaData = buildingObj.ACA_data
+    readLayers = (layer,) + LAYER_COUPLE.get(layer, ())
+    keyParts = [bData.template_name, template.getAssetLibIdentity()]
+    for prop in bData.bl_rna.properties:
+        key = prop.identifier
+        if key in ('rna_type','name') or key in __PROP_IGNORE:
+            continue
+        if skipLists and prop.type == 'COLLECTION':
+            continue
+        layers = PROP_LAYERS.get(key)
+        if (layers is not None
+                and not any(l in layers for l in readLayers)):
+            continue
+        keyParts.append((key,__getPropValue(getattr(bData, key))))
+    return hashlib.sha1(
+        repr(tuple(keyParts)).encode('utf-8')).hexdigest()
+
+# 260501 计算隔断构件的样式指纹，用于门窗、栏杆的磁盘缓存
+# 包含所属建筑的装修层参数（斗口、柱径、柱高等），隔断上的个性化设置，
+# 及其在列表中的子数据（不含id），以及是否倒角的设置
+def getWallFingerprint(wallProxy:bpy.types.Object):
+    wallID = wallProxy.ACA_data['wallID']
+    wallType = wallID.split('#')[0]
+    # 隔断代理只保存了类型和编号，构件尺寸取决于所属建筑的参数
+    buildingObj,bData,oData = utils.getRoot(wallProxy)
+    addon_main_name = __name__.split('.')[0]
+    addon_prefs = bpy.context.preferences.addons[addon_main_name].preferences
+    keyParts = [getLayerFingerprint(
+                    buildingObj, con.LAYER_WALL, skipLists=True),
+                getLayerFingerprint(
+                    wallProxy, con.LAYER_WALL, skipLists=True),
+                addon_prefs.use_bevel]
+    childData = utils.getDataChild(
+        contextObj=wallProxy,
+        obj_type=wallType,
+        obj_id=wallID
+    )
+    if childData is not None:
+        for prop in childData.bl_rna.properties:
+            key = prop.identifier
+            if key in ('rna_type','name','id'):
+                continue
+            keyParts.append((key,__getPropValue(getattr(childData, key))))
+    return hashlib.sha1(
+        repr(tuple(keyParts)).encode('utf-8')).hexdigest()
+
+# 260501 overrides为覆盖模板的参数字典，用于批量生成参数变体
 def buildSingle(acaType,
                   templateName,
-                  comboObj = None):
+                  comboObj = None,
+                  overrides:dict = None):
+    return utils.runAllSteps(iterBuildSingle(
+        acaType,
+        templateName,
+        comboObj = comboObj,
+        overrides = overrides,
+    ))
+
+# 260501 分步营造单体建筑
+def iterBuildSingle(acaType,
+                  templateName,
+                  comboObj = None,
+                  overrides:dict = None):
     # 根据模板类型调用不同的入口
     if acaType == con.ACA_TYPE_BUILDING:
-        buildFloor.buildFloor(
+        yield from buildFloor.iterBuildFloor(
             buildingObj = None,
             templateName = templateName,
             comboObj = comboObj,
+            overrides = overrides,
         )
     elif acaType == con.ACA_TYPE_YARDWALL:
         buildYardWall.buildYardWall(
             buildingObj = None,
-            templateName = templateName
+            templateName = templateName,
+            overrides = overrides,
         )
     else:
         utils.popMessageBox(_("无法创建该类型的建筑：") 
@@ -138,11 +287,20 @@ def __excludeOther(isExclude=True,
                             continue
                 utils.hideCollection(coll.name,isExclude=isExclude)
 
-    utils.redrawViewport() # 刷新视图
+    utils.requestRedraw(force=True) # 刷新视图
     return
 
 # 开始新的营造
-def build(templateName=None):
+# 260501 overrides为覆盖模板的参数字典，如批量生成时的参数变体
+def build(templateName=None,
+          overrides:dict=None):
+    return utils.runAllSteps(
+        iterBuild(templateName,overrides=overrides))
+
+# 260501 分步营造新建筑，每完成一个图层yield一次，供模态操作逐步推进
+# 中途取消时，生成器关闭，仍会关闭进度条、恢复其他建筑的显示
+def iterBuild(templateName=None,
+          overrides:dict=None):
     # 250311 发现在中文版中UV贴图异常
     # 最终发现是该选项会导致生成的'UVMap'变成'UV贴图'
     # 禁用语言-翻译-新建数据
@@ -166,29 +324,39 @@ def build(templateName=None):
     # 暂时排除目录下的其他建筑，以加快执行速度
     __excludeOther()
 
-    if acaType != con.ACA_TYPE_COMBO:
-        # 单体建筑
-        buildSingle(
-            acaType = acaType,
-            templateName = templateName
-        )
-    else:
-        # 组合建筑
-        buildingCombo.buildCombo(templateName)
-    
-    # 关闭进度条
-    isFinished = True
-    # 取消排除目录下的其他建筑
-    __excludeOther(isExclude=False)
+    try:
+        if acaType != con.ACA_TYPE_COMBO:
+            # 单体建筑
+            yield from iterBuildSingle(
+                acaType = acaType,
+                templateName = templateName,
+                overrides = overrides,
+            )
+        else:
+            # 组合建筑
+            yield from buildingCombo.iterBuildCombo(
+                templateName,
+                overrides = overrides)
+    finally:
+        # 关闭进度条
+        isFinished = True
+        # 取消排除目录下的其他建筑
+        __excludeOther(isExclude=False)
 
     # 关闭视角自动锁定
     scnData['is_auto_viewall'] = False
 
     return {'FINISHED'}
 
-@update_boundbox
 def updateBuilding(buildingObj:bpy.types.Object,
                    reloadAssets = False):
+    return utils.runAllSteps(
+        iterUpdateBuilding(buildingObj,reloadAssets=reloadAssets))
+
+# 260501 分步更新建筑，每完成一个图层yield一次，供模态操作逐步推进
+# 包裹框由各单体的营造函数更新，院墙在此更新
+def iterUpdateBuilding(buildingObj:bpy.types.Object,
+                   reloadAssets = False):
     validate =  __validate(buildingObj)
     if validate is not None:
         utils.popMessageBox(validate)
@@ -206,38 +374,45 @@ def updateBuilding(buildingObj:bpy.types.Object,
     # 暂时排除目录下的其他建筑，以加快执行速度
     __excludeOther(keepObj=buildingObj)
 
-    # 根据模板类型调用不同的入口
-    # 查找是否存在comboRoot
-    comboObj = utils.getComboRoot(buildingObj)
-    # 组合建筑
-    if comboObj is not None:
-        buildingCombo.updateCombo(buildingObj,
-                    reloadAssets=reloadAssets)
-    # 单体建筑
-    else:
-        # 载入数据
-        bData:acaData = buildingObj.ACA_data
-        if bData.aca_type == con.ACA_TYPE_BUILDING:
-            buildFloor.buildFloor(buildingObj,
-                        reloadAssets=reloadAssets)
-        # 围墙
-        elif bData.aca_type == con.ACA_TYPE_YARDWALL:
-            buildYardWall.buildYardWall(buildingObj,
+    try:
+        # 根据模板类型调用不同的入口
+        # 查找是否存在comboRoot
+        comboObj = utils.getComboRoot(buildingObj)
+        # 组合建筑
+        if comboObj is not None:
+            yield from buildingCombo.iterUpdateCombo(buildingObj,
                         reloadAssets=reloadAssets)
+        # 单体建筑
         else:
-            utils.popMessageBox(_("无法创建该类型的建筑,%s") % (bData.aca_type))
-        
-        # 聚焦台基
-        focusObj = utils.getAcaChild(
-            buildingObj,con.ACA_TYPE_PLATFORM)
-        if focusObj is not None:
-            utils.focusObj(focusObj)
-
-    # 关闭进度条
-    isFinished = True
-    # 取消排除目录下的其他建筑
-    __excludeOther(isExclude=False,
-                   keepObj=buildingObj)
+            # 载入数据
+            bData:acaData = buildingObj.ACA_data
+            if bData.aca_type == con.ACA_TYPE_BUILDING:
+                # 260501 仅重建受参数修改影响的图层
+                layers = None
+                if not reloadAssets:
+                    layers = getDirtyLayers(buildingObj)
+                yield from buildFloor.iterBuildFloor(buildingObj,
+                            reloadAssets=reloadAssets,
+                            layers=layers)
+            # 围墙
+            elif bData.aca_type == con.ACA_TYPE_YARDWALL:
+                buildYardWall.buildYardWall(buildingObj,
+                            reloadAssets=reloadAssets)
+                fitBuildingBoundBox(buildingObj)
+            else:
+                utils.popMessageBox(_("无法创建该类型的建筑,%s") % (bData.aca_type))
+            
+            # 聚焦台基
+            focusObj = utils.getAcaChild(
+                buildingObj,con.ACA_TYPE_PLATFORM)
+            if focusObj is not None:
+                utils.focusObj(focusObj)
+    finally:
+        # 关闭进度条
+        isFinished = True
+        # 取消排除目录下的其他建筑
+        __excludeOther(isExclude=False,
+                       keepObj=buildingObj)
 
     return {'FINISHED'}
 
@@ -295,8 +470,10 @@ def delBuilding(buildingObj:bpy.types.Object,
             delColl = buildingObj.users_collection[0]
 
     # 删除目录
+    # 260501 目录中的对象和子目录批量删除，不再依赖全量清理垃圾数据
+    utils.deleteObjects(delColl.all_objects)
     parentColl.children.unlink(delColl)
-    bpy.data.collections.remove(delColl)
+    bpy.data.batch_remove([delColl] + list(delColl.children_recursive))
     # 清理垃圾  
     utils.delOrphan()
     return {'FINISHED'}
@@ -16,6 +16,7 @@ from . import utils
 from . import buildFloor
 from . import texture as mat
 from . import buildWallCache
+from . import build
 
 def clearRailingCache():
     """
@@ -770,8 +771,11 @@ def addRailingWithCache(wallProxy:bpy.types.Object):
         wallCache = buildWallCache.getRailingCache()
     
     # 生成缓存键
+    # 260501 样式指纹，包含栏杆的个性化设置，以便磁盘缓存跨建筑复用
+    railingStyle = build.getWallFingerprint(wallProxy)
     cacheKey = wallCache.generateKey(
-        values={'length': railingLen, 'gap': railingGap, 'type': wallType},
+        values={'length': railingLen, 'gap': railingGap, 'type': wallType,
+                'style': railingStyle},
         precisions={'length': 2, 'gap': 3}
     )
 
@@ -0,0 +1,446 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   构件几何的磁盘缓存，在Blender重启、跨.blend文件时复用已生成的构件
+#   以构件类型和取整后的尺寸、样式参数为键，
+#   将对象层次的顶点、边、环、面、UV、材质保存为压缩的.npz文件
+from .locale.i18n import _
+import bpy
+import os
+import json
+import tempfile
+import hashlib
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import utils
+from .tools import aca_logging
+
+# 缓存格式版本，格式变化时递增，旧缓存自动失效
+# 插件版本、资产库修改时间也计入缓存键，升级插件或修改资产库后旧缓存自动失效
+CACHE_VERSION = 2
+# 缓存文件扩展名
+CACHE_EXT = '.npz'
+
+class DiskCachePrefsMixin:
+    """磁盘缓存配置项混入类"""
+
+    use_disk_cache: bpy.props.BoolProperty(
+        default=True,
+        name=_("启用磁盘缓存"),
+        description=_("将隔扇、栏杆、斗栱等构件保存到磁盘，在重启Blender或其他文件中复用"),
+    ) # type: ignore
+
+    disk_cache_size: bpy.props.IntProperty(
+        default=1024,
+        min=64, max=65536,
+        name=_("磁盘缓存上限(MB)"),
+        description=_("磁盘缓存的容量上限，超出后删除最久未使用的缓存文件"),
+    ) # type: ignore
+
+    def draw_disk_cache_prefs(self, layout):
+        """绘制磁盘缓存配置UI"""
+        row = layout.row()
+        row.prop(self, 'use_disk_cache')
+        row.prop(self, 'disk_cache_size')
+
+
+class DiskCache:
+    """
+    构件几何的磁盘缓存类
+
+    保存时读取对象修改器计算后的网格，仅支持网格和空对象组成的层次，
+    包含曲线等其他类型对象，或带修改器的隐藏对象时不做缓存。
+    载入时按材质名称匹配当前文件中的材质，有材质缺失时视为未命中。
+
+    使用示例:
+        diskCache = DiskCache.getInstance()
+        objects, extra = diskCache.load('railing', cacheKey)
+        if objects is None:
+            railingObj = addRailing(...)
+            diskCache.save('railing', cacheKey, [railingObj])
+    """
+
+    _instance = None
+
+    @classmethod
+    def getInstance(cls):
+        """
+        获取单例实例
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _getPrefs(self):
+        preferences = bpy.context.preferences
+        addon_main_name = __name__.split('.')[0]
+        return preferences.addons[addon_main_name].preferences
+
+    def isEnabled(self) -> bool:
+        """
+        是否启用磁盘缓存
+        """
+        return self._getPrefs().use_disk_cache
+
+    def getCacheDir(self) -> str:
+        """
+        获取缓存目录，位于插件的用户目录下
+        """
+        cacheDir = aca_logging.get_default_log_path() / "cache" / "geometry"
+        cacheDir.mkdir(parents=True, exist_ok=True)
+        return str(cacheDir)
+
+    def _getPath(self, cacheType: str, cacheKey: Tuple) -> str:
+        """
+        根据构件类型和缓存键生成文件路径
+        """
+        from . import bl_info
+        from .template import template
+        keyText = json.dumps([CACHE_VERSION,
+                              list(bl_info['version']),
+                              template.getAssetLibIdentity(),
+                              cacheType,
+                              list(cacheKey)],
+                             default=str, ensure_ascii=False)
+        digest = hashlib.sha1(keyText.encode('utf-8')).hexdigest()
+        return os.path.join(self.getCacheDir(),
+                            f"{cacheType}_{digest}{CACHE_EXT}")
+
+    def _getAcaData(self, obj: bpy.types.Object) -> Dict[str, Any]:
+        """
+        读取对象上已设置的ACA_data属性
+        """
+        acaData = {}
+        for key, value in obj.ACA_data.items():
+            if hasattr(value, 'to_dict'):
+                value = value.to_dict()
+            elif hasattr(value, 'to_list'):
+                value = value.to_list()
+            acaData[key] = value
+        return acaData
+
+    def _readMesh(self,
+                  obj: bpy.types.Object,
+                  index: int,
+                  arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """
+        读取修改器计算后的网格数据，写入arrays
+        """
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        evalObj = obj.evaluated_get(depsgraph)
+        mesh = evalObj.to_mesh()
+        try:
+            co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', co)
+            edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+            mesh.edges.foreach_get('vertices', edges)
+            loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get('vertex_index', loopVerts)
+            loopEdges = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get('edge_index', loopEdges)
+            faceStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get('loop_start', faceStarts)
+            faceTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get('loop_total', faceTotals)
+            faceMats = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get('material_index', faceMats)
+            sharpFaces = np.zeros(len(mesh.polygons), dtype=bool)
+            sharpAttr = mesh.attributes.get('sharp_face')
+            if sharpAttr is not None:
+                sharpAttr.data.foreach_get('value', sharpFaces)
+            sharpEdges = np.zeros(len(mesh.edges), dtype=bool)
+            sharpAttr = mesh.attributes.get('sharp_edge')
+            if sharpAttr is not None:
+                sharpAttr.data.foreach_get('value', sharpEdges)
+
+            prefix = f"{index}_"
+            arrays[prefix + 'co'] = co
+            arrays[prefix + 'edges'] = edges
+            arrays[prefix + 'loop_verts'] = loopVerts
+            arrays[prefix + 'loop_edges'] = loopEdges
+            arrays[prefix + 'face_starts'] = faceStarts
+            arrays[prefix + 'face_totals'] = faceTotals
+            arrays[prefix + 'face_mats'] = faceMats
+            arrays[prefix + 'sharp_faces'] = sharpFaces
+            arrays[prefix + 'sharp_edges'] = sharpEdges
+            uvNames = []
+            for uvIndex, uvLayer in enumerate(mesh.uv_layers):
+                uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+                uvLayer.data.foreach_get('uv', uv)
+                arrays[f"{prefix}uv_{uvIndex}"] = uv
+                uvNames.append(uvLayer.name)
+        finally:
+            evalObj.to_mesh_clear()
+
+        return {
+            'mesh_name': obj.data.name,
+            'materials': [slot.material.name if slot.material else ''
+                          for slot in obj.material_slots],
+            'uv_names': uvNames,
+        }
+
+    def _buildMesh(self,
+                   name: str,
+                   index: int,
+                   data,
+                   info: Dict[str, Any]) -> Optional[bpy.types.Mesh]:
+        """
+        由缓存数组创建网格，材质缺失时返回None
+        """
+        materials = []
+        for matName in info['materials']:
+            if matName == '':
+                materials.append(None)
+                continue
+            mat = bpy.data.materials.get(matName)
+            if mat is None:
+                return None
+            materials.append(mat)
+
+        prefix = f"{index}_"
+        mesh = bpy.data.meshes.new(name)
+        co = data[prefix + 'co']
+        mesh.vertices.add(len(co) // 3)
+        mesh.vertices.foreach_set('co', co)
+        edges = data[prefix + 'edges']
+        if len(edges) > 0:
+            mesh.edges.add(len(edges) // 2)
+            mesh.edges.foreach_set('vertices', edges)
+            sharpEdges = data[prefix + 'sharp_edges']
+            if np.any(sharpEdges):
+                sharpAttr = mesh.attributes.new('sharp_edge', 'BOOLEAN', 'EDGE')
+                sharpAttr.data.foreach_set('value', sharpEdges)
+        loopVerts = data[prefix + 'loop_verts']
+        if len(loopVerts) > 0:
+            mesh.loops.add(len(loopVerts))
+            mesh.loops.foreach_set('vertex_index', loopVerts)
+            mesh.loops.foreach_set('edge_index', data[prefix + 'loop_edges'])
+        faceStarts = data[prefix + 'face_starts']
+        if len(faceStarts) > 0:
+            mesh.polygons.add(len(faceStarts))
+            mesh.polygons.foreach_set('loop_start', faceStarts)
+            mesh.polygons.foreach_set('loop_total', data[prefix + 'face_totals'])
+            mesh.polygons.foreach_set('material_index', data[prefix + 'face_mats'])
+            sharpFaces = data[prefix + 'sharp_faces']
+            if np.any(sharpFaces):
+                sharpAttr = mesh.attributes.new('sharp_face', 'BOOLEAN', 'FACE')
+                sharpAttr.data.foreach_set('value', sharpFaces)
+        for uvIndex, uvName in enumerate(info['uv_names']):
+            uvLayer = mesh.uv_layers.new(name=uvName)
+            uvLayer.data.foreach_set('uv', data[f"{prefix}uv_{uvIndex}"])
+        for mat in materials:
+            mesh.materials.append(mat)
+        mesh.update()
+        return mesh
+
+    def save(self,
+             cacheType: str,
+             cacheKey: Tuple,
+             objList: List[bpy.types.Object],
+             extra: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        将对象层次保存到磁盘
+
+        参数:
+            cacheType: 构件类型，如 'railing', 'door', 'dougong'
+            cacheKey: 缓存键，应由取整后的尺寸、样式参数组成
+            objList: 根对象列表，子对象自动一并保存
+            extra: 附加信息，须可JSON序列化，载入时原样返回
+
+        返回:
+            是否保存成功
+        """
+        if not self.isEnabled():
+            return False
+
+        # 展开对象层次，父节点优先
+        flatList = []
+        for rootObj in objList:
+            stack = [rootObj]
+            while stack:
+                obj = stack.pop()
+                if obj.type not in ('MESH', 'EMPTY'):
+                    # 曲线等对象无法缓存
+                    return False
+                if len(obj.modifiers) > 0 and not obj.visible_get():
+                    # 隐藏对象不参与修改器计算，无法读取最终网格
+                    return False
+                flatList.append(obj)
+                stack.extend(obj.children)
+        indexMap = {obj: index for index, obj in enumerate(flatList)}
+
+        arrays = {}
+        meta = []
+        for index, obj in enumerate(flatList):
+            info = {
+                'name': obj.name,
+                'type': obj.type,
+                'parent': indexMap.get(obj.parent, -1),
+                'matrix_basis': [v for row in obj.matrix_basis for v in row],
+                'matrix_parent_inverse':
+                    [v for row in obj.matrix_parent_inverse for v in row],
+                'hide_viewport': obj.hide_viewport,
+                'hide_render': obj.hide_render,
+                'aca_data': self._getAcaData(obj),
+            }
+            if obj.type == 'MESH':
+                info.update(self._readMesh(obj, index, arrays))
+            else:
+                info['empty_display_type'] = obj.empty_display_type
+                info['empty_display_size'] = obj.empty_display_size
+            meta.append(info)
+
+        path = self._getPath(cacheType, cacheKey)
+        try:
+            arrays['meta'] = np.array(json.dumps({
+                'objects': meta,
+                'extra': extra or {},
+            }, ensure_ascii=False))
+            # 先写临时文件再替换，避免批量进程并发读写时读到半个文件
+            # 各进程使用独立的临时文件，同一键并发写入时互不覆盖
+            fd, tmpPath = tempfile.mkstemp(
+                suffix='.tmp', dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez_compressed(f, **arrays)
+                os.replace(tmpPath, path)
+            except BaseException:
+                try:
+                    os.remove(tmpPath)
+                except OSError:
+                    pass
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            utils.outputMsg(_("磁盘缓存写入失败: %s") % str(e))
+            return False
+
+        self._evict()
+        return True
+
+    def load(self,
+             cacheType: str,
+             cacheKey: Tuple,
+             collection: Optional[bpy.types.Collection] = None,
+             ) -> Tuple[Optional[List[bpy.types.Object]], Dict[str, Any]]:
+        """
+        从磁盘载入对象层次
+
+        参数:
+            cacheType: 构件类型
+            cacheKey: 缓存键
+            collection: 载入对象所在的目录，默认为当前目录
+
+        返回:
+            (对象列表, 附加信息)，对象按父节点优先排序，根对象没有父对象；
+            未命中时对象列表为None
+        """
+        if not self.isEnabled():
+            return None, {}
+        path = self._getPath(cacheType, cacheKey)
+        if not os.path.exists(path):
+            return None, {}
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                objects = []
+                for index, info in enumerate(meta['objects']):
+                    objData = None
+                    if info['type'] == 'MESH':
+                        objData = self._buildMesh(
+                            info['mesh_name'], index, data, info)
+                        if objData is None:
+                            # 材质缺失，放弃本次载入
+                            self._removeObjects(objects)
+                            return None, {}
+                    obj = bpy.data.objects.new(info['name'], objData)
+                    objects.append(obj)
+        except (OSError, KeyError, ValueError) as e:
+            utils.outputMsg(_("磁盘缓存读取失败: %s") % str(e))
+            return None, {}
+
+        if collection is None:
+            collection = bpy.context.collection
+        for obj, info in zip(objects, meta['objects']):
+            collection.objects.link(obj)
+            if info['parent'] >= 0:
+                obj.parent = objects[info['parent']]
+            m = info['matrix_basis']
+            obj.matrix_basis = [m[0:4], m[4:8], m[8:12], m[12:16]]
+            m = info['matrix_parent_inverse']
+            obj.matrix_parent_inverse = [m[0:4], m[4:8], m[8:12], m[12:16]]
+            obj.hide_viewport = info['hide_viewport']
+            obj.hide_render = info['hide_render']
+            if info['type'] == 'EMPTY':
+                obj.empty_display_type = info['empty_display_type']
+                obj.empty_display_size = info['empty_display_size']
+            for key, value in info['aca_data'].items():
+                obj.ACA_data[key] = value
+
+        # 更新访问时间，用于LRU淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return objects, meta['extra']
+
+    def _removeObjects(self, objects: List[bpy.types.Object]):
+        """
+        删除载入失败的对象
+        """
+        for obj in objects:
+            objData = obj.data
+            bpy.data.objects.remove(obj)
+            if isinstance(objData, bpy.types.Mesh) and objData.users == 0:
+                bpy.data.meshes.remove(objData)
+
+    def _evict(self):
+        """
+        按最近访问时间淘汰缓存文件，直到低于容量上限
+        """
+        limit = self._getPrefs().disk_cache_size * 1024 * 1024
+        cacheDir = self.getCacheDir()
+        files = []
+        totalSize = 0
+        for fileName in os.listdir(cacheDir):
+            if not fileName.endswith(CACHE_EXT):
+                continue
+            path = os.path.join(cacheDir, fileName)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            totalSize += stat.st_size
+        files.sort()
+        for mtime, size, path in files:
+            if totalSize <= limit:
+                break
+            try:
+                os.remove(path)
+                totalSize -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+        删除所有缓存文件
+        """
+        cacheDir = self.getCacheDir()
+        for fileName in os.listdir(cacheDir):
+            if fileName.endswith(CACHE_EXT):
+                try:
+                    os.remove(os.path.join(cacheDir, fileName))
+                except OSError:
+                    pass
+
+
+def getDiskCache() -> DiskCache:
+    """
+    获取磁盘缓存实例
+
+    返回:
+        磁盘缓存实例
+    """
+    return DiskCache.getInstance()
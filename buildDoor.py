@@ -13,6 +13,7 @@ from .data import ACA_data_template as tmpData
 from . import texture as mat
 from . import utils
 from . import buildWallCache
+from . import build
 
 # 构建扇心
 # 包括在槛框中嵌入的横披窗扇心
@@ -1870,12 +1871,16 @@ def buildDoorWithCache(wallProxy:bpy.types.Object):
     wallDepth = round(wallProxy.dimensions.y, 2)
     wallHeight = round(wallProxy.dimensions.z, 2)
     
+    # 260501 样式指纹，包含隔断的个性化设置，以便磁盘缓存跨建筑复用
+    wallStyle = build.getWallFingerprint(wallProxy)
+    
     cacheKey = wallCache.generateKey(
         values={
             'width': wallWidth,
             'depth': wallDepth,
             'height': wallHeight,
-            'type': wallType
+            'type': wallType,
+            'style': wallStyle,
         }
     )
     
@@ -14,6 +14,29 @@ from . import utils
 from . import buildFloor
 from . import texture as mat
 
+# 包围盒的面，顶点顺序与Object.bound_box一致
+__BOX_FACES = (
+    (0,1,2,3),(4,7,6,5),(0,4,5,1),
+    (1,5,6,2),(2,6,7,3),(3,7,4,0),
+)
+
+# 260501 草图模式下，以斗栱资产的包围盒代替斗栱
+# 包围盒对象不放入场景，在操作结束时随孤儿数据一起释放
+def __getDraftSource(dgSource:bpy.types.Object):
+    if dgSource is None or not utils.isDraftMode():
+        return dgSource
+    proxyName = dgSource.name + '.draft'
+    proxy = bpy.data.objects.get(proxyName)
+    if proxy is None:
+        mesh = bpy.data.meshes.new(proxyName)
+        mesh.from_pydata(
+            [tuple(v) for v in dgSource.bound_box],
+            [],
+            __BOX_FACES)
+        proxy = bpy.data.objects.new(proxyName, mesh)
+        utils.trackOrphan(proxy)
+    return proxy
+
 # 添加斗栱根节点
 def __addDougongRoot(buildingObj:bpy.types.Object):
     # 设置目录
@@ -392,6 +415,7 @@ def __buildPillarDG(name = None,
         if buildingObj is not None:
             if bData.roof_style == con.ROOF_BALCONY:
                 dgSource = aData.dg_balcony_pillar_source
+    dgSource = __getDraftSource(dgSource)
     
     # 复制对象
     dgPillarCopy:bpy.types.Object = utils.copySimplyObject(
@@ -466,6 +490,7 @@ def __buildDougong(dgrootObj:bpy.types.Object):
         dgSource = aData.dg_corner_source
         if bData.roof_style == con.ROOF_BALCONY:
             dgSource = aData.dg_balcony_corner_source
+        dgSource = __getDraftSource(dgSource)
 
         for n in range(len(dgCornerArray)) :
             dgCornerCopy:bpy.types.Object = utils.copyObject(
@@ -583,6 +608,8 @@ def __buildDougong(dgrootObj:bpy.types.Object):
         if bData.roof_style == con.ROOF_BALCONY:
             dgGapSource = aData.dg_balcony_fillgap_source
             dgGapAltSource = aData.dg_balcony_fillgap_alt_source
+        dgGapSource = __getDraftSource(dgGapSource)
+        dgGapAltSource = __getDraftSource(dgGapAltSource)
 
 
         # 前后坡的补间斗拱
@@ -18,7 +18,8 @@ from .template import template
 from . import buildWall
 from . import buildPlatform
 from . import buildRoof
-from .tools.boundbox import update_boundbox
+from .tools import boundbox
+from .tools import aca_timer
 
 # 添加建筑empty根节点，并绑定设计模板
 # 返回建筑empty根节点对象
@@ -1479,11 +1480,29 @@ def resetFloor(buildingObj:bpy.types.Object,
 
 # 执行营造整体过程
 # 输入buildingObj，自带设计参数集，且做为其他构件绑定的父节点
-@update_boundbox
 def buildFloor(buildingObj:bpy.types.Object,
                templateName = None,
                reloadAssets = False,
                comboObj:bpy.types.Object = None,
+               layers:set = None,
+               overrides:dict = None,
+               ):
+    return utils.runAllSteps(iterBuildFloor(
+        buildingObj,
+        templateName = templateName,
+        reloadAssets = reloadAssets,
+        comboObj = comboObj,
+        layers = layers,
+        overrides = overrides,
+    ))
+
+# 260501 分步营造，每完成一个图层yield一次，供模态操作逐步推进
+def iterBuildFloor(buildingObj:bpy.types.Object,
+               templateName = None,
+               reloadAssets = False,
+               comboObj:bpy.types.Object = None,
+               layers:set = None,
+               overrides:dict = None,
                ):
     # 定位到collection，如果没有则新建
     utils.setCollection(
@@ -1508,15 +1527,20 @@ def buildFloor(buildingObj:bpy.types.Object,
             comboObj = comboObj
             )
         # 在buldingObj上绑定模板bData和资产库aData
-        template.loadTemplate(buildingObj,templateName)
+        template.loadTemplate(buildingObj,templateName,
+                              overrides=overrides)
     else:
         # 聚焦对象集合
         # 避免因为手工排除该集合导致后续构建掉落在集合外
         buildingColl = buildingObj.users_collection[0]
         utils.focusCollection(buildingColl.name)
         utils.outputMsg(_("更新建筑..."))
-        # 简单粗暴的全部删除
-        utils.deleteHierarchy(buildingObj)
+        if layers is None:
+            # 简单粗暴的全部删除
+            utils.deleteHierarchy(buildingObj)
+        else:
+            # 260501 仅删除需要重建的图层
+            __clearLayers(buildingObj,layers)
         if reloadAssets:
             # 刷新buildingObj中绑定的资产库aData
             template.loadAssetByBuilding(buildingObj)  
@@ -1532,33 +1556,64 @@ def buildFloor(buildingObj:bpy.types.Object,
             buildingObj.rotation_euler = bData.combo_rotation
 
     # 生成柱网
-    if bData.is_showPillars:
+    if (bData.is_showPillars
+        and (layers is None or con.LAYER_PILLAR in layers)):
         utils.outputMsg("Building Pillars...")
+        aca_timer.mark_stage(con.LAYER_PILLAR)
         buildPillars(buildingObj)
+        yield con.LAYER_PILLAR
     
     # 生成台基
-    if bData.is_showPlatform:
+    if (bData.is_showPlatform
+        and (layers is None or con.LAYER_PLATFORM in layers)):
         utils.outputMsg("Building Platform...")
+        aca_timer.mark_stage(con.LAYER_PLATFORM)
         buildPlatform.buildPlatform(buildingObj)
+        yield con.LAYER_PLATFORM
     
     # 生成墙体
-    if bData.is_showWalls:
+    if (bData.is_showWalls
+        and (layers is None or con.LAYER_WALL in layers)):
         utils.outputMsg("Building Wall...")
+        aca_timer.mark_stage(con.LAYER_WALL)
         buildWall.buildWallLayout(buildingObj)
+        yield con.LAYER_WALL
     
     # 生成屋顶
-    buildRoof.buildRoof(buildingObj)
+    yield from buildRoof.iterBuildRoof(buildingObj,layers=layers)
 
     # 260409 为了加快生成速度，不再全部应用修改器
     # 260415 为了加快后续的合并、剖视等操作，还是应用所有修改器
     # 应用所有子对象的修改器
+    aca_timer.mark_stage('modifier')
     utils.applyCollModifier(buildingObj)
 
     # 重新聚焦回根节点
     utils.focusObj(buildingObj)
 
+    # 260501 记录参数快照，用于下次更新时判断需要重建的图层
+    from . import build
+    build.saveLayerSnapshot(buildingObj)
+
+    boundbox.fitBuildingBoundBox(buildingObj)
     return {'FINISHED'}
 
+# 260501 删除需要重建的图层
+# 屋顶各层由buildRoof自行清理
+def __clearLayers(buildingObj:bpy.types.Object,
+                  layers:set):
+    layerRoots = {
+        con.LAYER_PLATFORM: con.ACA_TYPE_BASE_ROOT,
+        con.LAYER_PILLAR: con.ACA_TYPE_FLOOR_ROOT,
+        con.LAYER_WALL: con.ACA_TYPE_WALL_ROOT,
+    }
+    for layer,rootType in layerRoots.items():
+        if layer not in layers: continue
+        rootObj = utils.getAcaChild(buildingObj,rootType)
+        if rootObj != None:
+            utils.deleteHierarchy(rootObj,del_parent=True)
+    return
+
 # 获取重檐柱网
 # 在做穿插枋时，需要连接下檐柱网和上檐柱网
 def __getComboPillarNet(buildingObj:bpy.types.Object):
@@ -0,0 +1,473 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   图层缓存机制，用于缓存斗栱、梁架、椽架、瓦作等已完成的图层
+#   以图层相关参数的指纹为键，缓存图层的整个对象层次
+#   在来回切换参数、撤销参数修改时，直接复用已生成的图层
+#   仅含网格、空对象的图层（如斗栱、梁架）同时写入磁盘缓存
+from .locale.i18n import _
+import bpy
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from .const import ACA_Consts as con
+from . import utils
+from . import buildDiskCache
+
+# 缓存目录名称
+CACHE_COLL_NAME = 'ACA_LayerCache'
+
+# 各图层的根节点类型，及其所在的目录
+LAYER_ROOTS = {
+    con.LAYER_DOUGONG: (
+        (con.ACA_TYPE_DG_ROOT, 'COLL_NAME_DOUGONG'),
+    ),
+    con.LAYER_BEAM: (
+        (con.ACA_TYPE_BEAM_ROOT, 'COLL_NAME_BEAM'),
+    ),
+    con.LAYER_RAFTER: (
+        (con.ACA_TYPE_RAFTER_ROOT, 'COLL_NAME_RAFTER'),
+        (con.ACA_TYPE_BOARD_ROOT, 'COLL_NAME_BOARD'),
+        (con.ACA_TYPE_WALL_SHAN, 'COLL_NAME_RAFTER'),
+    ),
+    con.LAYER_TILE: (
+        (con.ACA_TYPE_TILE_ROOT, 'COLL_NAME_TILE'),
+    ),
+}
+
+class LayerCachePrefsMixin:
+    """图层缓存配置项混入类"""
+
+    use_layer_cache: bpy.props.BoolProperty(
+        default=True,
+        name=_("启用图层缓存"),
+        description=_("缓存已生成的斗栱、梁架、椽架、瓦作图层，参数未变化时直接复用"),
+    ) # type: ignore
+
+    layer_cache_size: bpy.props.IntProperty(
+        default=512,
+        min=32, max=8192,
+        name=_("图层缓存上限(MB)"),
+        description=_("图层缓存占用内存的估算上限，超出后淘汰最久未使用的缓存"),
+    ) # type: ignore
+
+    def draw_layer_cache_prefs(self, layout):
+        """绘制图层缓存配置UI"""
+        row = layout.row()
+        row.prop(self, 'use_layer_cache')
+        row.prop(self, 'layer_cache_size')
+
+
+class LayerCache:
+    """
+    图层缓存类
+
+    每个缓存项保存一个图层的对象层次副本，存放在排除显示的缓存目录中。
+    网格数据在存入和取出时均做复制，以免后续的合并、剖视等操作修改缓存。
+    采用LRU淘汰，并按网格数据量估算内存占用。
+
+    营造过程中写回bData的推算值（如瓦垄宽度、起翘点），也一并缓存，在恢复时写回。
+
+    使用示例:
+        layerCache = LayerCache.getInstance()
+        if not layerCache.restore(buildingObj, con.LAYER_DOUGONG):
+            cacheToken = layerCache.begin(buildingObj, con.LAYER_DOUGONG)
+            buildDougong.buildDougong(buildingObj)
+            layerCache.save(buildingObj, cacheToken)
+    """
+
+    _instance = None
+    # 磁盘缓存中的构件类型
+    _cacheType = 'layer'
+
+    @classmethod
+    def getInstance(cls):
+        """
+        获取单例实例
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        # 缓存键 -> 缓存项
+        # 缓存项：{'objects':[...], 'infos':[...], 'props':{...}, 'size':int}
+        self._cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._size = 0
+
+    def _getPrefs(self):
+        preferences = bpy.context.preferences
+        addon_main_name = __name__.split('.')[0]
+        return preferences.addons[addon_main_name].preferences
+
+    def isEnabled(self, buildingObj: bpy.types.Object) -> bool:
+        """
+        是否启用缓存
+        组合建筑的图层依赖于其他建筑，不做缓存
+        """
+        if not self._getPrefs().use_layer_cache:
+            return False
+        if utils.getComboRoot(buildingObj) is not None:
+            return False
+        return True
+
+    def generateKey(self,
+                    buildingObj: bpy.types.Object,
+                    layer: str) -> Tuple:
+        """
+        生成缓存键
+
+        参数:
+            buildingObj: 建筑根节点
+            layer: 图层标识，如con.LAYER_DOUGONG
+
+        返回:
+            元组形式的缓存键
+        """
+        from . import build
+        return (layer,
+                build.getLayerFingerprint(buildingObj, layer),
+                self._getPrefs().use_bevel)
+
+    def _getCollection(self) -> bpy.types.Collection:
+        """
+        获取缓存目录，挂在场景根目录下，并排除显示
+        """
+        coll = bpy.data.collections.get(CACHE_COLL_NAME)
+        if coll is None:
+            coll = bpy.data.collections.new(CACHE_COLL_NAME)
+            bpy.context.scene.collection.children.link(coll)
+            utils.hideCollection(CACHE_COLL_NAME, isExclude=True)
+        # 260501 重新打开文件后，内存中的缓存已失效，清理文件中残留的缓存对象
+        elif not self._cache and len(coll.objects) > 0:
+            self._removeObjects(list(coll.objects))
+        return coll
+
+    def _getLayerRoots(self,
+                       buildingObj: bpy.types.Object,
+                       layer: str) -> List[Tuple[bpy.types.Object, str]]:
+        """
+        获取建筑中该图层的根节点，及其所在目录的名称
+        """
+        roots = []
+        for rootType, collKey in LAYER_ROOTS.get(layer, ()):
+            rootObj = utils.getAcaChild(buildingObj, rootType)
+            if rootObj is not None:
+                roots.append((rootObj, collKey))
+        return roots
+
+    def _flattenHierarchy(self,
+                          roots: List[Tuple[bpy.types.Object, str]],
+                          ) -> List[Tuple[bpy.types.Object, str]]:
+        """
+        展开对象层次，父节点优先
+        """
+        objList = []
+        for rootObj, collKey in roots:
+            stack = [rootObj]
+            while stack:
+                obj = stack.pop()
+                objList.append((obj, collKey))
+                stack.extend(obj.children)
+        return objList
+
+    def _copyObjects(self,
+                     objList: List[bpy.types.Object],
+                     ) -> List[bpy.types.Object]:
+        """
+        复制对象（含网格数据），重新映射父子关系与修改器中的对象引用
+
+        返回:
+            新对象列表，与输入顺序一致
+        """
+        copyMap = {}
+        for obj in objList:
+            newObj = obj.copy()
+            if obj.data is not None:
+                newObj.data = obj.data.copy()
+            copyMap[obj] = newObj
+
+        for newObj in copyMap.values():
+            if newObj.parent in copyMap:
+                newObj.parent = copyMap[newObj.parent]
+            for mod in newObj.modifiers:
+                for prop in mod.bl_rna.properties:
+                    if (prop.type == 'POINTER'
+                            and not prop.is_readonly
+                            and getattr(prop, 'fixed_type', None) is not None
+                            and prop.fixed_type.identifier == 'Object'):
+                        refObj = getattr(mod, prop.identifier)
+                        if refObj in copyMap:
+                            setattr(mod, prop.identifier, copyMap[refObj])
+        return [copyMap[obj] for obj in objList]
+
+    def _getSize(self, objects) -> int:
+        """
+        估算缓存项的内存占用(字节)
+        """
+        size = 0
+        for obj in objects:
+            mesh = obj.data
+            if not isinstance(mesh, bpy.types.Mesh):
+                continue
+            size += (len(mesh.vertices) * 12
+                     + len(mesh.edges) * 8
+                     + len(mesh.loops) * (8 + 8 * len(mesh.uv_layers))
+                     + len(mesh.polygons) * 16)
+        return size
+
+    def _removeObjects(self, objects: List[bpy.types.Object]):
+        """
+        删除缓存对象及其网格数据
+        """
+        meshes = set()
+        for obj in objects:
+            try:
+                if obj.data is not None:
+                    meshes.add(obj.data)
+                bpy.data.objects.remove(obj)
+            except ReferenceError:
+                pass
+        for mesh in meshes:
+            try:
+                if mesh.users == 0:
+                    if isinstance(mesh, bpy.types.Mesh):
+                        bpy.data.meshes.remove(mesh)
+                    elif isinstance(mesh, bpy.types.Curve):
+                        bpy.data.curves.remove(mesh)
+            except ReferenceError:
+                pass
+
+    def _invalidate(self, cacheKey: Tuple):
+        """
+        使指定缓存键失效，并删除缓存对象
+        """
+        item = self._cache.pop(cacheKey, None)
+        if item is None:
+            return
+        self._size -= item['size']
+        self._removeObjects(item['objects'])
+
+    def _evict(self):
+        """
+        按LRU淘汰缓存，直到低于内存上限
+        """
+        limit = self._getPrefs().layer_cache_size * 1024 * 1024
+        while self._cache and self._size > limit:
+            oldestKey = next(iter(self._cache))
+            self._invalidate(oldestKey)
+
+    def has(self,
+            buildingObj: bpy.types.Object,
+            layer: str) -> bool:
+        """
+        检查图层缓存是否存在且有效
+        """
+        if not self.isEnabled(buildingObj):
+            return False
+        cacheKey = self.generateKey(buildingObj, layer)
+        item = self._cache.get(cacheKey)
+        if item is None:
+            # 260501 内存未命中时，尝试从磁盘缓存载入
+            item = self._loadFromDisk(cacheKey)
+            if item is None:
+                return False
+        try:
+            for obj in item['objects']:
+                obj.name
+        except ReferenceError:
+            self._invalidate(cacheKey)
+            return False
+        return True
+
+    def begin(self,
+              buildingObj: bpy.types.Object,
+              layer: str):
+        """
+        在营造图层之前调用，记录缓存键与参数快照
+        营造过程可能修改bData，所以缓存键必须在营造前生成
+
+        参数:
+            buildingObj: 建筑根节点
+            layer: 图层标识
+
+        返回:
+            缓存令牌，传给save()；未启用缓存时返回None
+        """
+        if not self.isEnabled(buildingObj):
+            return None
+        # 260501 草图模式的图层不存入缓存，但可以复用已缓存的完整图层
+        if utils.isDraftMode():
+            return None
+        from . import build
+        return (layer,
+                self.generateKey(buildingObj, layer),
+                build.getPropSnapshot(buildingObj))
+
+    def save(self,
+             buildingObj: bpy.types.Object,
+             cacheToken):
+        """
+        将建筑中已生成的图层存入缓存
+
+        参数:
+            buildingObj: 建筑根节点
+            cacheToken: begin()返回的缓存令牌
+        """
+        if cacheToken is None:
+            return
+        layer, cacheKey, propsBefore = cacheToken
+        roots = self._getLayerRoots(buildingObj, layer)
+        if not roots:
+            return
+        self._invalidate(cacheKey)
+
+        # 营造过程中写回bData的推算值
+        from . import build
+        propsAfter = build.getPropSnapshot(buildingObj)
+        props = {}
+        for key, value in propsAfter.items():
+            if propsBefore.get(key) == value:
+                continue
+            # 仅记录数值与数组，枚举、集合属性不做恢复
+            if isinstance(value, str):
+                continue
+            if isinstance(value, tuple) and any(
+                    isinstance(v, (tuple,str)) for v in value):
+                continue
+            props[key] = value
+
+        coll = self._getCollection()
+        objList = self._flattenHierarchy(roots)
+        sourceObjs = [obj for obj, collKey in objList]
+        objects = self._copyObjects(sourceObjs)
+        infos = []
+        for newObj, (obj, collKey) in zip(objects, objList):
+            coll.objects.link(newObj)
+            isRoot = obj.parent not in sourceObjs
+            # 根节点脱离原建筑
+            if isRoot:
+                newObj.parent = None
+            infos.append({
+                'name': obj.name,
+                'coll': collKey,
+                'hide': obj.hide_get(),
+                'root': isRoot,
+            })
+        size = self._getSize(objects)
+        self._cache[cacheKey] = {
+            'objects': objects, 
+            'infos': infos,
+            'props': props,
+            'size': size,
+        }
+        self._size += size
+        self._evict()
+
+        # 260501 同时写入磁盘缓存，从建筑中的原对象读取，隐藏对象不参与修改器计算
+        buildDiskCache.getDiskCache().save(
+            self._cacheType, cacheKey,
+            [rootObj for rootObj, collKey in roots],
+            extra={'infos': infos, 'props': props})
+        return
+
+    def _loadFromDisk(self, cacheKey: Tuple):
+        """
+        从磁盘缓存载入图层，存为内存缓存项
+
+        返回:
+            缓存项，未命中时返回None
+        """
+        coll = self._getCollection()
+        objects, extra = buildDiskCache.getDiskCache().load(
+            self._cacheType, cacheKey, collection=coll)
+        if objects is None:
+            return None
+        size = self._getSize(objects)
+        item = {
+            'objects': objects,
+            'infos': extra['infos'],
+            'props': extra['props'],
+            'size': size,
+        }
+        self._cache[cacheKey] = item
+        self._size += size
+        self._evict()
+        return item
+
+    def restore(self,
+                buildingObj: bpy.types.Object,
+                layer: str) -> bool:
+        """
+        从缓存恢复图层，替换建筑中的现有图层
+
+        参数:
+            buildingObj: 建筑根节点
+            layer: 图层标识
+
+        返回:
+            是否命中缓存
+        """
+        if not self.has(buildingObj, layer):
+            return False
+        cacheKey = self.generateKey(buildingObj, layer)
+        item = self._cache[cacheKey]
+        # LRU，标记为最近使用
+        self._cache.move_to_end(cacheKey)
+
+        # 删除建筑中的现有图层
+        for rootObj, collKey in self._getLayerRoots(buildingObj, layer):
+            utils.deleteHierarchy(rootObj, del_parent=True)
+
+        # 复制缓存对象到建筑中
+        buildingColl = buildingObj.users_collection[0]
+        objects = self._copyObjects(item['objects'])
+        for newObj, info in zip(objects, item['infos']):
+            coll = utils.setCollection(
+                getattr(con, info['coll']),
+                parentColl=buildingColl)
+            coll.objects.link(newObj)
+            newObj.name = info['name']
+            if info['root']:
+                newObj.parent = buildingObj
+            if info['hide']:
+                newObj.hide_set(True)
+        # 写回营造过程中的推算值
+        bData = buildingObj.ACA_data
+        for key, value in item['props'].items():
+            bData[key] = value
+        utils.updateScene()
+        utils.outputMsg(_("从缓存恢复图层: %s") % layer)
+        return True
+
+    def clear(self):
+        """
+        清理所有缓存
+        """
+        for cacheKey in list(self._cache.keys()):
+            self._invalidate(cacheKey)
+        self._cache.clear()
+        self._size = 0
+
+    def size(self) -> int:
+        """
+        返回缓存项的数量
+        """
+        return len(self._cache)
+
+
+def getLayerCache() -> LayerCache:
+    """
+    获取图层缓存实例
+
+    返回:
+        图层缓存实例
+    """
+    return LayerCache.getInstance()
+
+
+def clearLayerCache():
+    """
+    清理所有图层缓存
+    """
+    LayerCache.getInstance().clear()
@@ -429,7 +429,8 @@ def __wallBoolDiagnal(wallObj:bpy.types.Object,
 
 def buildYardWall(buildingObj:bpy.types.Object,
                   templateName = None,
-                  reloadAssets = False):
+                  reloadAssets = False,
+                  overrides:dict = None):
     # 定位到根目录，如果没有则新建
     buildingColl = utils.setCollection(
         con.COLL_NAME_ROOT,
@@ -449,7 +450,8 @@ def buildYardWall(buildingObj:bpy.types.Object,
         # 添加建筑根节点，同时载入模板
         buildingObj = __addBuildingRoot(templateName)
         # 在buldingObj上绑定模板bData和资产库aData
-        template.loadTemplate(buildingObj,templateName)
+        template.loadTemplate(buildingObj,templateName,
+                              overrides=overrides)
     else:
         utils.outputMsg(_("更新建筑..."))
         # 简单粗暴的全部删除
@@ -6,6 +6,7 @@ from .locale.i18n import _
 import bpy
 import bmesh
 import math
+import numpy as np
 from mathutils import Vector,Euler,Matrix
 from typing import List
 
@@ -18,7 +19,9 @@ from . import buildDougong
 from . import buildBeam
 from . import buildRooftile
 from . import buildBalcony
-from .tools.boundbox import update_boundbox
+from . import buildLayerCache
+from .tools import boundbox
+from .tools import aca_timer
 from . import texture as mat
 
 # 设置“椽架”根节点
@@ -1727,7 +1730,20 @@ def __buildCornerRafterCurve(buildingObj:bpy.types.Object):
     #utils.hideObj(rafterCurve_obj)
     return rafterCurve_obj
 
+# 260501 翼角椽的定位数据，代替逐根生成的翼角椽对象
+# 望板、翘飞椽按椽尾、椽头、旋转角度定位，不再读取翼角椽的网格
+class __CornerRafterFrame:
+    def __init__(self, location:Vector, head:Vector, rotation:Euler):
+        # 椽尾，即原翼角椽对象的origin
+        self.location = location
+        # 椽头端面的中心点，即原getObjectHeadPoint的结果
+        self.head = head
+        self.rotation_euler = rotation
+
 # 营造翼角椽(Corner Rafter,缩写CR)
+# 260501 所有翼角椽在numpy中一次计算起止点，生成同一个对象，
+# 沿角梁的裁剪也在生成时直接计算，不再逐根addBisect后合并
+# 返回合并后的翼角椽，以及各根翼角椽的定位数据
 def __buildCornerRafter(buildingObj:bpy.types.Object,
                         purlin_pos,
                         crCurve:bpy.types.Curve):
@@ -1760,75 +1776,56 @@ def __buildCornerRafter(buildingObj:bpy.types.Object,
     # 确认为奇数
     if crCount % 2 == 0: crCount += 1
     
-    # 2、放置翼角椽---------------------------
+    # 2、计算翼角椽起止点---------------------------
     # 计算每根翼角椽的椽头坐标
-    crHeadPoints = utils.getBezierSegment(crCurve,crCount)
+    crHeadPoints = np.array(utils.getBezierSegment(crCurve,crCount))
     # 第一根翼角椽尾与正身椽尾同高
     crEnd_0 = jinhengPos + Vector((0,0,(con.HENG_COMMON_D+con.YUANCHUAN_D)/2*dk))
-    # 翼角椽尾展开的合计宽度
-    crEndSpread = con.CORNER_RAFTER_START_SPREAD * dk
-    # 依次摆放翼角椽
-    cornerRafterColl = []  # 暂存翼角椽，传递给翘飞椽参考
-    for n in range(len(crHeadPoints)):
-        # 椽尾沿角梁散开一斗口
-        offset = Vector((crEndSpread*n,0,0))
-        offset.rotate(cornerBeamObj.rotation_euler)
-        crEnd = crEnd_0 + offset
-
-        # 椽头从曲线点向下半椽，并出雀台
-        crHead = crHeadPoints[n]
-        crTail = crEnd + Vector((0,0,con.YUANCHUAN_D/2*dk))
-        dir = crHead - crTail
-        rot = utils.alignToVector(dir)
-        vOffset = Vector((
-                con.QUETAI*dk,
-                0,
-                - con.YUANCHUAN_D*dk/2,
-                ))
-        vOffset.rotate(rot)
-        crHead += vOffset
-        cornerRafterObj = utils.addCylinderBy2Points(
-            start_point = crEnd, 
-            end_point = crHead,   # 在曲线上定位的椽头坐标
-            radius=con.YUANCHUAN_D/2*dk,
-            name=_('翼角椽'),
-            root_obj=rafterRootObj
-        )
-        # 翼角椽如果按照檐口旋转，可以让翘飞椽随檐口翻转排列
-        # 最终觉得还是上下垂直更加符合图纸，取消此操作
-        # if n > 0: 
-        #     rotV = crEndPoints[n] - crEndPoints[n-1]
-        #     rot = utils.alignToVector(rotV)
-        #     cornerRafterObj.rotation_euler.x = -rot.z
-        cornerRafterObj.rotation_euler.x = 0
-        # 250324 为了防止裁剪翼角椽，导致无法准确获取椽头坐标，进而导致翘飞椽构造异常
-        # 将裁剪已到了__buildRafterForAll中合并翼角椽后进行处理
-        # # 裁剪椽架，檐椽不做裁剪
-        # utils.addBisect(
-        #         object=cornerRafterObj,
-        #         pStart=buildingObj.matrix_world @ purlin_pos[0],
-        #         pEnd=buildingObj.matrix_world @ purlin_pos[1],
-        #         pCut=buildingObj.matrix_world @ purlin_pos[0] - \
-        #             Vector((con.JIAOLIANG_Y*dk/2*math.sqrt(2),0,0)),
-        #         clear_outer=True
-        # ) 
-        # 为了便于贴图，将镜像延后到所有椽架做完后添加
-        # # 角梁45度对称
-        # utils.addModifierMirror(
-        #     object=cornerRafterObj,
-        #     mirrorObj=cornerBeamObj,
-        #     use_axis=(False,True,False)
-        # )
-        # # 四向对称
-        # utils.addModifierMirror(
-        #     object=cornerRafterObj,
-        #     mirrorObj=rafterRootObj,
-        #     use_axis=(True,True,False)
-        # )
-
-        cornerRafterColl.append(cornerRafterObj)
+    # 椽尾沿角梁散开，每根一斗口
+    spreadDir = Vector((con.CORNER_RAFTER_START_SPREAD * dk,0,0))
+    spreadDir.rotate(cornerBeamObj.rotation_euler)
+    crEnds = (np.array(crEnd_0)
+              + np.outer(np.arange(crCount), np.array(spreadDir)))
+    # 椽头从曲线点向下半椽，并出雀台
+    crTails = crEnds + (0,0,con.YUANCHUAN_D/2*dk)
+    rot = utils.eulersToMatrices(
+        utils.alignToVectors(crHeadPoints - crTails))
+    crHeads = (crHeadPoints
+               + con.QUETAI*dk * rot[:,:,0]
+               - con.YUANCHUAN_D*dk/2 * rot[:,:,2])
+    # 翼角椽如果按照檐口旋转，可以让翘飞椽随檐口翻转排列
+    # 最终觉得还是上下垂直更加符合图纸，所以旋转不做x轴翻转
+    crRotations = utils.alignToVectors(crHeads - crEnds)
+
+    # 3、生成翼角椽---------------------------
+    # 沿角梁裁剪椽尾，与原先的addBisect采用同一个裁剪面，
+    # 但直接在屋顶坐标系中计算，不受建筑旋转的影响
+    pStart = purlin_pos[0]
+    pEnd = purlin_pos[1]
+    clipNormal = Vector((pEnd.x-pStart.x,pEnd.y-pStart.y,0))
+    clipNormal.rotate(Euler((0,0,math.radians(90)),'XYZ'))
+    clipCo = pStart - Vector((con.JIAOLIANG_Y*dk/2*math.sqrt(2),0,0))
+    crSet = utils.addCylinderField(
+        radius=con.YUANCHUAN_D/2*dk,
+        start_points=crEnds,
+        end_points=crHeads,    # 在曲线上定位的椽头坐标
+        name=_('翼角椽'),
+        root_obj=rafterRootObj,
+        clip_co=clipCo,
+        clip_no=clipNormal,
+    )
+    # 为了便于贴图，镜像延后到所有椽架做完后添加
+
+    # 暂存翼角椽定位，传递给望板、翘飞椽参考
+    cornerRafterColl = []
+    for n in range(crCount):
+        cornerRafterColl.append(__CornerRafterFrame(
+            location=Vector(crEnds[n]),
+            head=Vector(crHeads[n]),
+            rotation=Euler(crRotations[n]),
+        ))
     
-    return cornerRafterColl
+    return crSet,cornerRafterColl
 
 # 绘制翼角椽望板
 # 分别连接金桁交点、各个翼角椽头上皮
@@ -1870,7 +1867,7 @@ def __drawCrWangban(
             m = n-2
         else:
             m = n-1
-        crObj:bpy.types.Object = crCollection[m]
+        crObj = crCollection[m]
         # X：避让里口木，Z：抬升半椽
         offset = Vector((-con.LIKOUMU_Y*dk,
                          0,
@@ -1883,7 +1880,7 @@ def __drawCrWangban(
     # 循环插入翼角椽头
     for n in range(len(crCollection)):
         # 翘飞椽头坐标,插入队列尾
-        crObj:bpy.types.Object = crCollection[n]
+        crObj = crCollection[n]
         crHead_loc = crWangbanObj.matrix_world.inverted() @ crObj.location
         offset = Vector((0,0,con.YUANCHUAN_D/2*dk))
         offset.rotate(crObj.rotation_euler)
@@ -2345,13 +2342,13 @@ def __drawCornerFlyrafter(
 def __drawCornerFlyrafter(
         name,
         root_obj,
-        cornerRafterObj:bpy.types.Object,
+        cornerRafterObj,
         cornerRafterObjPre,
         cornerFlyrafterHead,
         cornerFlyrafterHeadPre,
     ):
     # 载入数据
-    buildingObj = utils.getAcaParent(cornerRafterObj,con.ACA_TYPE_BUILDING)
+    buildingObj = utils.getAcaParent(root_obj,con.ACA_TYPE_BUILDING)
     bData : acaData = buildingObj.ACA_data
     dk = bData.DK
     
@@ -2362,9 +2359,7 @@ def __drawCornerFlyrafter(
         (con.YUANCHUAN_D/2+con.WANGBAN_H)*dk))
     offset.rotate(cornerRafterObj.rotation_euler)
     # 获取翼角椽的椽头坐标
-    cr_head_co = utils.getObjectHeadPoint(cornerRafterObj,
-            eval=False,
-            is_symmetry=(True,True,False))
+    cr_head_co = cornerRafterObj.head
     loc = cr_head_co + offset
     # 添加对象
     cfrObj = utils.addCube(name=name,
@@ -2372,7 +2367,9 @@ def __drawCornerFlyrafter(
         rotation=cornerRafterObj.rotation_euler,    # 沿用翼角椽的旋转角度
         parent=root_obj
     )
-    utils.updateScene() # 需要刷新，才能正确获取到该对象的matrix_local
+    # 260501 直接计算翘飞椽的matrix_local，不再刷新场景
+    cfrMatrixInv = Matrix.LocRotScale(
+        loc,cornerRafterObj.rotation_euler,None).inverted()
 
     # 2、创建bmesh
     bm = bmesh.new()
@@ -2386,7 +2383,7 @@ def __drawCornerFlyrafter(
     # V2: 椽头上皮
     # 从上层函数中传入的翘飞椽头上皮，来自翘飞椽定位曲线
     # 从“翘飞椽定位线”坐标系转换到“翘飞椽”坐标系
-    cfr_head_co = (cfrObj.matrix_local.inverted() 
+    cfr_head_co = (cfrMatrixInv 
                    @ cornerFlyrafterHead)
     cfrHead_top = cfr_head_co
 
@@ -2487,8 +2484,8 @@ def __drawCornerFlyrafter(
     # 上一根翼角椽的椽头坐标
     cr_head_pre_co = cornerRafterObjPre
     # 转换到当前翘飞椽坐标系
-    crLoc = cfrObj.matrix_local.inverted() @ cr_head_co
-    crpLoc = cfrObj.matrix_local.inverted() @ cr_head_pre_co
+    crLoc = cfrMatrixInv @ cr_head_co
+    crpLoc = cfrMatrixInv @ cr_head_pre_co
     # 翘飞椽头角度向量
     cr_shear = crLoc - crpLoc
     # 旋转角度
@@ -2513,8 +2510,8 @@ def __drawCornerFlyrafter(
         v.co.z += offset_z/2
 
     # 椽头的处理    
-    cfrLoc = cfrObj.matrix_local.inverted() @ cornerFlyrafterHead
-    cfrpLoc = cfrObj.matrix_local.inverted() @ cornerFlyrafterHeadPre
+    cfrLoc = cfrMatrixInv @ cornerFlyrafterHead
+    cfrpLoc = cfrMatrixInv @ cornerFlyrafterHeadPre
     vShear = cfrpLoc - cfrLoc
     # 沿着椽头方向投影
     vHead = cfr_head_v
@@ -2617,7 +2614,7 @@ def __drawCornerFlyrafter(
 # 营造翼角翘飞椽（Corner Flyrafter,缩写CFR）
 def __buildCornerFlyrafter(
         buildingObj:bpy.types.Object,
-        cornerRafterColl:List[bpy.types.Object],
+        cornerRafterColl:list,
         cfrCurve:bpy.types.Curve):
     bData : acaData = buildingObj.ACA_data
     dk = bData.DK
@@ -2638,8 +2635,7 @@ def __buildCornerFlyrafter(
     cfrHeads = []
     for crObj in cornerRafterColl:
         crEnd = crObj.location
-        crStart = utils.getObjectHeadPoint(
-            object=crObj)
+        crStart = crObj.head
         
         # 计算交点
         intersections = utils.intersect_line_bezier(
@@ -2670,17 +2666,14 @@ def __buildCornerFlyrafter(
             cornerFlyrafterHeadPre = bpoints[0].co
         else:
             # 上一根翼角椽坐标
-            cornerRafterObjPre = utils.getObjectHeadPoint(
-                cornerRafterColl[n-1],
-                eval=False,
-                is_symmetry=(True,True,False))
+            cornerRafterObjPre = cornerRafterColl[n-1].head
             # 上一根翘飞椽坐标
             cornerFlyrafterHeadPre = cfrHeads[n-1]
                    
         cfr_Obj = __drawCornerFlyrafter(
             name=_('翘飞椽'),
             root_obj=rafterRootObj,
-            cornerRafterObj = cornerRafterColl[n], # 对应的翼角椽对象
+            cornerRafterObj = cornerRafterColl[n], # 对应的翼角椽定位
             cornerRafterObjPre = cornerRafterObjPre,
             cornerFlyrafterHead = cfrHeads[n], # 头在翘飞椽定位线上
             cornerFlyrafterHeadPre = cornerFlyrafterHeadPre,
@@ -2907,7 +2900,7 @@ def __buildRafterForAll(buildingObj:bpy.types.Object,purlin_pos):
         # 营造小连檐
         __buildCornerRafterEave(buildingObj,crCurve)
         # 营造翼角椽
-        cornerRafterColl = __buildCornerRafter(buildingObj,
+        crSet,cornerRafterColl = __buildCornerRafter(buildingObj,
                     purlin_pos,crCurve)
         
         if useWangban:
@@ -2969,19 +2962,7 @@ def __buildRafterForAll(buildingObj:bpy.types.Object,purlin_pos):
             # 260317 应用修改器
             utils.applyAllModifer(cfrSet)
 
-        # 250718 裁剪翼角椽，逐一裁剪以保证水密
-        for cr in cornerRafterColl:
-            utils.addBisect(
-                    object=cr,
-                    pStart=buildingObj.matrix_world @ purlin_pos[0],
-                    pEnd=buildingObj.matrix_world @ purlin_pos[1],
-                    pCut=buildingObj.matrix_world @ purlin_pos[0] - \
-                        Vector((con.JIAOLIANG_Y*dk/2*math.sqrt(2),0,0)),
-                    clear_outer=True
-            ) 
-        # 合并翼角椽
-        crSet = utils.joinObjects(
-            cornerRafterColl,newName=_('翼角椽'))
+        # 翼角椽已在生成时裁剪、合并
         # 绑定材质
         crSet = mat.paint(crSet,con.M_FLYRAFTER,
                           override=True)
@@ -4081,7 +4062,27 @@ def __buildRafterFrame(buildingObj:bpy.types.Object):
         
     return rafterRootObj
 
-def __clearRoof(buildingObj:bpy.types.Object):
+def __clearRoof(buildingObj:bpy.types.Object,
+                layers:set=None):
+    # 260501 分层重建时，仅删除需要重建的图层（含根节点，以便按新参数定位）
+    if layers is not None:
+        layerRoots = {
+            con.LAYER_DOUGONG: (con.ACA_TYPE_DG_ROOT,),
+            con.LAYER_BALCONY: (con.ACA_TYPE_BALCONY_ROOT,),
+            con.LAYER_BEAM: (con.ACA_TYPE_BEAM_ROOT,),
+            con.LAYER_RAFTER: (con.ACA_TYPE_RAFTER_ROOT,
+                               con.ACA_TYPE_BOARD_ROOT,
+                               con.ACA_TYPE_WALL_SHAN,),
+            con.LAYER_TILE: (con.ACA_TYPE_TILE_ROOT,),
+        }
+        for layer,rootTypes in layerRoots.items():
+            if layer not in layers: continue
+            for rootType in rootTypes:
+                rootObj = utils.getAcaChild(buildingObj,rootType)
+                if rootObj != None:
+                    utils.deleteHierarchy(rootObj,del_parent=True)
+        return
+    
     # 斗栱层
     dgrootObj = utils.getAcaChild(
         buildingObj,con.ACA_TYPE_DG_ROOT)
@@ -4143,10 +4144,26 @@ def __checkRoofSettings(buildingObj:bpy.types.Object):
     return
 
 # 营造整个房顶
-@update_boundbox
-def buildRoof(buildingObj:bpy.types.Object):
+def buildRoof(buildingObj:bpy.types.Object,
+              layers:set=None):
+    return utils.runAllSteps(
+        iterBuildRoof(buildingObj,layers=layers))
+
+# 260501 分步营造屋顶，每完成一个图层yield一次，供模态操作逐步推进
+def iterBuildRoof(buildingObj:bpy.types.Object,
+                  layers:set=None):
+    # 260501 分层重建，layers为None时整体重建
+    def isRebuild(layer):
+        return layers is None or layer in layers
+    if layers is not None and not any(
+            isRebuild(layer) for layer in (
+                con.LAYER_DOUGONG,con.LAYER_BALCONY,con.LAYER_BEAM,
+                con.LAYER_RAFTER,con.LAYER_TILE)):
+        boundbox.fitBuildingBoundBox(buildingObj)
+        return {'FINISHED'}
+
     # 刷新屋顶
-    __clearRoof(buildingObj)
+    __clearRoof(buildingObj,layers)
     
     # 屋顶设置校验
     __checkRoofSettings(buildingObj)
@@ -4160,32 +4177,70 @@ def buildRoof(buildingObj:bpy.types.Object):
     if bData.is_showTiles:
         bData['is_showRafter'] = True
 
+    # 260501 图层缓存，参数未变化时直接复用已生成的图层
+    layerCache = buildLayerCache.getLayerCache()
+
     # 生成斗栱层
-    if bData.is_showDougong:
+    if bData.is_showDougong and isRebuild(con.LAYER_DOUGONG):
         utils.outputMsg("Building Dougong...")
-        buildDougong.buildDougong(buildingObj)
+        aca_timer.mark_stage(con.LAYER_DOUGONG)
+        if not layerCache.restore(buildingObj,con.LAYER_DOUGONG):
+            cacheToken = layerCache.begin(buildingObj,con.LAYER_DOUGONG)
+            buildDougong.buildDougong(buildingObj)
+            layerCache.save(buildingObj,cacheToken)
+        yield con.LAYER_DOUGONG
 
     # 是否为平坐
     if bData.roof_style==con.ROOF_BALCONY:
         # 生成平座层
-        if bData.is_showBalcony:
+        if bData.is_showBalcony and isRebuild(con.LAYER_BALCONY):
             utils.outputMsg("Building Balcony...")
+            aca_timer.mark_stage(con.LAYER_BALCONY)
             buildBalcony.buildBalcony(buildingObj)
+            yield con.LAYER_BALCONY
     else:
         # 生成梁架
-        if bData.is_showBeam:
+        if bData.is_showBeam and isRebuild(con.LAYER_BEAM):
             utils.outputMsg("Building Beams...")
-            buildBeam.buildBeamFrame(buildingObj)
+            aca_timer.mark_stage(con.LAYER_BEAM)
+            if not layerCache.restore(buildingObj,con.LAYER_BEAM):
+                cacheToken = layerCache.begin(buildingObj,con.LAYER_BEAM)
+                buildBeam.buildBeamFrame(buildingObj)
+                layerCache.save(buildingObj,cacheToken)
+            yield con.LAYER_BEAM
         
+        # 瓦作层依赖椽望层的辅助对象，两层的缓存都命中时才能复用
+        isRafter = bData.is_showRafter and isRebuild(con.LAYER_RAFTER)
+        isTile = bData.is_showTiles and isRebuild(con.LAYER_TILE)
+        if (isRafter 
+            and layerCache.has(buildingObj,con.LAYER_RAFTER)
+            and (not isTile 
+                 or layerCache.has(buildingObj,con.LAYER_TILE))):
+            utils.outputMsg("Building Rafters...")
+            aca_timer.mark_stage(con.LAYER_RAFTER)
+            layerCache.restore(buildingObj,con.LAYER_RAFTER)
+            if isTile:
+                utils.outputMsg("Building Tiles...")
+                aca_timer.mark_stage(con.LAYER_TILE)
+                layerCache.restore(buildingObj,con.LAYER_TILE)
+            isRafter = isTile = False
+            yield con.LAYER_RAFTER
+
         # 生成椽望
-        if bData.is_showRafter:
+        if isRafter:
             utils.outputMsg("Building Rafters...")
+            aca_timer.mark_stage(con.LAYER_RAFTER)
+            rafterToken = layerCache.begin(buildingObj,con.LAYER_RAFTER)
             rafterRootObj = __buildRafterFrame(buildingObj)
+            yield con.LAYER_RAFTER
 
         # 生成瓦作层
-        if bData.is_showTiles:
+        if isTile:
             utils.outputMsg("Building Tiles...")
+            aca_timer.mark_stage(con.LAYER_TILE)
+            tileToken = layerCache.begin(buildingObj,con.LAYER_TILE)
             buildRooftile.buildTile(buildingObj)
+            yield con.LAYER_TILE
 
         # 望板层联动瓦作层
         utils.hideLayer(
@@ -4226,11 +4281,17 @@ def buildRoof(buildingObj:bpy.types.Object):
 
     # 椽架层合并
     if (bData.roof_style != con.ROOF_BALCONY
-        and bData.is_showRafter):
+        and isRafter):
+        aca_timer.mark_stage(con.LAYER_RAFTER)
         rafterFrame = utils.joinObjects(
             rafterRootObj.children,newName='椽架')
         # 260427 椽架层合并后默认有椽子的旋转，导致计算boundbox时出错，需要应用
         utils.applyTransform(rafterFrame,use_rotation=True)
+        # 存入图层缓存
+        layerCache.save(buildingObj,rafterToken)
+        if isTile:
+            layerCache.save(buildingObj,tileToken)
     
     utils.focusObj(buildingObj)
+    boundbox.fitBuildingBoundBox(buildingObj)
     return {'FINISHED'}
\ No newline at end of file
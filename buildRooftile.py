@@ -6,15 +6,17 @@ from .locale.i18n import _
 import bpy
 import bmesh
 import math
+import numpy as np
 from mathutils import Vector,Matrix,Euler
 
 from . import utils
 from . import buildBeam
-from .template import template
 from .const import ACA_Consts as con
 from .data import ACA_data_obj as acaData
 from .data import ACA_data_template as tmpData
 from . import texture as mat
+from .tools import tile_grid
+from .tools import curve_array
 
 # 创建瓦作层根节点
 # 如果已存在根节点，则一概清空重建
@@ -627,6 +629,51 @@ def __getTileCols(buildingObj:bpy.types.Object,direction='X'):
 
     return tileCols
 
+# 260501 读取辅助线的控制点，转换到瓦面网格坐标系，供tile_grid求解
+def __getCurveData(curveObj:bpy.types.Object,
+                   origin:Vector) -> dict:
+    # 辅助线与瓦面网格同在瓦作层根节点下
+    matrix = (Matrix.Translation(-origin)
+              @ Matrix.LocRotScale(curveObj.location,
+                                   curveObj.rotation_euler,
+                                   curveObj.scale))
+    spline = curveObj.data.splines[0]
+    if spline.type == 'BEZIER':
+        bpoints = spline.bezier_points
+        return tile_grid.bezier_curve(
+            points=[matrix @ p.co for p in bpoints],
+            handles_left=[matrix @ p.handle_left for p in bpoints],
+            handles_right=[matrix @ p.handle_right for p in bpoints])
+    else:
+        return tile_grid.nurbs_curve(
+            points=[matrix @ p.co.xyz for p in spline.points],
+            order=spline.order_u)
+
+# 260501 将tile_grid求解的顶点写入瓦面网格对象
+def __addTileGridObject(name:str,
+                        verts:np.ndarray,
+                        cols:int,
+                        rows:int,
+                        location:Vector,
+                        parent:bpy.types.Object) -> bpy.types.Object:
+    loopVerts,faceStarts,faceTotals = tile_grid.grid_topology(cols,rows)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set('co', verts.astype(np.float32).ravel())
+    mesh.loops.add(len(loopVerts))
+    mesh.loops.foreach_set('vertex_index', loopVerts.astype(np.int32))
+    mesh.polygons.add(len(faceStarts))
+    mesh.polygons.foreach_set('loop_start', faceStarts.astype(np.int32))
+    mesh.polygons.foreach_set('loop_total', faceTotals.astype(np.int32))
+    mesh.update(calc_edges=True)
+
+    gridObj = bpy.data.objects.new(name, mesh)
+    gridObj.location = location
+    gridObj.parent = parent
+    bpy.context.collection.objects.link(gridObj)
+    gridObj.ACA_data.aca_obj = True
+    return gridObj
+
 # 绘制瓦面网格，依赖于三条曲线的控制
 def __drawTileGrid(
             buildingObj:bpy.types.Object,
@@ -681,27 +728,22 @@ def __drawTileGrid(
     tileRows = round(roofLength /tileLength)+1
 
     # 2、生成瓦面网格
-    # 这里采用几何节点实现，利用了resample curve节点，可以生成均匀分布的网格
-    # 而python中暂未找到在curve上均匀分配的API
-    # 连接资产blender文件中的瓦面对象，直接放到“瓦作层”节点下
-    tileGrid:bpy.types.Object = template.loadAssets(
-        "TileGrid",tileRootObj,hide=False,link=False)
-    # 瓦面要与辅助线重合，并上移一个大连檐高度
-    tileGrid.location = TileCurve.location
-    # 250116 瓦面上移一个筒瓦高，以便卷棚顶筒瓦能够紧密结合
-    # tileGrid.location.z += tileHeight
-    tileGrid.name = tileGrid_name
-    # 输入修改器参数
-    gnMod:bpy.types.NodesModifier = \
-        tileGrid.modifiers.get('GeometryNodes')
-    # 几何节点修改器的传参比较特殊，封装了一个方法
-    utils.setGN_Input(gnMod,"TileCurve",TileCurve)
-    utils.setGN_Input(gnMod,"EaveCurve",EaveCurve)
-    utils.setGN_Input(gnMod,"SideCurve",SideCurve)
-    utils.setGN_Input(gnMod,"GridCols",GridCols)
-    utils.setGN_Input(gnMod,"GridRows",tileRows)  
-    # 应用GN modifier
-    utils.applyAllModifer(tileGrid)      
+    # 260501 不再载入TileGrid几何节点资产，改为在numpy中求解网格顶点
+    # 瓦面要与辅助线重合，网格坐标以正身坡线的origin为原点
+    origin = TileCurve.location.copy()
+    gridVerts = tile_grid.build_tile_grid(
+        tile_curve=__getCurveData(TileCurve,origin),
+        eave_curve=__getCurveData(EaveCurve,origin),
+        side_curve=__getCurveData(SideCurve,origin),
+        cols=GridCols,
+        rows=tileRows)
+    tileGrid = __addTileGridObject(
+        name=tileGrid_name,
+        verts=gridVerts,
+        cols=GridCols,
+        rows=tileRows,
+        location=origin,
+        parent=tileRootObj)
 
     # 260414 清理辅助线
     utils.delObject(EaveCurve)  # 檐口线
@@ -714,40 +756,24 @@ def __drawTileGrid(
     # 注意：GridCols不是列数，是划线数，需要减一，
     # 且GridCols是半垄，实际应该乘二
     if direction == 'X':
-        bData['tile_width_real'] = tileGrid.dimensions.x/(GridCols-1)*2
+        gridWidth = np.ptp(gridVerts[:,0])
+        bData['tile_width_real'] = gridWidth/(GridCols-1)*2
 
     utils.hideObj(tileGrid)
     return tileGrid
 
-# 绘制瓦面的斜切boolean对象
-# 分别可以适应庑殿与歇山屋瓦的裁剪（悬山、硬山不涉及）
-# 庑殿沿着角梁、由戗裁剪，其中包含了推山的因素
-# 歇山基于桁架形状裁剪，其中的歇山转折点做了特殊计算
-def __drawTileBool(
-        buildingObj:bpy.types.Object,
-        purlin_cross_points,
-        name='tile.bool',
-        direction='X'):
+# 260501 瓦面裁剪体的平面轮廓，由子角梁头、各由戗节点及其Y镜像组成
+# 裁剪体沿Z轴挤出，所以瓦片的裁剪只取决于这个平面轮廓
+# 同时用于__drawTileBool构造裁剪体，和__arrayTileGrid预先分拣瓦片
+def __getTileBoolOutline(buildingObj:bpy.types.Object,
+                         purlin_cross_points):
     # 载入数据
     bData:acaData = buildingObj.ACA_data
     dk = bData.DK
     tileRootObj = utils.getAcaChild(
         buildingObj,con.ACA_TYPE_TILE_ROOT
     )
-    roofBaseZ = (bData.platform_height 
-                 + bData.pillar_height )
 
-    # 任意添加一个对象，具体几何数据在bmesh中建立
-    bpy.ops.mesh.primitive_cube_add(
-        location=(0,0,0)
-    )
-    tileboolObj = bpy.context.object
-    tileboolObj.name = name
-    tileboolObj.data.name = name
-    tileboolObj.parent = tileRootObj
-
-    # 创建bmesh
-    bm = bmesh.new()
     # 各个点的集合
     vectors = []
 
@@ -821,6 +847,40 @@ def __drawTileBool(
         # 插入后点，即前点的Y镜像
         vectors.append(cutPoint*Vector((1,-1,1)))
     
+    return vectors
+
+# 绘制瓦面的斜切boolean对象
+# 分别可以适应庑殿与歇山屋瓦的裁剪（悬山、硬山不涉及）
+# 庑殿沿着角梁、由戗裁剪，其中包含了推山的因素
+# 歇山基于桁架形状裁剪，其中的歇山转折点做了特殊计算
+def __drawTileBool(
+        buildingObj:bpy.types.Object,
+        purlin_cross_points,
+        name='tile.bool',
+        direction='X'):
+    # 载入数据
+    bData:acaData = buildingObj.ACA_data
+    dk = bData.DK
+    tileRootObj = utils.getAcaChild(
+        buildingObj,con.ACA_TYPE_TILE_ROOT
+    )
+    roofBaseZ = (bData.platform_height 
+                 + bData.pillar_height )
+
+    # 任意添加一个对象，具体几何数据在bmesh中建立
+    bpy.ops.mesh.primitive_cube_add(
+        location=(0,0,0)
+    )
+    tileboolObj = bpy.context.object
+    tileboolObj.name = name
+    tileboolObj.data.name = name
+    tileboolObj.parent = tileRootObj
+
+    # 创建bmesh
+    bm = bmesh.new()
+    # 裁剪体的平面轮廓
+    vectors = __getTileBoolOutline(buildingObj,purlin_cross_points)
+
     # 摆放点
     vertices=[]
     for n in range(len(vectors)):
@@ -1074,11 +1134,69 @@ def __setTile(
     TileCopy.matrix_local = Matrix
     offset.rotate(TileCopy.rotation_euler)
     TileCopy.location += offset
-
-    # 250110 新增琉璃颜色切换
-    mat.setGlazeStyle(TileCopy)
     return TileCopy   
 
+# 260501 按裁剪体的平面轮廓预先分拣瓦片
+# 裁剪体为竖直挤出的棱柱（并做X镜像），瓦片是否被裁剪只取决于平面投影：
+# 完全在轮廓一侧的瓦片直接保留或丢弃，只有跨越轮廓线的瓦片需要做boolean
+# 返回(保留的瓦片, 待裁剪的瓦片)，格式与utils.instanceMesh的参数相同
+def __cullTiles(instanceList:list,
+                outline,
+                origin:Vector,
+                keepInside:bool):
+    # 轮廓与其X镜像，裁剪体的实际范围为两者的并集
+    poly = np.array([(v.x, v.y) for v in outline])
+    polys = (poly, poly * (-1,1))
+    # 所有轮廓边，用于计算到轮廓线的距离
+    edgeStart = np.concatenate(polys)
+    edgeEnd = np.concatenate([np.roll(p,-1,axis=0) for p in polys])
+    edgeVec = edgeEnd - edgeStart
+    edgeLen2 = np.maximum((edgeVec**2).sum(axis=1), 1e-12)
+
+    keepList = []
+    cutList = []
+    for sourceObj,matrices in instanceList:
+        if len(matrices) == 0:
+            keepList.append((sourceObj,matrices))
+            continue
+        # 瓦片包围盒的8个角点
+        co = np.empty(len(sourceObj.data.vertices)*3, dtype=np.float64)
+        sourceObj.data.vertices.foreach_get('co', co)
+        co = co.reshape(-1,3)
+        bbox = np.array([(x,y,z) for x in (co[:,0].min(),co[:,0].max())
+                                 for y in (co[:,1].min(),co[:,1].max())
+                                 for z in (co[:,2].min(),co[:,2].max())])
+        # 变换到瓦作层坐标系，只取平面投影
+        corners = (np.einsum('nij,vj->nvi', matrices[:,:3,:3], bbox)
+                   + matrices[:,None,:3,3])[:,:,:2] + (origin.x, origin.y)
+        center = corners.mean(axis=1)
+        radius = np.linalg.norm(corners - center[:,None,:], axis=2).max(axis=1)
+
+        # 包围盒中心到轮廓线的最短距离
+        t = np.clip(((center[:,None,:] - edgeStart) * edgeVec).sum(axis=2)
+                    / edgeLen2, 0, 1)
+        nearest = edgeStart + t[:,:,None] * edgeVec
+        distance = np.linalg.norm(center[:,None,:] - nearest,
+                                  axis=2).min(axis=1)
+        # 包围盒中心是否在轮廓内（射线奇偶判断）
+        inside = np.zeros(len(center), dtype=bool)
+        for p in polys:
+            pNext = np.roll(p,-1,axis=0)
+            cross = ((p[:,1] > center[:,1,None])
+                     != (pNext[:,1] > center[:,1,None]))
+            dy = np.where(cross, pNext[:,1] - p[:,1], 1.0)
+            xCross = p[:,0] + (pNext[:,0] - p[:,0]) * (
+                (center[:,1,None] - p[:,1]) / dy)
+            inside |= (np.count_nonzero(
+                cross & (center[:,0,None] < xCross), axis=1) % 2 == 1)
+
+        # 距离轮廓线不足包围盒半径的，可能跨越轮廓线
+        isCut = distance <= radius
+        isKeep = ~isCut & (inside == keepInside)
+        keepList.append((sourceObj,matrices[isKeep]))
+        cutList.append((sourceObj,matrices[isCut]))
+    return keepList,cutList
+
 # 在网格上平铺瓦片
 def __arrayTileGrid(buildingObj:bpy.types.Object,
                 rafter_pos,
@@ -1128,6 +1246,12 @@ def __arrayTileGrid(buildingObj:bpy.types.Object,
     tileCols = __getTileCols(buildingObj,direction)
     GridCols = tileCols*2-1
     
+    # 庑殿、歇山做裁剪
+    # 251117 庑殿改用BVH裁剪，不在这里处理
+    isBoolCut = bData.roof_style in (
+                con.ROOF_XIESHAN,
+                con.ROOF_XIESHAN_JUANPENG,
+                con.ROOF_LUDING,)
     # 檐面与山面的差异
     if direction=='X':
         # boolean用difference，向外切
@@ -1141,144 +1265,155 @@ def __arrayTileGrid(buildingObj:bpy.types.Object,
         # 瓦片走向取第二条边
         dir_index = 1
 
-    # 在瓦面网格上依次排布瓦片
-    bm = bmesh.new()   # create an empty BMesh
-    bm.from_mesh(tileGrid.data)   # fill it in from a Mesh
-    tileList = []
-    for f in bm.faces:
-        # 不能直接用face normal进行定位
-        # # 构造矩阵的旋转
-        # z_axis = Vector((0, 0, 1))
-        # rotation = z_axis.rotation_difference(f.normal)
-        # M = rotation.to_matrix().to_4x4()
-
-        # 基于edge，构造Matrix变换矩阵，用于瓦片的定位
-        # https://blender.stackexchange.com/questions/177218/make-bone-roll-match-a-face-vertex-normal/177331#177331
-        # 取面上第一条边（沿着坡面）
-        e = f.edges[dir_index]
-        # 边的向量(归一化)，做为Y轴
-        y = (e.verts[1].co - e.verts[0].co).normalized()
-        # # 平均相邻面的法线，做为边的法线，做为Z轴
-        # z = sum((f.normal for f in e.link_faces), Vector()).normalized()
-        z = f.normal.normalized()
-        # Y/Z轴做叉积，得到与之垂直的X轴
-        x = y.cross(z)
-        # 坐标系转置（行列互换，以复合blender的坐标系要求）
-        M = Matrix((x, y, z)).transposed().to_4x4()
-
-        # 构造矩阵的位移
-        M.translation = f.calc_center_median()
-        
-        # 构造矩阵的缩放
-        # 按照网格长度缩放筒板瓦
-        # 网格边长
-        cellLength = f.edges[dir_index].calc_length()
-        # 筒瓦边长
-        tileLength = aData.circularTile_source.dimensions.y * tileScale
-        # 缩放比例
-        scale_factor = cellLength/tileLength
-        # 在矩阵中添加缩放
-        # 250610 这里不需要根据direction的X/Y来缩放，统一在Y缩放即可
-        scale_matrix = Matrix.Scale(scale_factor, 4, (0, 1, 0))
-        M =  M @ scale_matrix
-    
-        # 250116 瓦片布在网格几何中心，
-        # 并对齐筒瓦顶面，以避免卷棚顶筒瓦的间隙
-        if direction=='X':
-            offset_aside = Vector((
-                bData.tile_width_real/4,
-                -cellLength/2,
-                -tileHeight))
-            offset_head = Vector((
-                bData.tile_width_real/4,
-                cellLength/2,
-                -tileHeight))
+    # 260501 在瓦面网格上批量排布瓦片
+    # 原先逐个面复制瓦片对象、逐个着色、再joinObjects合并，
+    # 海量对象的创建与删除非常耗时，改为numpy批量计算所有面的变换矩阵，
+    # 直接将所有瓦片写入同一个mesh
+    gridMesh = tileGrid.data
+    faceCount = len(gridMesh.polygons)
+    gridCo = np.empty(len(gridMesh.vertices)*3, dtype=np.float64)
+    gridMesh.vertices.foreach_get('co', gridCo)
+    gridCo = gridCo.reshape(-1,3)
+    loopStart = np.empty(faceCount, dtype=np.int64)
+    loopTotal = np.empty(faceCount, dtype=np.int64)
+    gridMesh.polygons.foreach_get('loop_start', loopStart)
+    gridMesh.polygons.foreach_get('loop_total', loopTotal)
+    loopVerts = np.empty(len(gridMesh.loops), dtype=np.int64)
+    loopEdges = np.empty(len(gridMesh.loops), dtype=np.int64)
+    gridMesh.loops.foreach_get('vertex_index', loopVerts)
+    gridMesh.loops.foreach_get('edge_index', loopEdges)
+    edgeVerts = np.empty(len(gridMesh.edges)*2, dtype=np.int64)
+    gridMesh.edges.foreach_get('vertices', edgeVerts)
+    edgeVerts = edgeVerts.reshape(-1,2)
+    faceNormal = np.empty(faceCount*3, dtype=np.float64)
+    gridMesh.polygons.foreach_get('normal', faceNormal)
+    faceNormal = faceNormal.reshape(-1,3)
+
+    # 面中心，与bmesh的calc_center_median一致
+    faceCenter = np.zeros((faceCount,3))
+    np.add.at(faceCenter,
+              np.repeat(np.arange(faceCount), loopTotal),
+              gridCo[loopVerts])
+    faceCenter /= loopTotal[:,None]
+
+    # 基于edge，构造Matrix变换矩阵，用于瓦片的定位
+    # https://blender.stackexchange.com/questions/177218/make-bone-roll-match-a-face-vertex-normal/177331#177331
+    # 取面上第一条边（沿着坡面），与bmesh中f.edges[dir_index]相同
+    e = edgeVerts[loopEdges[loopStart + dir_index]]
+    edgeVec = gridCo[e[:,1]] - gridCo[e[:,0]]
+    # 网格边长
+    cellLength = np.linalg.norm(edgeVec, axis=1)
+    # 边的向量(归一化)，做为Y轴
+    y = edgeVec / cellLength[:,None]
+    # 面法线，做为Z轴
+    z = faceNormal / np.linalg.norm(faceNormal, axis=1)[:,None]
+    # Y/Z轴做叉积，得到与之垂直的X轴
+    x = np.cross(y, z)
+    # 按照网格长度缩放筒板瓦
+    # 250610 这里不需要根据direction的X/Y来缩放，统一在Y缩放即可
+    scale_factor = cellLength/tileLength
+    # 矩阵的列依次为X/Y/Z轴
+    M = np.zeros((faceCount,4,4))
+    M[:,:3,0] = x
+    M[:,:3,1] = y * scale_factor[:,None]
+    M[:,:3,2] = z
+    M[:,3,3] = 1
+    # 瓦片偏移仅跟随旋转，不跟随缩放
+    R = np.stack((x/np.linalg.norm(x,axis=1)[:,None], y, z), axis=2)
+
+    # 250116 瓦片布在网格几何中心，
+    # 并对齐筒瓦顶面，以避免卷棚顶筒瓦的间隙
+    if direction=='X':
+        offsetX = bData.tile_width_real/4
+    else:
+        offsetX = -bData.tile_width_real/4
+    def getTileMatrix(mask,isHead):
+        offset = np.zeros((faceCount,3))
+        offset[:,0] = offsetX
+        if isHead:
+            offset[:,1] = cellLength/2
         else:
-            offset_aside = Vector((
-                -bData.tile_width_real/4,
-                -cellLength/2,
-                -tileHeight))
-            offset_head = Vector((
-                -bData.tile_width_real/4,
-                cellLength/2,
-                -tileHeight)) 
-        
-        # 241113 修正bug：原来的筒板瓦排布时从檐口的瓦面face开始计算，
-        # 实际上第一行应该是勾头滴水的normal，筒板瓦应该从第二行的face开始计算
-        # 排布板瓦，仅在偶数列排布
-        if ((f.index%GridCols) % 2 == 0
-            # 不做最后一列板瓦，以免与排山勾滴重叠
-            and f.index%GridCols != GridCols-1
-            and f.index >= GridCols):
-            tileObj = __setTile(
-                sourceObj=flatTile,
-                name=_('板瓦'),
-                Matrix=M,
-                offset=offset_aside.copy(),
-                parent=tileGrid,
-            )
-            tileList.append(tileObj)
-
-        # 排布筒瓦，奇数列排布
-        if (f.index%GridCols) % 2 == 1 and f.index >= GridCols:
-            tileObj = __setTile(
-                sourceObj=circularTile,
-                name=_('筒瓦'),
-                Matrix=M,
-                offset=offset_aside.copy(),
+            offset[:,1] = -cellLength/2
+        offset[:,2] = -tileHeight
+        matrices = M[mask].copy()
+        matrices[:,:3,3] = (faceCenter[mask] 
+            + np.einsum('nij,nj->ni', R[mask], offset[mask]))
+        return matrices
+
+    faceIndex = np.arange(faceCount)
+    faceCol = faceIndex % GridCols
+    # 241113 修正bug：原来的筒板瓦排布时从檐口的瓦面face开始计算，
+    # 实际上第一行应该是勾头滴水的normal，筒板瓦应该从第二行的face开始计算
+    # 排布板瓦，仅在偶数列排布
+    # 不做最后一列板瓦，以免与排山勾滴重叠
+    flatMask = ((faceCol % 2 == 0)
+                & (faceCol != GridCols-1)
+                & (faceIndex >= GridCols))
+    # 排布筒瓦，奇数列排布
+    circularMask = (faceCol % 2 == 1) & (faceIndex >= GridCols)
+    # 排布檐口瓦，第一行
+    dripMask = (faceIndex < GridCols) & (faceIndex % 2 == 0)
+    eaveMask = (faceIndex < GridCols) & (faceIndex % 2 == 1)
+
+    # 硬山、悬山（卷棚）最后一个滴水做斜切
+    # 仍单独生成对象，做bisect后再合并
+    cutTile = None
+    # 260501 草图模式不排布瓦片，也无需斜切
+    isDraft = utils.isDraftMode()
+    if bData.roof_style in (
+                con.ROOF_YINGSHAN,
+                con.ROOF_YINGSHAN_JUANPENG,
+                con.ROOF_XUANSHAN,
+                con.ROOF_XUANSHAN_JUANPENG
+            ) and not isDraft:
+        cutMask = dripMask & (faceCol == GridCols-1)
+        dripMask = dripMask & ~cutMask
+        for index in faceIndex[cutMask]:
+            pCut = Vector(faceCenter[index].tolist())
+            tileMatrix = Matrix(M[index].tolist())
+            tileMatrix.translation = pCut
+            cutTile = __setTile(
+                sourceObj=dripTile,
+                name=_('滴水'),
+                Matrix=tileMatrix,
+                offset=Vector((offsetX,
+                               cellLength[index]/2,
+                               -tileHeight)),
                 parent=tileGrid,
             )
-            tileList.append(tileObj)
-
-        # 排布檐口瓦
-        if f.index < GridCols:# 第一行
-            # 排布滴水
-            if f.index % 2 == 0:
-                tileObj = __setTile(
-                    sourceObj=dripTile,
-                    name=_('滴水'),
-                    Matrix=M,
-                    offset=offset_head.copy(),
-                    parent=tileGrid,
+            # 260417 回廊的最后一片滴水多余了，没有好的删除办法，只能暂时在这里裁掉
+            # 真的不是个好办法，先这样吧
+            if bData.combo_type == con.COMBO_LOGGIA:
+                utils.addBisect(
+                    object=cutTile,
+                    pStart=tileGrid.matrix_world @ Vector((0,0,0)),
+                    pEnd=tileGrid.matrix_world @ Vector((0,1,0)),
+                    pCut=tileGrid.matrix_world @ rafter_pos[0],
+                    clear_inner=True
                 )
-                # 硬山、悬山（卷棚）最后一个滴水做斜切
-                if bData.roof_style in (
-                            con.ROOF_YINGSHAN,
-                            con.ROOF_YINGSHAN_JUANPENG,
-                            con.ROOF_XUANSHAN,
-                            con.ROOF_XUANSHAN_JUANPENG
-                        ):
-                    if f.index%GridCols == GridCols-1:
-                        # 260417 回廊的最后一片滴水多余了，没有好的删除办法，只能暂时在这里裁掉
-                        # 真的不是个好办法，先这样吧
-                        if bData.combo_type == con.COMBO_LOGGIA:
-                            utils.addBisect(
-                                object=tileObj,
-                                pStart=tileGrid.matrix_world @ Vector((0,0,0)),
-                                pEnd=tileGrid.matrix_world @ Vector((0,1,0)),
-                                pCut=tileGrid.matrix_world @ rafter_pos[0],
-                                clear_inner=True
-                            )
-                        else:
-                            utils.addBisect(
-                                object=tileObj,
-                                pStart=tileGrid.matrix_world @ Vector((0,0,0)),
-                                pEnd=tileGrid.matrix_world @ Vector((1,1,0)),
-                                pCut=tileGrid.matrix_world @ f.calc_center_median(),
-                                clear_inner=True
-                            )
-                tileList.append(tileObj) 
-
-            # 排布瓦当
-            if f.index % 2 == 1:
-                tileObj = __setTile(
-                    sourceObj=eaveTile,
-                    name=_('瓦当'),
-                    Matrix=M,
-                    offset=offset_head.copy(),
-                    parent=tileGrid,
+            else:
+                utils.addBisect(
+                    object=cutTile,
+                    pStart=tileGrid.matrix_world @ Vector((0,0,0)),
+                    pEnd=tileGrid.matrix_world @ Vector((1,1,0)),
+                    pCut=tileGrid.matrix_world @ pCut,
+                    clear_inner=True
                 )
-                tileList.append(tileObj)
+            # 250110 琉璃颜色切换，裁剪后已是独立的网格
+            mat.setGlazeStyle(cutTile,buildingObj=buildingObj)
+
+    for tileObj in (flatTile,circularTile,dripTile,eaveTile):
+        tileObj.parent = tileGrid
+    # 250110 琉璃颜色切换
+    # 260501 不再修改瓦片模板，合并瓦片时按查找表一次完成
+    slotRemap = None
+    if bData.paint_style == '2':
+        # 全局覆盖的着色方式，仍在瓦片模板上设置
+        for tileObj in (flatTile,circularTile,dripTile,eaveTile):
+            mat.setGlazeStyle(tileObj,buildingObj=buildingObj)
+    else:
+        slotRemap = mat.getGlazeRemap(
+            buildingObj,(flatTile,circularTile,dripTile,eaveTile))
     
     # 合并所有的瓦片对象
     # 可以极大的提高重新生成时的效率（海量对象删除太慢了）
@@ -1286,26 +1421,78 @@ def __arrayTileGrid(buildingObj:bpy.types.Object,
         tileSetName = _('前后檐')
     else:
         tileSetName = _('两山')
-    tileSet = utils.joinObjects(
-        tileList,newName = _('屋瓦.') + tileSetName)
+    if isDraft:
+        # 260501 草图模式以瓦面网格加厚为整片壳体，代替逐个瓦片
+        # 瓦片沿面法线向下排布，壳体同样向法线反方向加厚
+        tileSet = utils.instanceMesh(
+            [(tileGrid,np.eye(4)[None])],
+            newName = _('屋瓦.') + tileSetName,
+            parent=tileGrid)
+        for tileMat in circularTile.data.materials:
+            tileSet.data.materials.append(tileMat)
+        modSolidify:bpy.types.SolidifyModifier = \
+            tileSet.modifiers.new('Solidify','SOLIDIFY')
+        modSolidify.thickness = tileHeight
+        modSolidify.offset = -1
+        # 草图壳体整体做boolean
+        tileCut = tileSet
+    else:
+        # 排列顺序与原逐面排布一致（第一个面为滴水），以保持材质slot的顺序
+        tileInstances = [
+            (dripTile,getTileMatrix(dripMask,isHead=True)),
+            (eaveTile,getTileMatrix(eaveMask,isHead=True)),
+            (flatTile,getTileMatrix(flatMask,isHead=False)),
+            (circularTile,getTileMatrix(circularMask,isHead=False)),
+        ]
+        tileMaterials = [slot.material
+                         for tileObj,matrices in tileInstances
+                         for slot in tileObj.material_slots]
+        # 260501 需要boolean裁剪的屋顶，先按裁剪体轮廓分拣瓦片，
+        # 只有跨越轮廓线的瓦片单独合并，并做boolean
+        cutInstances = []
+        if isBoolCut:
+            outline = __getTileBoolOutline(buildingObj,rafter_pos)
+            tileInstances,cutInstances = __cullTiles(
+                tileInstances,outline,tileGrid.location,
+                keepInside=isBoolInside)
+        tileSet = utils.instanceMesh(
+            tileInstances,
+            newName = _('屋瓦.') + tileSetName,
+            parent=tileGrid,
+            materials=tileMaterials,
+            slotRemap=slotRemap)
+        if any(len(matrices) > 0 for tileObj,matrices in cutInstances):
+            tileCut = utils.instanceMesh(
+                cutInstances,
+                newName = _('屋瓦.') + tileSetName,
+                parent=tileGrid,
+                materials=tileMaterials,
+                slotRemap=slotRemap)
+        else:
+            tileCut = None
+    if cutTile is not None:
+        tileSet = utils.joinObjects(
+            [tileSet,cutTile],
+            newName = _('屋瓦.') + tileSetName,
+            baseObj=tileSet)
     
-    # 添加镜像
-    utils.addModifierMirror(
-        object=tileSet,
-        mirrorObj=tileRootObj,
-        use_axis=(True,True,False),
-        use_bisect=(True,True,False),
-        use_merge=True, # 合并接缝的点，实现水密
-    )
-
-    # 将屋瓦绑定到根节点
-    utils.changeParent(tileSet,tileRootObj)
+    if tileCut is None or tileCut is tileSet:
+        tileObjs = [tileSet]
+    else:
+        tileObjs = [tileSet,tileCut]
+    for tileObj in tileObjs:
+        # 添加镜像
+        utils.addModifierMirror(
+            object=tileObj,
+            mirrorObj=tileRootObj,
+            use_axis=(True,True,False),
+            use_bisect=(True,True,False),
+            use_merge=True, # 合并接缝的点，实现水密
+        )
+        # 将屋瓦绑定到根节点
+        utils.changeParent(tileObj,tileRootObj)
     # 庑殿、歇山做裁剪
-    if bData.roof_style in (
-                # con.ROOF_WUDIAN, # 251117 改用BVH裁剪
-                con.ROOF_XIESHAN,
-                con.ROOF_XIESHAN_JUANPENG,
-                con.ROOF_LUDING,):
+    if isBoolCut:
         # 构造一个裁剪对象，做boolean
         # 瓦面不适合像椽架那样做三个bisect面的切割
         # 因为推山导致的由戗角度交叉，使得三个bisect面也有交叉，导致上下被裁剪的过多
@@ -1316,11 +1503,18 @@ def __arrayTileGrid(buildingObj:bpy.types.Object,
             operation = 'INTERSECT'
         else:
             operation = 'DIFFERENCE'
-        utils.addModifierBoolean(
-            object=tileSet,
-            boolObj=tile_bool_obj,
-            operation=operation,
-        )
+        # 260501 仅对跨越轮廓线的瓦片做boolean
+        if tileCut is not None:
+            utils.addModifierBoolean(
+                object=tileCut,
+                boolObj=tile_bool_obj,
+                operation=operation,
+            )
+            if tileCut is not tileSet:
+                tileSet = utils.joinObjects(
+                    [tileSet,tileCut],
+                    newName = _('屋瓦.') + tileSetName,
+                    baseObj=tileSet)
 
         # # 260414 清理辅助bool对象
         # utils.applyAllModifer(tileSet)
@@ -1905,12 +2099,17 @@ def __drawSideRidgeCurve(buildingObj:bpy.types.Object,
     return ridgeCurve
 
 # 沿曲线排布脊筒
+# 260501 不再叠加Array、Curve、Mirror修改器，直接生成最终网格
+# offset为沿曲线的位移，fitLength为平铺长度，
+# 原先在返回后修改位置和修改器，现在须在平铺时传入
 def __arrayRidgeByCurve(buildingObj: bpy.types.Object,
                     sourceObj:bpy.types.Object,
                     ridgeCurve:bpy.types.Curve,
                     ridgeName=_('垂脊'),
                     arrayCount=0,
                     userMerge=True,
+                    offset=0,
+                    fitLength=0,
                  ):
     # 载入数据
     bData:acaData = buildingObj.ACA_data
@@ -1924,7 +2123,7 @@ def __arrayRidgeByCurve(buildingObj: bpy.types.Object,
     frontRidgeObj = utils.copyObject(
         sourceObj=sourceObj,
         name=ridgeName,
-        location=ridgeCurve.location,
+        location=ridgeCurve.location + Vector((offset,0,0)),
         parentObj=tileRootObj,
         singleUser=True)
     # 根据斗口调整尺度
@@ -1933,28 +2132,20 @@ def __arrayRidgeByCurve(buildingObj: bpy.types.Object,
     utils.applyTransform(
         frontRidgeObj,use_scale=True)
     
-    # 沿垂脊曲线平铺
-    modArray:bpy.types.ArrayModifier = \
-        frontRidgeObj.modifiers.new(_('曲线平铺'),'ARRAY')
-    if arrayCount != 0:
-        modArray.fit_type = 'FIXED_COUNT'
-        modArray.count = arrayCount
-    else:
-        modArray.fit_type = 'FIT_CURVE'
-        modArray.curve = ridgeCurve
-    
+    # 沿垂脊曲线平铺、变形
     # 250718 脊筒间略作间隙，以确保在裁剪时保持水密
-    modArray.relative_offset_displace = (1.001,0,0)
-    
-    # 沿垂脊曲线变形
-    modCurve: bpy.types.CurveModifier = \
-        frontRidgeObj.modifiers.new(_('曲线变形'),'CURVE')
-    modCurve.object = ridgeCurve
+    curve_array.array_along_curve(
+        frontRidgeObj,
+        ridgeCurve,
+        count=arrayCount,
+        fit_length=fitLength,
+        relative_offset=(1.001,0,0),
+    )
 
     # 四面镜像
-    utils.addModifierMirror(
-        object=frontRidgeObj,
-        mirrorObj=tileRootObj,
+    curve_array.mirror_mesh(
+        frontRidgeObj,
+        mirror_obj=tileRootObj,
         use_axis=(True,True,False),
         use_bisect=(True,True,False),
         use_merge=userMerge,
@@ -1963,12 +2154,14 @@ def __arrayRidgeByCurve(buildingObj: bpy.types.Object,
     return frontRidgeObj
 
 # 营造排山勾滴
+# 260501 直接生成沿曲线平铺的最终网格，offset为沿曲线的位移
 def __arraySideTile(buildingObj: bpy.types.Object,
                     sourceObj:bpy.types.Object,
                     ridgeCurve:bpy.types.Curve,
                     arraySpan:float,
                     arrayCount=0,
                     tileName=_('排山勾滴'),
+                    offset=0,
                  ):
     # 载入数据
     bData : acaData = buildingObj.ACA_data
@@ -1982,7 +2175,7 @@ def __arraySideTile(buildingObj: bpy.types.Object,
     tileObj = utils.copyObject(
         sourceObj=sourceObj,
         name=tileName,
-        location=ridgeCurve.location,
+        location=ridgeCurve.location + Vector((offset,0,0)),
         parentObj=tileRootObj,
         singleUser=True)
     # 根据斗口调整尺度
@@ -1991,32 +2184,16 @@ def __arraySideTile(buildingObj: bpy.types.Object,
     # 旋转
     tileObj.rotation_euler.x = math.radians(90)
     
-    # 沿垂脊曲线平铺
-    modArray:bpy.types.ArrayModifier = \
-        tileObj.modifiers.new(_('曲线平铺'),'ARRAY')
-    if arrayCount != 0:
-        modArray.fit_type = 'FIXED_COUNT'
-        modArray.count = arrayCount
-    else:
-        modArray.fit_type = 'FIT_CURVE'
-        modArray.curve = ridgeCurve
-    modArray.use_relative_offset = False
-    modArray.use_constant_offset = True
-    modArray.constant_offset_displace = (-arraySpan,0,0)
-
-    # 沿垂脊曲线变形
-    modCurve: bpy.types.CurveModifier = \
-        tileObj.modifiers.new(_('曲线变形'),'CURVE')
-    modCurve.object = ridgeCurve
-    modCurve.deform_axis = 'NEG_X'
+    # 沿垂脊曲线平铺、变形
+    curve_array.array_along_curve(
+        tileObj,
+        ridgeCurve,
+        count=arrayCount,
+        constant_offset=(-arraySpan,0,0),
+        deform_axis='NEG_X',
+    )
     
     # 为了实现第一片排山滴水的裁剪，推迟到了排山滴水摆放位置完成后做镜像
-    # # 四面镜像
-    # modMirror: bpy.types.MirrorModifier = \
-    #     tileObj.modifiers.new('镜像','MIRROR')
-    # modMirror.mirror_object = tileRootObj
-    # modMirror.use_axis = (True,True,False)
-    # modMirror.use_bisect_axis = (False,True,False)
 
     return tileObj
 
@@ -2178,17 +2355,32 @@ def __buildFrontRidge(buildingObj: bpy.types.Object,
     # 构造垂脊兽后，歇山、悬山、硬山共用
     # 如果不做跑兽，也不做垂兽和垂脊兽后
     if bData.paoshou_count > 0 :
+        # 获取脊筒长度
+        ridgeObj:bpy.types.Object = aData.ridgeBack_source
+        ridgeLength = ridgeObj.dimensions.x * tileScale
+        # 260501 垂脊兽后平铺时直接生成最终网格，沿曲线的位移需事先确定
+        afterOffset = 0
+        if bData.roof_style in (con.ROOF_YINGSHAN,
+                                con.ROOF_YINGSHAN_JUANPENG,
+                                con.ROOF_XUANSHAN,
+                                con.ROOF_XUANSHAN_JUANPENG,) :
+            # 硬山悬山，垂脊兽后退后一个脊筒，摆放垂兽，与跑兽间隔开
+            # 并给端头盘子和跑兽留出空间
+            ridgeEndUnit:bpy.types.Object = aData.ridgeEnd_source
+            ridgeUnit:bpy.types.Object = aData.ridgeFront_source
+            afterOffset = (ridgeLength
+                + ridgeEndUnit.dimensions.x * tileScale
+                + ridgeUnit.dimensions.x * tileScale * bData.paoshou_count)
+
         # 1、垂脊兽后
         frontRidgeAfterObj = __arrayRidgeByCurve(buildingObj,
                         sourceObj=aData.ridgeBack_source,
                         ridgeCurve=frontRidgeCurve,
-                        ridgeName=_('垂脊兽后'))
+                        ridgeName=_('垂脊兽后'),
+                        offset=afterOffset)
         frontRidgeParts.append(frontRidgeAfterObj)
 
         # 2、垂兽
-        # 获取脊筒长度
-        ridgeObj:bpy.types.Object = aData.ridgeBack_source
-        ridgeLength = ridgeObj.dimensions.x * tileScale
         # 摆放垂兽
         chuishouObj = utils.copyObject(
             sourceObj=aData.chuishou_source,
@@ -2208,13 +2400,10 @@ def __buildFrontRidge(buildingObj: bpy.types.Object,
             mirrorObj=tileRootObj,
             use_axis=(True,True,False)
         )
-        if bData.roof_style in (con.ROOF_YINGSHAN,
+        if bData.roof_style not in (con.ROOF_YINGSHAN,
                                 con.ROOF_YINGSHAN_JUANPENG,
                                 con.ROOF_XUANSHAN,
                                 con.ROOF_XUANSHAN_JUANPENG,) :
-            # 硬山悬山，垂脊兽后退后一个脊筒，摆放垂兽，与跑兽间隔开
-            frontRidgeAfterObj.location.x += ridgeLength
-        else:
             # 歇山垂兽做头，后尾对齐正心桁中线，向檐口位移一脊筒
             chuishouObj.location.x -= ridgeLength
         frontRidgeParts.append(chuishouObj)
@@ -2262,9 +2451,9 @@ def __buildFrontRidge(buildingObj: bpy.types.Object,
                         sourceObj=aData.ridgeFront_source,
                         ridgeCurve=frontRidgeCurve,
                         ridgeName=_('垂脊兽前'),
-                        arrayCount= bData.paoshou_count)        
-        # 垂脊兽前后退一个端头盘子长度
-        frontRidgeBeforeObj.location.x += ridgeEnd_Length
+                        arrayCount= bData.paoshou_count,
+                        # 垂脊兽前后退一个端头盘子长度
+                        offset=ridgeEnd_Length)
         frontRidgeParts.append(frontRidgeBeforeObj)
 
         # 5、跑兽
@@ -2279,12 +2468,11 @@ def __buildFrontRidge(buildingObj: bpy.types.Object,
                 count=bData.paoshou_count
             )
 
-            # 给垂脊兽后留出跑兽的空间
+            # 给垂兽留出跑兽的空间，垂脊兽后已在平铺时后退
             ridgeUnit: bpy.types.Object= aData.ridgeFront_source
             ridgeUnit_Length = ridgeUnit.dimensions.x * tileScale
             paoLength = (ridgeEnd_Length 
                 + ridgeUnit_Length * bData.paoshou_count)
-            frontRidgeAfterObj.location.x += paoLength
             chuishouObj.location.x += paoLength
             frontRidgeParts.append(shouJoin)
     
@@ -2336,11 +2524,14 @@ def __buildSideTile(buildingObj: bpy.types.Object,
                    )
     arrayCount = int(arrayLength/bData.tile_width)
     arraySpan = arrayLength / arrayCount
+    # 沿曲线平铺时，X位移实际在曲线方向
     dripTileObj = __arraySideTile(buildingObj,
                     sourceObj=aData.dripTile_source,
                     ridgeCurve=sideRidgeCurve,
                     arraySpan=arraySpan,
-                    tileName=_('排山滴水'),)
+                    tileName=_('排山滴水'),
+                    # 排山滴水位移半瓦宽，四角退让，适当手工调整
+                    offset=- arraySpan/2 - con.TILE_CORNER_SPLIT*dk,)
     sideTileParts.append(dripTileObj)
     
     eaveTileObj = __arraySideTile(buildingObj,
@@ -2348,7 +2539,9 @@ def __buildSideTile(buildingObj: bpy.types.Object,
                     ridgeCurve=sideRidgeCurve,
                     arraySpan=arraySpan,
                     arrayCount = arrayCount-1,  # 少做一个勾头，手工放置坐中勾头
-                    tileName=_('排山勾头'))
+                    tileName=_('排山勾头'),
+                    # 排山勾头位移一瓦宽，四角退让，适当手工调整
+                    offset=- arraySpan - con.TILE_CORNER_SPLIT*dk,)
     sideTileParts.append(eaveTileObj)
     
     # 放置勾头坐中
@@ -2374,18 +2567,6 @@ def __buildSideTile(buildingObj: bpy.types.Object,
     )
     sideTileParts.append(eaveTileCenterObj)
 
-    # 排山勾头位移
-    # 在curve modifier的影响下，X位移实际在Y方向，Z位移实际在X方向
-    eaveTileObj.location += Vector((
-        # X方向（实际为Y方向），位移一瓦宽，四角退让，适当手工调整
-        - arraySpan - con.TILE_CORNER_SPLIT*dk, 
-        0, 0))
-    # 排山滴水位移
-    dripTileObj.location += Vector((
-        # X方向（实际为Y方向），位移半瓦宽，四角退让，适当手工调整
-        - arraySpan/2 - con.TILE_CORNER_SPLIT*dk,
-        0, 0))
-    
     if bData.roof_style in (
             con.ROOF_XUANSHAN,
             con.ROOF_YINGSHAN,
@@ -2406,16 +2587,17 @@ def __buildSideTile(buildingObj: bpy.types.Object,
     另一方面，curve后的裁剪导致实例化，无法再做上面的沿曲线位移，
     无奈之下，只能放在这里事后镜像
     '''
-    utils.addModifierMirror(
-        object=dripTileObj,
-        mirrorObj=tileRootObj,
+    # 260501 直接镜像网格，不再添加修改器
+    curve_array.mirror_mesh(
+        dripTileObj,
+        mirror_obj=tileRootObj,
         use_axis=(True,True,False),
         use_bisect=(False,True,False),
         use_merge=True, # 合并裁剪点，以实现水密
     )
-    utils.addModifierMirror(
-        object=eaveTileObj,
-        mirrorObj=tileRootObj,
+    curve_array.mirror_mesh(
+        eaveTileObj,
+        mirror_obj=tileRootObj,
         use_axis=(True,True,False),
         use_bisect=(False,True,False)
     )
@@ -2710,12 +2892,10 @@ def __buildCornerRidge(buildingObj:bpy.types.Object,
                     sourceObj=aData.ridgeFront_source,
                     ridgeCurve=cornerRidgeCurve,
                     ridgeName=cornerRidgeName+_('兽前'),
-                    arrayCount= bData.paoshou_count)
+                    arrayCount= bData.paoshou_count,
+                    # 戗脊兽前与端头盘子相接
+                    offset=ridgeEnd_Length)
     cornerRidgeParts.append(cornerRidgeBeforeObj)
-    # 戗脊兽前与端头盘子相接
-    cornerRidgeBeforeObj.location.x += \
-        ridgeEnd_Length
-    utils.applyAllModifer(cornerRidgeBeforeObj)
     utils.applyTransform(cornerRidgeBeforeObj,use_location=True)
     
     if bData.paoshou_count > 0:
@@ -2727,32 +2907,29 @@ def __buildCornerRidge(buildingObj:bpy.types.Object,
         )
         cornerRidgeParts.append(shouJoin)
 
-        # 构造垂脊兽后
-        cornerRidgeAfterObj = __arrayRidgeByCurve(buildingObj,
-                        sourceObj=aData.ridgeBack_source,
-                        ridgeCurve=cornerRidgeCurve,
-                        ridgeName=cornerRidgeName+_('兽后'))
-        cornerRidgeParts.append(cornerRidgeAfterObj)
-        
         # 留出跑兽的空间
         ridgeUnit: bpy.types.Object= aData.ridgeFront_source
         ridgeUnit_Length = ridgeUnit.dimensions.x * tileScale
         paoLength = (ridgeEnd_Length
             + ridgeUnit_Length * bData.paoshou_count)
-        cornerRidgeAfterObj.location.x += paoLength +ridgeUnit_Length
 
         # 盝顶戗脊兽后的跑兽偏移处理
         # 不做裁剪，仅修改垂脊长度
+        ridegLength = 0
         if bData.roof_style == con.ROOF_LUDING:
-            modArray:bpy.types.ArrayModifier \
-                  = cornerRidgeAfterObj.modifiers[_('曲线平铺')]
-            modArray.fit_type = 'FIT_LENGTH'
             curveLength = cornerRidgeCurve.data.splines[0].calc_length()
             # 251115 盝顶的垂脊没有闭合
             curveLength += 15*dk
             ridegLength = curveLength - paoLength - ridgeUnit_Length
-            modArray.fit_length = ridegLength
-        utils.applyAllModifer(cornerRidgeAfterObj)
+
+        # 构造垂脊兽后
+        cornerRidgeAfterObj = __arrayRidgeByCurve(buildingObj,
+                        sourceObj=aData.ridgeBack_source,
+                        ridgeCurve=cornerRidgeCurve,
+                        ridgeName=cornerRidgeName+_('兽后'),
+                        offset=paoLength +ridgeUnit_Length,
+                        fitLength=ridegLength)
+        cornerRidgeParts.append(cornerRidgeAfterObj)
         utils.applyTransform(cornerRidgeAfterObj,use_location=True)
 
         # 摆放垂兽
@@ -2935,8 +3112,6 @@ def __buildSideRidge(buildingObj:bpy.types.Object,
     # 250113 设置琉璃材质
     mat.setGlazeStyle(sideRidgeObj)
 
-    # 应用修改器
-    utils.applyAllModifer(sideRidgeObj)
     # 清理辅助线
     utils.delObject(sideRidgeCurve)
 
@@ -8,6 +8,7 @@ from typing import Callable, Optional, Tuple, Dict, Any
 from weakref import WeakValueDictionary
 
 from . import utils
+from . import buildDiskCache
 
 class WallCache:
     """
@@ -37,14 +38,17 @@ class WallCache:
         railingCache.clear()
     """
     
-    def __init__(self, cacheName: str = "墙体缓存"):
+    def __init__(self, cacheName: str = "墙体缓存",
+                 cacheType: Optional[str] = None):
         """
         初始化缓存
         
         参数:
             cacheName: 缓存名称，用于日志输出
+            cacheType: 缓存类型，指定后同时使用磁盘缓存
         """
         self._cacheName = cacheName
+        self._cacheType = cacheType
         self._cache: Dict[Tuple, bpy.types.Object] = {}
     
     def generateKey(self, 
@@ -87,7 +91,9 @@ class WallCache:
             复制的对象，如果缓存未命中或缓存对象已失效则返回 None
         """
         if cacheKey not in self._cache:
-            return None
+            # 260501 内存未命中时，尝试从磁盘缓存载入
+            if not self._loadFromDisk(cacheKey):
+                return None
         
         cachedObj = self._cache[cacheKey]
         
@@ -123,13 +129,22 @@ class WallCache:
             namePrefix: 缓存对象名称前缀
         
         返回:
-            缓存的对象副本
+            缓存的对象副本，草图模式下不做缓存，返回None
         """
         if sourceObj is None:
             return None
+        # 260501 草图模式没有倒角和UV，不存入缓存，否则完整重建时会载入草图
+        # 已缓存的完整构件仍可以在草图模式中复用
+        if utils.isDraftMode():
+            return None
         
         cacheName = f"{namePrefix}{cacheKey[0] if cacheKey else 'unknown'}"
         
+        # 260501 同时写入磁盘缓存，须在隐藏前保存，隐藏对象不参与修改器计算
+        if self._cacheType is not None:
+            buildDiskCache.getDiskCache().save(
+                self._cacheType, cacheKey, [sourceObj])
+        
         cachedObj = utils.copyObject(
             sourceObj=sourceObj,
             name=cacheName,
@@ -141,6 +156,27 @@ class WallCache:
         # print(_("对象已缓存: %s") % (cachedObj.name))
         return cachedObj
     
+    def _loadFromDisk(self, cacheKey: Tuple) -> bool:
+        """
+        从磁盘缓存载入对象，作为内存缓存对象
+        
+        参数:
+            cacheKey: 缓存键
+        
+        返回:
+            是否命中
+        """
+        if self._cacheType is None:
+            return False
+        objects, extra = buildDiskCache.getDiskCache().load(
+            self._cacheType, cacheKey)
+        if objects is None:
+            return False
+        cachedObj = objects[0]
+        utils.hideObj(cachedObj)
+        self._cache[cacheKey] = cachedObj
+        return True
+    
     def _invalidate(self, cacheKey: Tuple):
         """
         使指定缓存键失效
@@ -243,7 +279,8 @@ class WallCacheManager:
         """
         if cacheType not in self._caches:
             name = cacheName if cacheName else f"{cacheType}缓存"
-            self._caches[cacheType] = WallCache(cacheName=name)
+            self._caches[cacheType] = WallCache(cacheName=name,
+                                                cacheType=cacheType)
         return self._caches[cacheType]
     
     def clearCache(self, cacheType: str):
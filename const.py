@@ -118,6 +118,16 @@ class ACA_Consts(object, metaclass=ACA_ConstsMeta):
     ROOF_XIESHAN_JUANPENG = '8'
     ROOF_BALCONY = '9'
 
+    # 260501 分层重建的图层标识
+    LAYER_PLATFORM = 'platform'     # 台基层
+    LAYER_PILLAR = 'pillar'         # 柱网层
+    LAYER_WALL = 'wall'             # 装修层
+    LAYER_DOUGONG = 'dougong'       # 斗栱层
+    LAYER_BEAM = 'beam'             # 梁架层
+    LAYER_RAFTER = 'rafter'         # 椽架层（含山花望板、山墙）
+    LAYER_TILE = 'tile'             # 瓦作层
+    LAYER_BALCONY = 'balcony'       # 平坐层
+
     # 台基
     PLATFORM_HEIGHT = 2         # 台基默认高度(PD)
     PLATFORM_EXTEND = 2.4       # 台基下檐出(PD)
@@ -810,6 +810,8 @@ class ACA_data_obj(bpy.types.PropertyGroup):
                 ("3",_("蓝琉璃"),""),
                 ("4",_("紫琉璃"),""),
             ],
+            # 260501 仅重建瓦作层
+            update=dc.update_building,
         ) # type: ignore
     tile_alt_color : bpy.props.EnumProperty(
             name = _("剪边颜色"),
@@ -821,6 +823,8 @@ class ACA_data_obj(bpy.types.PropertyGroup):
                 ("3",_("蓝琉璃"),""),
                 ("4",_("紫琉璃"),""),
             ],
+            # 260501 仅重建瓦作层
+            update=dc.update_building,
         ) # type: ignore
     tile_width : bpy.props.FloatProperty(
             name=_("瓦垄宽度"), 
@@ -10,6 +10,7 @@ import bpy
 from functools import partial, wraps
 from .const import ACA_Consts as con
 from . import utils
+from .tools import rebuild_scheduler
 
 # 260212 新增判断“自动刷新”开关的修饰符
 def check_auto_rebuild(func):
@@ -22,6 +23,25 @@ def check_auto_rebuild(func):
         return func(self, context, *args, **kwargs)
     return wrapper
 
+# 260501 参数修改先登记到重建调度，输入停止后每个建筑只重建一次
+# 执行时按名称重新查找对象，排队期间对象可能已被重建替换
+def __scheduleUpdate(buildingObj:bpy.types.Object,
+                     func,
+                     targetObj:bpy.types.Object,
+                     argName='buildingObj',
+                     key=None,
+                     message=''):
+    targetName = targetObj.name
+    def run():
+        obj = bpy.data.objects.get(targetName)
+        if obj is None:
+            return
+        funproxy = partial(func, **{argName:obj})
+        utils.fastRun(funproxy)
+    rebuild_scheduler.request_rebuild(
+        buildingObj.name, run, key=key, message=message)
+    return
+
 # # 筛选资产目录
 # def p_filter(self, object:bpy.types.Object):
 #     # 仅返回Assets collection中的对象
@@ -63,7 +83,11 @@ def update_building(self, context:bpy.types.Context):
     # 在panel中指定为mData时，指向主建筑
     buildingObj = self.id_data
     if buildingObj != None:
-        bpy.ops.aca.update_building(buildingName=buildingObj.name)
+        rebuild_scheduler.request_rebuild(
+            buildingObj.name,
+            partial(bpy.ops.aca.update_building,
+                    buildingName=buildingObj.name),
+            message=_("更新建筑"))
     else:
         utils.popMessageBox(_("更新建筑失败"))
     return
@@ -225,10 +249,11 @@ def update_platform(self, context:bpy.types.Context):
     # 调用台基缩放
     from . import buildPlatform
     # buildPlatform.resizePlatform(buildingObj)
-    funproxy = partial(
-            buildPlatform.resizePlatform,
-            buildingObj=refObj)
-    utils.fastRun(funproxy)
+    __scheduleUpdate(buildingObj,
+                     buildPlatform.resizePlatform,
+                     refObj,
+                     key=con.LAYER_PLATFORM,
+                     message=_("更新台基"))
 
     return
 
@@ -241,10 +266,11 @@ def update_PillarStyle(self, context:bpy.types.Context):
         # 调用营造序列
         from . import buildFloor
         # buildFloor.buildPillars(buildingObj)
-        funproxy = partial(
-                buildFloor.buildPillars,
-                buildingObj=buildingObj)
-        utils.fastRun(funproxy)
+        __scheduleUpdate(buildingObj,
+                         buildFloor.buildPillars,
+                         buildingObj,
+                         key=(con.LAYER_PILLAR,'style'),
+                         message=_("更新柱样式"))
     else:
         utils.outputMsg("updated building failed, context.object should be buildingObj")
     return
@@ -258,10 +284,11 @@ def update_pillar(self, context:bpy.types.Context):
         # 缩放柱形
         from . import buildFloor
         # buildFloor.resizePillar(buildingObj)
-        funproxy = partial(
-                buildFloor.resizePillar,
-                buildingObj=buildingObj)
-        utils.fastRun(funproxy)
+        __scheduleUpdate(buildingObj,
+                         buildFloor.resizePillar,
+                         buildingObj,
+                         key=(con.LAYER_PILLAR,'size'),
+                         message=_("更新柱"))
     else:
         utils.outputMsg("updated pillar failed, context should be pillarObj")
     return
@@ -270,9 +297,13 @@ def update_pillar(self, context:bpy.types.Context):
 def update_wall_solid(self, context:bpy.types.Context):
     # 执行更新
     from . import buildWall
-    funproxy = partial(buildWall.updateWall,
-                            wallObj=context.object)
-    utils.fastRun(funproxy)
+    buildingObj,bData,oData = utils.getRoot(context.object)
+    __scheduleUpdate(buildingObj,
+                     buildWall.updateWall,
+                     context.object,
+                     argName='wallObj',
+                     key=(con.LAYER_WALL,context.object.name),
+                     message=_("更新装修"))
     
 @check_auto_rebuild
 def update_wall(self, context:bpy.types.Context):
@@ -364,9 +395,12 @@ def update_wall(self, context:bpy.types.Context):
                     if hasattr(walldata,key):
                         walldata[key] = value
         # 执行更新
-        funproxy = partial(buildWall.updateWall,
-                                wallObj=wallUpdate)
-        utils.fastRun(funproxy)
+        __scheduleUpdate(buildingObj,
+                         buildWall.updateWall,
+                         wallUpdate,
+                         argName='wallObj',
+                         key=(con.LAYER_WALL,wallUpdate.name),
+                         message=_("更新装修"))
 
     # 恢复墙体选择
     bpy.ops.object.select_all(action='DESELECT')
@@ -426,7 +460,12 @@ def update_roof(self, context:bpy.types.Context):
     # 确认选中为building节点
     buildingObj,bData,oData = utils.getRoot(context.object)
     if buildingObj != None:
-        bpy.ops.aca.build_roof()
+        rebuild_scheduler.request_rebuild(
+            buildingObj.name,
+            partial(bpy.ops.aca.build_roof,
+                    buildingName=buildingObj.name),
+            key='roof',
+            message=_("生成屋顶"))
 
 # 用户修改屋顶类型时的回调
 @check_auto_rebuild
@@ -41,12 +41,89 @@ class ACA_OT_focusBuilding(bpy.types.Operator):
 
         return {'FINISHED'}
 
+# 260501 分步营造的模态执行
+# 原先fastRun同步执行整个营造，期间blender失去响应，只能靠强制重绘模拟进度
+# 现在由定时器逐步推进营造生成器，每步完成一个图层，步与步之间界面正常刷新，
+# 进度按上次营造中各阶段的实际耗时推算，Esc取消并回滚到营造前的状态
+# 混入类，不是Operator，不会被自动注册
+class ModalStepsMixin:
+    # 视图导航事件，营造过程中仍可以旋转、缩放视图
+    _NAVIGATION_EVENTS = {
+        'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE',
+        'MOUSEMOVE', 'TRACKPADPAN', 'TRACKPADZOOM',
+    }
+
+    def startSteps(self, context, steps, name):
+        # 回滚依赖全局撤销：营造前先记录一步，取消时撤销回这一步，
+        # 不依赖营造过程是否记录过撤销，也不会误撤销之前无关的操作
+        self._canRollback = context.preferences.edit.use_global_undo
+        if self._canRollback:
+            bpy.ops.ed.undo_push(message=_("开始营造"))
+        self._steps = steps
+        build.isFinished = False
+        build.progress = 0
+        utils.beginSteps(name)
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self._cancelSteps(context)
+        if event.type != 'TIMER':
+            if event.type in self._NAVIGATION_EVENTS:
+                return {'PASS_THROUGH'}
+            return {'RUNNING_MODAL'}
+
+        isDone, result = utils.runStep(self._steps)
+        if not isDone:
+            self._redraw(context)
+            return {'RUNNING_MODAL'}
+        # 最后一步结束时，runStep已经刷新界面并设置视角
+
+        self._removeTimer(context)
+        build.isFinished = True
+        self.finishSteps(context, result)
+        return {'FINISHED'}
+
+    def finishSteps(self, context, result):
+        # 由具体的Operator提示结果
+        pass
+
+    def _cancelSteps(self, context):
+        self._removeTimer(context)
+        utils.cancelSteps(self._steps)
+        self._steps = None
+        build.isFinished = True
+        if not self._canRollback:
+            self._redraw(context)
+            self.report({'WARNING'},
+                _("已取消营造，全局撤销已关闭，无法回滚到营造前的状态"))
+            return {'CANCELLED'}
+        # 回滚：记录当前状态后撤销一次，回到营造前记录的撤销步骤
+        bpy.ops.ed.undo_push(message=_("取消营造"))
+        bpy.ops.ed.undo()
+        self._redraw(context)
+        self.report({'WARNING'},_("已取消营造"))
+        return {'CANCELLED'}
+
+    def _removeTimer(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+
+    def _redraw(self, context):
+        for window in context.window_manager.windows:
+            for area in window.screen.areas:
+                area.tag_redraw()
+
 # 生成新建筑
 # 所有自动生成的建筑统一放置在项目的“ACA”collection中
 # 每个建筑用一个empty做为parent，进行树状结构的管理
 # 各个建筑之间的设置参数数据隔离，互不影响
 # 用户在场景中选择时，可自动回溯到该建筑
-class ACA_OT_add_building(bpy.types.Operator):
+class ACA_OT_add_building(ModalStepsMixin,bpy.types.Operator):
     bl_idname="aca.add_newbuilding"
     bl_label = _("添加新建筑")
     bl_options = {'REGISTER', 'UNDO'}
@@ -58,6 +135,14 @@ class ACA_OT_add_building(bpy.types.Operator):
         default=''
     ) # type: ignore
 
+    # 获取用户在面板上选择的模板
+    def __getSelectedTemplate(self):
+        from . import data
+        scnData : data.ACA_data_scene = bpy.context.scene.ACA_data
+        templateList = scnData.templateItem
+        templateIndex = scnData.templateIndex
+        return templateList[templateIndex].name
+
     def execute(self, context):  
         timeStart = time.time()
         # 自动化测试标识
@@ -65,11 +150,7 @@ class ACA_OT_add_building(bpy.types.Operator):
 
         # 如果没有指定模板，从场景数据中获取用户手工的选择
         if self.templateName == '':
-            from . import data
-            scnData : data.ACA_data_scene = bpy.context.scene.ACA_data
-            templateList = scnData.templateItem
-            templateIndex = scnData.templateIndex
-            self.templateName = templateList[templateIndex].name
+            self.templateName = self.__getSelectedTemplate()
         else:
             autotest = True
 
@@ -89,8 +170,25 @@ class ACA_OT_add_building(bpy.types.Operator):
             self.report({'INFO'},message)
         return {'FINISHED'}
 
+    # 260501 从界面点击时，分步营造，可以按Esc取消
+    def invoke(self, context, event):
+        if self.templateName == '':
+            self.templateName = self.__getSelectedTemplate()
+        self._timeStart = time.time()
+        return self.startSteps(context,
+            build.iterBuild(templateName=self.templateName),
+            'build')
+
+    def finishSteps(self, context, result):
+        if 'FINISHED' in result:
+            runTime = time.time() - self._timeStart
+            message = _("从模板样式新建完成！|建筑样式：【%s】 |运行时间：【%.1f秒】") \
+                        % (_(self.templateName,'template'),runTime)
+            utils.popMessageBox(message)
+            self.report({'INFO'},message)
+
 # 更新建筑
-class ACA_OT_update_building(bpy.types.Operator):
+class ACA_OT_update_building(ModalStepsMixin,bpy.types.Operator):
     bl_idname="aca.update_building"
     bl_label = _("更新建筑")
     bl_options = {'REGISTER', 'UNDO'}
@@ -133,6 +231,29 @@ class ACA_OT_update_building(bpy.types.Operator):
             utils.outputMsg(msg)
             self.report({'INFO'},msg)
         return {'FINISHED'}
+
+    # 260501 用户点击“更新建筑”按钮时，分步营造，可以按Esc取消
+    def invoke(self, context, event):
+        if self.buildingName != '':
+            return self.execute(context)
+        buildingObj,bData,objData = utils.getRoot(context.object)
+        if buildingObj == None:
+            utils.popMessageBox(_("此对象并非插件生成，或已经合并，无法操作。"))
+            return {'FINISHED'}
+        self._buildingName = buildingObj.name
+        self._timeStart = time.time()
+        # 强制重新载入素材库
+        return self.startSteps(context,
+            build.iterUpdateBuilding(buildingObj,reloadAssets=True),
+            'updateBuilding')
+
+    def finishSteps(self, context, result):
+        if 'FINISHED' in result:
+            runTime = time.time() - self._timeStart
+            msg = _("更新建筑完成！|建筑样式：【%s】 |运行时间：【%.1f秒】") \
+                        % (self._buildingName,runTime)
+            utils.outputMsg(msg)
+            self.report({'INFO'},msg)
     
 # 删除建筑
 class ACA_OT_del_building(bpy.types.Operator):
@@ -642,8 +763,17 @@ class ACA_OT_build_roof(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
     bl_description = _('重新生成屋顶的梁架、椽架、瓦作')
 
+    # 260501 外部传入的对象，自动重建在定时器中执行时没有上下文对象
+    buildingName: bpy.props.StringProperty(
+        name=_("建筑名称"),
+        default='',
+        options={'HIDDEN','SKIP_SAVE'},
+    ) # type: ignore
+
     def execute(self, context):  
-        buildingObj,bData,objData = utils.getRoot(context.object)
+        buildingObj = bpy.data.objects.get(self.buildingName)
+        if buildingObj == None:
+            buildingObj,bData,objData = utils.getRoot(context.object)
         if buildingObj == None:
             utils.popMessageBox(_("此对象并非插件生成，或已经合并，无法操作。"))
             return {'FINISHED'}
@@ -994,6 +1124,35 @@ class ACA_OT_PROFILE(bpy.types.Operator):
 
         return {'FINISHED'}
 
+# 260501 基准测试，遍历所有模板，记录各操作的耗时，并与上次结果比较
+class ACA_OT_BENCHMARK(bpy.types.Operator):
+    bl_idname="aca.benchmark"
+    bl_label = _("基准测试")
+    bl_options = {'REGISTER'}
+    bl_description = _('遍历所有模板，测试新建、更新、合并、剖视等操作的耗时')
+
+    repeat: bpy.props.IntProperty(
+        name=_("重复次数"),
+        default=3, min=1,
+    ) # type: ignore
+
+    baseline: bpy.props.StringProperty(
+        name=_("比较的基准结果"),
+        description=_("为空时，与上一次的测试结果比较"),
+        subtype='FILE_PATH',
+    ) # type: ignore
+
+    def execute(self, context):
+        from .tools import benchmark
+        filePath, regressions = benchmark.benchmark(
+            repeat=self.repeat,
+            baselinePath=bpy.path.abspath(self.baseline) 
+                if self.baseline else None)
+        self.report({'INFO'},
+            _("基准测试完成，性能退化%d项，结果已保存至: %s") 
+            % (regressions, filePath))
+        return {'FINISHED'}
+
 class ACA_OT_JOIN(bpy.types.Operator):
     bl_idname="aca.join"
     bl_label = _("合并整体")
@@ -29,9 +29,9 @@ if not exist "!destination!" (
     md "!destination!"
 )
 
-rem 拷贝文件，排除指定目录、所有 .blend 后缀的文件、aca_log.txt、.gitignore 以及 package.bat 文件
+rem 拷贝文件，排除指定目录、所有 .blend 后缀的文件、aca_log.txt、.gitignore、package.bat 以及单元测试文件
 robocopy "!source!" "!destination!" /E ^
-/XF *.blend aca_log.txt .gitignore package.bat ^
+/XF *.blend aca_log.txt .gitignore package.bat test_*.py pytest.ini ^
 /XD __pycache__ .vscode .git .trae doc test
 if %errorlevel% leq 3 (
     echo 拷贝成功。
@@ -17,6 +17,10 @@ from .locale.i18n import I18nPrefsMixin
 from .tools.aca_logging import LoggerPrefsMixin
 from .template.template import AssetPrefsMixin
 from .tools.smart_delete import SmartDeleteMixin
+from .buildLayerCache import LayerCachePrefsMixin
+from .buildDiskCache import DiskCachePrefsMixin
+from .tools.rebuild_scheduler import RebuildPrefsMixin
+from .tools import aca_timer
 
 
 class ACA_OT_Preferences(
@@ -25,6 +29,9 @@ class ACA_OT_Preferences(
     I18nPrefsMixin,
     AssetPrefsMixin,
     SmartDeleteMixin,
+    LayerCachePrefsMixin,
+    DiskCachePrefsMixin,
+    RebuildPrefsMixin,
 ):
     bl_idname = __name__.split('.')[0]
 
@@ -61,6 +68,13 @@ class ACA_OT_Preferences(
         # 启用智能删除
         self.draw_smart_delete_prefs(layout)
 
+        # 260501 图层缓存
+        self.draw_layer_cache_prefs(layout)
+        self.draw_disk_cache_prefs(layout)
+
+        # 260501 自动重建延迟
+        self.draw_rebuild_prefs(layout)
+
         # 260210 Windows CLI中文乱码矫正选项：仅在Windows系统上可用
         row = layout.row()
         is_windows = platform.system() == "Windows"
@@ -1662,6 +1676,69 @@ class ACA_PT_yardwall_props(bpy.types.Panel):
                     depress=True,
                     text=_('重新生成院墙'))
                 
+# 260501 “营造耗时”面板，显示上次营造中各图层的耗时分布
+class ACA_PT_timing(bpy.types.Panel):
+    # 常规属性
+    bl_context = "objectmode"       # 关联的上下文，如，objectmode, mesh_edit, armature_edit等
+    bl_region_type = 'UI'           # UI代表sidebar形式
+    bl_space_type = 'VIEW_3D'       # View_3D在viewport中显示
+    
+    # 自定义属性
+    bl_category = _("ACA筑韵古建")               # 标签页名称
+    bl_label = _("营造耗时")     # 面板名称
+    bl_options = {"DEFAULT_CLOSED"}          # 默认折叠
+
+    # 阶段名称
+    STAGE_NAMES = {
+        con.LAYER_PLATFORM: _('台基'),
+        con.LAYER_PILLAR: _('柱网'),
+        con.LAYER_WALL: _('装修'),
+        con.LAYER_DOUGONG: _('斗栱'),
+        con.LAYER_BEAM: _('梁架'),
+        con.LAYER_RAFTER: _('椽望'),
+        con.LAYER_TILE: _('瓦作'),
+        con.LAYER_BALCONY: _('平坐'),
+        'modifier': _('应用修改器'),
+        'cleanup': _('清理'),
+    }
+    # 显示的热点函数数量
+    SPAN_COUNT = 6
+
+    @classmethod 
+    def poll(self, context):
+        return build.isFinished and aca_timer.last_summary is not None
+            
+    def draw(self, context):
+        layout = self.layout
+        summary = aca_timer.last_summary
+        total = summary['total']
+
+        box = layout.box()
+        row = box.row()
+        row.label(text=_("%s：%.2f秒") % (summary['name'], total),
+                  icon='TIME')
+        # 各阶段耗时
+        for stage, seconds in summary['stages'].items():
+            row = box.row()
+            row.progress(
+                type="BAR",
+                factor=seconds / total if total > 0 else 0,
+                text="%s %.2f秒" % (
+                    self.STAGE_NAMES.get(stage, stage), seconds),
+            )
+        
+        # 热点函数
+        spans = sorted(summary['spans'].items(),
+                       key=lambda item: item[1]['time'],
+                       reverse=True)[:self.SPAN_COUNT]
+        if spans:
+            box = layout.box()
+            for name, record in spans:
+                row = box.row()
+                row.label(text=name)
+                row.label(text="%.2f秒 x%d" % (
+                    record['time'], record['count']))
+
 # 面板可见性的通用验证
 def genericPoll(self,context:bpy.types.Context):
     # 版本验证
@@ -7,6 +7,7 @@ import bpy
 from mathutils import Vector
 from typing import List
 from ..tools.boundbox import update_boundbox, fitBoundBox
+from ..tools import aca_index
 from .. import utils
 from ..const import ACA_Consts as con
 from ..data import ACA_data_obj as acaData
@@ -128,8 +129,18 @@ def delComboLevel(comboObj:bpy.types.Object,
 
     return
 
+# 260501 overrides为覆盖模板的参数字典，应用到每一个子建筑
 def buildCombo(
         templateName,
+        overrides:dict = None,
+):
+    return utils.runAllSteps(
+        iterBuildCombo(templateName,overrides=overrides))
+
+# 260501 分步营造组合建筑，逐个单体、逐个图层推进
+def iterBuildCombo(
+        templateName,
+        overrides:dict = None,
 ):
     # 添加combo根节点
     comboObj = __addComboRoot(templateName)
@@ -140,10 +151,11 @@ def buildCombo(
     tempChildren = template.getTemplateChild(templateName)
     for child in tempChildren:
         from .. import build
-        build.buildSingle(
+        yield from build.iterBuildSingle(
             acaType = child['acaType'],
             templateName = child['templateName'],
-            comboObj = comboObj
+            comboObj = comboObj,
+            overrides = overrides,
         )
 
     # 执行组合后处理
@@ -160,14 +172,9 @@ def buildCombo(
                 continue
 
             # 根据spliceid查找建筑
-            fromBuilding = toBuilding = None
-            for obj in bpy.data.objects:
-                if not hasattr(obj,'ACA_data'):
-                    continue
-                if obj.ACA_data.splice_id == paraList[0]:
-                    fromBuilding = obj
-                if obj.ACA_data.splice_id == paraList[1]:
-                    toBuilding = obj
+            # 260501 查找场景索引，不再为每条后处理遍历全部对象
+            fromBuilding = aca_index.find_by_splice_id(paraList[0])
+            toBuilding = aca_index.find_by_splice_id(paraList[1])
             if fromBuilding is None or toBuilding is None:
                 utils.outputMsg(_("后处理异常：无法匹配建筑splice_id"))
                 continue
@@ -187,6 +194,18 @@ def updateCombo(buildingObj:bpy.types.Object,
                 reloadAssets=False,
                 resetFloor=False,
                 resetRoof=False,):
+    return utils.runAllSteps(iterUpdateCombo(
+        buildingObj,
+        reloadAssets=reloadAssets,
+        resetFloor=resetFloor,
+        resetRoof=resetRoof,
+    ))
+
+# 260501 分步刷新组合建筑，逐个单体、逐个图层推进
+def iterUpdateCombo(buildingObj:bpy.types.Object,
+                reloadAssets=False,
+                resetFloor=False,
+                resetRoof=False,):
     # 确保延迟导入的模块已加载
     _ensure_imports()
     
@@ -249,12 +268,13 @@ def updateCombo(buildingObj:bpy.types.Object,
         if resetFloor:
             buildFloor.resetFloor(childBuilding,
                 comboObj=comboObj)
+            yield childBuilding.name
         # 重做屋顶
         elif resetRoof:
-            buildRoof.buildRoof(childBuilding)
+            yield from buildRoof.iterBuildRoof(childBuilding)
         # 全部重做
         else:
-            buildFloor.buildFloor(childBuilding,
+            yield from buildFloor.iterBuildFloor(childBuilding,
                     reloadAssets=reloadAssets,
                     comboObj=comboObj)
             
@@ -1422,6 +1442,8 @@ def addCombo(buildingList:List[bpy.types.Object]):
             comboNewColl.objects.link(obj)
 
         # 删除combo Coll
+        # 260501 老combo根节点等剩余对象一并批量删除
+        utils.deleteObjects(comboColl.objects)
         bpy.data.collections.remove(comboColl)  
 
     # 调整comboNewObj的大小，包裹所有子对象
@@ -48,50 +48,138 @@ def __getPath(fileName):
     srcPath = USER / "scripts/addons" / addonName / templateFolder / fileName
     return str(srcPath)
 
+# 260501 模板库缓存
+# template.xml、assetsIndex.xml只在文件修改后重新解析，
+# 原先新建一座建筑要解析同一个文件三次以上，组合建筑每个子建筑再解析一次
+# {文件名: (修改时间, 文件大小, 解析结果)}
+__xmlCache = {}
+
+# 读取解析结果，文件修改时间或大小变化时重新解析
+def __loadXml(fileName, parser):
+    path = __getPath(fileName)
+    stat = os.stat(path)
+    cached = __xmlCache.get(fileName)
+    if (cached is not None
+            and cached[0] == stat.st_mtime_ns
+            and cached[1] == stat.st_size):
+        return cached[2]
+    root = ET.parse(path).getroot()
+    result = parser(root)
+    __xmlCache[fileName] = (stat.st_mtime_ns, stat.st_size, result)
+    return result
+
+# 保存、删除模板后，丢弃缓存
+def __dropXmlCache(fileName):
+    __xmlCache.pop(fileName, None)
+    return
+
+# 解析一个模板节点，节点值预先按类型转换
+# 子模板（组合建筑）递归解析
+def __parseTemplateNode(templateNode):
+    nameNode = templateNode.find('template_name')
+    typeNode = templateNode.find('aca_type')
+    dkNode = templateNode.find('DK')
+    pdNode = templateNode.find('pillar_diameter')
+    entry = {
+        'name': nameNode.text if nameNode is not None else None,
+        'aca_type': typeNode.text if typeNode is not None else None,
+        'DK': round(float(dkNode.text),3) if dkNode is not None else None,
+        'pillar_diameter': (round(float(pdNode.text),3)
+                            if pdNode is not None else None),
+        # 按节点顺序的键值 (tag, value, isCollection)
+        # 集合的value为各子项的键值列表
+        'values': [],
+        # 子模板 {名称: 模板}，及其顺序
+        'children': {},
+        'childNames': [],
+    }
+    for node in templateNode:
+        if node.tag == 'template':
+            child = __parseTemplateNode(node)
+            if child['name'] is None:
+                continue
+            entry['children'].setdefault(child['name'], child)
+            entry['childNames'].append(child['name'])
+            continue
+        if node.attrib['type'] == 'CollectionProperty':
+            items = []
+            for subnode in node:
+                items.append([__readNode(subsubNode)
+                              for subsubNode in subnode])
+            entry['values'].append((node.tag, items, True))
+        else:
+            tag, value = __readNode(node)
+            entry['values'].append((tag, value, False))
+    return entry
+
+# 解析template.xml
+def __parseTemplates(root):
+    templates = {}
+    names = []
+    for templateNode in root.findall('template'):
+        entry = __parseTemplateNode(templateNode)
+        if entry['name'] is None:
+            continue
+        # 与原先的顺序查找一致，重名时取第一个
+        templates.setdefault(entry['name'], entry)
+        names.append(entry['name'])
+    return {'templates': templates, 'names': names}
+
+# 解析assetsIndex.xml
+def __parseAssets(root):
+    assets = []
+    for node in root:
+        asset = {
+            'tag': node.tag,
+            'type': node.attrib['type'],
+            'key': node.attrib.get('key'),
+            'text': node.text,
+            'items': [(item.attrib.get('style'), item.text)
+                      for item in node.findall('item')],
+        }
+        assets.append(asset)
+    return assets
+
+# 获取模板库
+def __getTemplates():
+    return __loadXml(xmlFileName, __parseTemplates)
+
+# 获取资产索引
+def __getAssets():
+    return __loadXml(assetsFileName, __parseAssets)
+
+# 查找资产索引中的配置
+def __findAsset(assetName):
+    for asset in __getAssets():
+        if asset['tag'] == assetName:
+            return asset
+    return None
+
 # 解析XML，获取模板列表
 def getTemplateList(onlyname=False):
     # 载入XML
     # 这个结果打包发布后出现错误，改为绝对路径
     # path = os.path.join(templateFolder, xmlFileName)
-    path = __getPath(xmlFileName)
-    tree = ET.parse(path)
-    root = tree.getroot()
-    templates = root.findall('template')
-
+    # 260501 从模板库缓存读取
     template_list = []
-    for template in templates:
-        tname = template.find('template_name')
-        if  tname != None:
-            template_name = tname.text
-            if onlyname:
-                template_list.append(template_name)
-            else:
-                template_list.append(
-                    (template_name,template_name,template_name))
+    for template_name in __getTemplates()['names']:
+        if onlyname:
+            template_list.append(template_name)
+        else:
+            template_list.append(
+                (template_name,template_name,template_name))
             
     return template_list
 
 # 根据选择的模板，获取模板类型（房屋、院墙）
 def getBuildingType(templateName):
-    # 载入XML
-    # 这个结果打包发布后出现错误，改为绝对路径
-    # path = os.path.join(templateFolder, xmlFileName)
-    path = __getPath(xmlFileName)
-    tree = ET.parse(path)
-    root = tree.getroot()
-    templates = root.findall('template')
-
     # 有些模板没有这个类型值，默认置为普通building
     typeName = con.ACA_TYPE_BUILDING
 
-    template_list = []
-    for template in templates:
-        tname = template.find('template_name')
-        if  tname.text == templateName:
-            typeNode = template.find('aca_type')
-            if typeNode != None:
-                typeName = typeNode.text
-            break
+    # 260501 从模板库缓存读取
+    template = __getTemplates()['templates'].get(templateName)
+    if template is not None and template['aca_type'] is not None:
+        typeName = template['aca_type']
             
     return typeName
 
@@ -105,21 +193,16 @@ def getBuildingType(templateName):
 def getDougongList():
     dougong_list = []
 
-    # 载入XML
-    path = __getPath(assetsFileName)
-    tree = ET.parse(path)
-    # 根节点<assets>
-    root = tree.getroot()
     # 查找“柱头科”配置
-    dgPillarNode = root.find('dg_pillar_source')
+    # 260501 从资产索引缓存读取
+    dgPillarNode = __findAsset('dg_pillar_source')
     if dgPillarNode != None:
         # 判断type属性
-        type = dgPillarNode.attrib['type']
+        type = dgPillarNode['type']
         if type == 'List':
             # 查找“item”子节点
-            items = dgPillarNode.findall('item')
-            for n,item in enumerate(items):
-                dgStyle = item.attrib['style']
+            items = dgPillarNode['items']
+            for n,(dgStyle,itemText) in enumerate(items):
                 # 斗栱名称国际化
                 displayName = _(dgStyle, "assetsIndex")
                 dougong_list.append(
@@ -178,29 +261,17 @@ def updateDougongData(buildingObj:bpy.types.Object,
     
     # 1.2、更新aData中的斗栱样式
     if reloadAssets:
+        # 260501 各样式资产一次载入
         __updateAssetStyle(
-            buildingObj,'dg_pillar_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_fillgap_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_fillgap_alt_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_corner_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_balcony_pillar_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_balcony_corner_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_balcony_fillgap_source',
-            parent=dgrootObj)
-        __updateAssetStyle(
-            buildingObj,'dg_balcony_fillgap_alt_source',
+            buildingObj,
+            ('dg_pillar_source',
+             'dg_fillgap_source',
+             'dg_fillgap_alt_source',
+             'dg_corner_source',
+             'dg_balcony_pillar_source',
+             'dg_balcony_corner_source',
+             'dg_balcony_fillgap_source',
+             'dg_balcony_fillgap_alt_source',),
             parent=dgrootObj)
         if (aData.dg_pillar_source == None
                 or aData.dg_fillgap_source == None
@@ -254,59 +325,57 @@ def updateDougongData(buildingObj:bpy.types.Object,
     return
 
 # 更新资产样式
+# 260501 assetNames为多个资产配置，共用一次资产库读取
 def __updateAssetStyle(buildingObj:bpy.types.Object,
-                     assetName='',
+                     assetNames=(),
                      parent=None): 
     # 载入数据
     bData:acaData = buildingObj.ACA_data  
     aData : tmpData = bpy.context.scene.ACA_temp
-    # 载入XML
-    path = __getPath(assetsFileName)
-    tree = ET.parse(path)
-    # 根节点<assets>
-    root = tree.getroot()
-    # 查找配置
-    assetNode = root.find(assetName)
-    if assetNode != None:
+    # 各资产配置对应的资产名称
+    styleAssets = {}
+    for assetName in assetNames:
+        # 查找配置
+        # 260501 从资产索引缓存读取
+        assetNode = __findAsset(assetName)
+        if assetNode is None:
+            continue
         # 判断type属性
-        type = assetNode.attrib['type']
-        if type == 'List':
-            # 获取样式定义，是指bData中定义的变量名称
-            styleKey = assetNode.attrib['key']
-            # 有些配置可能太老，导致部分styleKey缺失
-            if styleKey in bData:
-                # styleValue为了样式下拉框能自动选中，
-                # 在载入样式时自动转为了int，这里要转为str与xml比较
-                styleValue = int(bData[styleKey])
-                # 查找“item”子节点
-                items = assetNode.findall('item')
-                for n,item in enumerate(items):
-                    if n == styleValue:
-                        # 250104 为了解决以下报错，做的安全性验证
-                        # 似乎是4.2中做了一个Breaking changes：Statically Typed IDProperties
-                        # https://developer.blender.org/docs/release_notes/4.2/python_api/#statically-typed-idproperties
-                        # TypeError: Cannot assign a 'Object' value to the existing 'dg_pillar_source' Group IDProperty
-                        if assetName in aData:  
-                            # 250907 删除老资产对象
-                            utils.deleteHierarchy(aData[assetName],del_parent=True)
-                            # del aData[assetName]
-                            
-                        # # 个性化样式资产，不采用link方式，而是复制到各个建筑内
-                        # aData[assetName] = loadAssets(
-                        #     item.text,link=False,parent=parent)
-                        # 260329 个性化资产也采用link方式，
-                        aData[assetName] = loadAssets(
-                            item.text,link=True,parent=parent)
+        if assetNode['type'] != 'List':
+            continue
+        # 获取样式定义，是指bData中定义的变量名称
+        styleKey = assetNode['key']
+        # 有些配置可能太老，导致部分styleKey缺失
+        if styleKey not in bData:
+            continue
+        # styleValue为了样式下拉框能自动选中，
+        # 在载入样式时自动转为了int，这里要转为str与xml比较
+        styleValue = int(bData[styleKey])
+        # 查找“item”子节点
+        items = assetNode['items']
+        if 0 <= styleValue < len(items):
+            styleAssets[assetName] = items[styleValue][1]
+    if not styleAssets:
+        return
+
+    # 260329 个性化资产也采用link方式，
+    assetObjs = loadAssetList(styleAssets.values())
+    for assetName,itemText in styleAssets.items():
+        # 250104 为了解决以下报错，做的安全性验证
+        # 似乎是4.2中做了一个Breaking changes：Statically Typed IDProperties
+        # https://developer.blender.org/docs/release_notes/4.2/python_api/#statically-typed-idproperties
+        # TypeError: Cannot assign a 'Object' value to the existing 'dg_pillar_source' Group IDProperty
+        if assetName in aData:  
+            # 250907 删除老资产对象
+            # 260501 链接的资产在各建筑间共用，不再删除，只删除复制的资产
+            oldAsset = aData[assetName]
+            if oldAsset is not None and oldAsset.library is None:
+                utils.deleteHierarchy(oldAsset,del_parent=True)
+        aData[assetName] = assetObjs[itemText]
     return
 
-# 载入Blender中的资产
-# 参考教程：https://b3d.interplanety.org/en/appending-all-objects-from-the-external-blend-file-to-the-scene-with-blender-python-api/
-# 参考文档：https://docs.blender.org/api/current/bpy.types.BlendDataLibraries.html
-def loadAssets(assetName : str,
-               parent:bpy.types.Object=None,
-               hide=True,
-               link=True):   
-    import os
+# 查找资产库文件
+def __getAssetLibPath():
     # 查找默认插件目录下的素材库
     filepath = __getPath(blenderFileName)
     # 如果找不到文件，尝试查找用户自定义路径
@@ -318,21 +387,89 @@ def loadAssets(assetName : str,
         filepath = addon_prefs.filepath    
     if not os.path.exists(filepath):
         raise FileNotFoundError(_("无法打开资产库，请确认已经按照使用手册，关联了acaAssets.blend文件。"))   
+    return filepath
+
+# 260501 资产库的标识（路径，修改时间），用于图层缓存和磁盘缓存的键
+# 资产库替换或修改后，缓存的构件随之失效
+# 找不到资产库时返回None
+def getAssetLibIdentity():
+    try:
+        filepath = __getAssetLibPath()
+    except FileNotFoundError:
+        return None
+    filepath = os.path.normcase(os.path.abspath(filepath))
+    return (filepath, os.path.getmtime(filepath))
+
+# 260501 已链接资产库的修改时间 {资产库路径: 修改时间}
+# 资产库文件修改后，重新载入已链接的资产
+__assetLibMtime = {}
+
+# 查找已链接的资产库
+def __getLinkedLibrary(filepath):
+    filepath = os.path.normcase(os.path.abspath(filepath))
+    for library in bpy.data.libraries:
+        libPath = bpy.path.abspath(library.filepath)
+        if os.path.normcase(os.path.abspath(libPath)) == filepath:
+            return library
+    return None
+
+# 260501 批量载入资产
+# 所有缺少的资产在一次libraries.load中载入，
+# 已经链接、且资产库未修改的资产直接复用，组合建筑的各个单体共用
+# 返回{资产名称: 资产对象}
+def loadAssetList(assetNames, link=True):
+    filepath = __getAssetLibPath()
+    assetNames = list(dict.fromkeys(assetNames))
+    assetObjs = {}
+    missing = assetNames
+    if link:
+        library = __getLinkedLibrary(filepath)
+        if library is not None:
+            # 资产库文件已修改，重新载入
+            mtime = os.path.getmtime(filepath)
+            if __assetLibMtime.get(filepath, mtime) != mtime:
+                library.reload()
+            __assetLibMtime[filepath] = mtime
+            missing = []
+            for assetName in assetNames:
+                assetObj = bpy.data.objects.get(
+                    (assetName, library.filepath))
+                if assetObj is not None:
+                    assetObjs[assetName] = assetObj
+                else:
+                    missing.append(assetName)
+    if not missing:
+        return assetObjs
 
     # 简化做法，效率更高，但没有关联子对象
     try:
         with bpy.data.libraries.load(filepath,link=link) as (data_from, data_to):
-            data_to.objects = [name for name in data_from.objects if name==assetName]
+            requested = [name for name in data_from.objects
+                         if name in missing]
+            data_to.objects = list(requested)
     except OSError:
         raise Exception(_('无法打开资产库，请确认acaAssets.blend文件已经放入插件目录'))
-    # 验证找到的资产是否唯一
-    if len(data_to.objects) == 0:
-        raise Exception(_("资产[%s]载入失败，请检查是否关联最新版本的acaAssets.blend资产库。") % (assetName))
-    if len(data_to.objects) > 1:
-        utils.outputMsg(_("无法定位唯一的资产:") + assetName)
-        return 
-    
-    sourceObj = data_to.objects[0]
+    for assetName,assetObj in zip(requested,data_to.objects):
+        if assetObj is not None:
+            assetObjs[assetName] = assetObj
+    if link:
+        __assetLibMtime[filepath] = os.path.getmtime(filepath)
+
+    # 验证找到的资产
+    for assetName in missing:
+        if assetName not in assetObjs:
+            raise Exception(_("资产[%s]载入失败，请检查是否关联最新版本的acaAssets.blend资产库。") % (assetName))
+    return assetObjs
+
+# 载入Blender中的资产
+# 参考教程：https://b3d.interplanety.org/en/appending-all-objects-from-the-external-blend-file-to-the-scene-with-blender-python-api/
+# 参考文档：https://docs.blender.org/api/current/bpy.types.BlendDataLibraries.html
+def loadAssets(assetName : str,
+               parent:bpy.types.Object=None,
+               hide=True,
+               link=True):   
+    # 260501 与批量载入共用，已链接的资产直接复用
+    sourceObj = loadAssetList([assetName],link=link)[assetName]
     if link:
         # 直接返回引用
         # bpy.context.collection.objects.link(sourceObj)
@@ -413,26 +550,24 @@ def loadAssetByBuilding(buildingObj:bpy.types.Object):
     aData : tmpData = bpy.context.scene.ACA_temp
 
     # 解析XML配置模板
-    path = __getPath(assetsFileName)
-    tree = ET.parse(path)
-    root = tree.getroot()
-    
+    # 260501 从资产索引缓存读取
     # 填充
-    for node in root:
-        tag = node.tag
-        type = node.attrib['type']
-        value = node.text
-        # 静态的模板对象声明为Object
-        # 动态的模板对象声明为List，
-        # 不在这里处理，而拆分到类似updateDougongData的定制方法中处理
-        if type == 'Object':
-            # 241224 为了解决以下报错，做的安全性验证
-            # 似乎是4.2中做了一个Breaking changes：Statically Typed IDProperties
-            # https://developer.blender.org/docs/release_notes/4.2/python_api/#statically-typed-idproperties
-            # TypeError: Cannot assign a 'Object' value to the existing 'mat_wood' Group IDProperty
-            if tag in aData:  
-                del aData[tag]  
-            aData[tag] = loadAssets(value)
+    # 静态的模板对象声明为Object
+    # 动态的模板对象声明为List，
+    # 不在这里处理，而拆分到类似updateDougongData的定制方法中处理
+    objectNodes = [node for node in __getAssets()
+                   if node['type'] == 'Object']
+    # 260501 所有资产一次载入，不再逐个打开资产库
+    assetObjs = loadAssetList(node['text'] for node in objectNodes)
+    for node in objectNodes:
+        tag = node['tag']
+        # 241224 为了解决以下报错，做的安全性验证
+        # 似乎是4.2中做了一个Breaking changes：Statically Typed IDProperties
+        # https://developer.blender.org/docs/release_notes/4.2/python_api/#statically-typed-idproperties
+        # TypeError: Cannot assign a 'Object' value to the existing 'mat_wood' Group IDProperty
+        if tag in aData:  
+            del aData[tag]  
+        aData[tag] = assetObjs[node['text']]
 
     # 3、其他个性化处理
     # 提取斗栱自定义属性，填充入bData
@@ -446,134 +581,140 @@ def loadAssetByBuilding(buildingObj:bpy.types.Object):
     return
 
 def getTemplateChild(templateName):
-    path = __getPath(xmlFileName)
-    tree = ET.parse(path)
-    root = tree.getroot()
-    templates = root.findall('template')
-
+    # 260501 从模板库缓存读取
     tempChildren = []
-    for template in templates:
-        tname = template.find('template_name')
-        if tname == None: 
-            continue
-        if tname.text == templateName:
-            children = template.findall('template')
-            for child in children:
-                tname = child.find('template_name')
-                ttype = child.find('aca_type')
-                tempChildren.append(
-                    {
-                        'templateName': tname.text,
-                        'acaType' : ttype.text,
-                    }
-                )
+    template = __getTemplates()['templates'].get(templateName)
+    if template is None:
+        return tempChildren
+    for childName in template['childNames']:
+        child = template['children'][childName]
+        tempChildren.append(
+            {
+                'templateName': child['name'],
+                'acaType' : child['aca_type'],
+            }
+        )
     return tempChildren
 
 def __loadTemplateSingle(
         buildingObj:bpy.types.Object,
         template,
         isComboNode, # 是否为复合模版
+        overrides:dict = None, # 覆盖模板的参数
     ):    
     # 载入数据
     bData:acaData = buildingObj.ACA_data
     
     # 初始化bData默认值，根据DK/PD实时刷新一次
     # 斗口
-    dk = template.find('DK')
-    if dk != None: 
-        bData['DK'] = round(float(dk.text),3)
+    if template['DK'] is not None: 
+        bData['DK'] = template['DK']
     # 柱径
-    pd = template.find('pillar_diameter')
-    if pd != None:
-        bData['pillar_diameter'] = round(float(pd.text),3)
+    if template['pillar_diameter'] is not None:
+        bData['pillar_diameter'] = template['pillar_diameter']
     # 刷新bData默认值
     bData = loadDefaultData(buildingObj)
 
     # 遍历所有子节点，并绑定到对应属性
-    for node in template:
-        # 针对combo模板，跳过子模板解析
-        if node.tag == 'template':
-            continue
-
-        tag = node.tag
-        type = node.attrib['type']
-        value = node.text
-        
-        # 260421 填充aca_id
-        if tag == 'aca_id':
-            if isComboNode:
-                # 复合模版使用模版中的aca_id，以便获得正确的父子关系
-                # 这样楼阁之类才能进行新增楼阁等二次修改
-                value = node.text
-            else:
-                # 单体模版的aca_id随机生成
-                value = utils.generateID()
-        
+    # 260501 模板库缓存中已按类型转换，子模板也已单独存放
+    for tag,value,isCollection in template['values']:
         # 读取集合配置
-        if type == 'CollectionProperty':
-            for subnode in node:
+        if isCollection:
+            for subValues in value:
                 # 在bDate.xxxList下新建子节点
                 subitem = getattr(bData,tag).add()
                 # 循环载入该子节点的配置项
-                for subsubNode in subnode:
-                    subtag,subvalue = __readNode(subsubNode)
+                for subtag,subvalue in subValues:
                     subitem[subtag] = subvalue
-        else:
-            tag,value = __readNode(node)
-            bData[tag] = value
+            continue
+
+        # 260421 填充aca_id
+        if tag == 'aca_id' and not isComboNode:
+            # 单体模版的aca_id随机生成
+            # 复合模版使用模版中的aca_id，以便获得正确的父子关系
+            value = utils.generateID()
+        bData[tag] = value
+
+    # 260501 以外部参数覆盖模板设置，如批量生成时的参数变体
+    if overrides:
+        __applyOverrides(buildingObj,overrides)
 
     # 填充建筑使用的资产对象，根据其中的dg_style等不同，载入不同的资产样式
     loadAssetByBuilding(buildingObj)
 
     return
 
+# 260501 以外部参数覆盖bData
+# 与载入模板一样直接写入，不触发update回调
+# 参数值可以是字符串（如CSV中读取），按属性类型转换
+def __applyOverrides(buildingObj:bpy.types.Object,
+                     overrides:dict):
+    bData:acaData = buildingObj.ACA_data
+    for key,value in overrides.items():
+        prop = bData.bl_rna.properties.get(key)
+        if prop is None or key in ('rna_type','name'):
+            raise Exception(_("无法识别的参数：%s") % (key))
+        if prop.type in ('COLLECTION','POINTER'):
+            raise Exception(_("不支持覆盖该参数：%s") % (key))
+        
+        if prop.type == 'ENUM':
+            # 可以传入枚举的标识或数值
+            if isinstance(value,str) and value in prop.enum_items:
+                value = prop.enum_items[value].value
+            value = int(value)
+        elif prop.type in ('FLOAT','INT') and prop.array_length > 0:
+            # 将字符串'0,0,0'转换为元组(0,0,0)
+            if isinstance(value,str):
+                value = value.split(',')
+            value = tuple(float(v) for v in value)
+        elif prop.type == 'FLOAT':
+            value = round(float(value),3)
+        elif prop.type == 'INT':
+            value = int(value)
+        elif prop.type == 'BOOLEAN':
+            if isinstance(value,str):
+                value = value.lower() in ('true','1','yes')
+            value = bool(value)
+        else:
+            value = str(value)
+        bData[key] = value
+    return
+
 # 载入模板
 # 直接将XML填充入bData
 # 注意，所有的属性都为选填，所以要做好空值的检查
+# 260501 overrides为覆盖模板的参数字典，如{'DK':0.08}
 def loadTemplate(buildingObj:bpy.types.Object,
-                 templateName:str):    
+                 templateName:str,
+                 overrides:dict = None):    
     # 解析XML配置模板
-    path = __getPath(xmlFileName)
-    tree = ET.parse(path)
-    root = tree.getroot()
-    
-    # 读取所有根节点模板
-    templateNodeList = root.findall('template')
-    if templateNodeList == None:
-        raise Exception(_("模板解析失败"))
+    # 260501 从模板库缓存读取
+    templates = __getTemplates()['templates']
     
     # 查找是否有子模版
     parent = buildingObj.parent
     isComboNode = False
     if parent is not None:
-        # 遍历查找对应的combo节点
-        for templateNode in templateNodeList:
-            nameNode = templateNode.find('template_name')
-            if nameNode != None:
-                if nameNode.text == parent.ACA_data.template_name:
-                    # 找到对应模板
-                    isComboNode = True
-                    break
-        if isComboNode:
-            # 把combo父节点装载入templateNodeList
-            # 供下面的循环遍历
-            root = templateNode
-            templateNodeList = root.findall('template')
+        # 查找对应的combo节点
+        comboTemplate = templates.get(parent.ACA_data.template_name)
+        if comboTemplate is not None:
+            # 找到对应模板
+            isComboNode = True
+            # 在combo父节点的子模板中查找
+            templates = comboTemplate['children']
         else:
             raise Exception(_("找不到父模板%s，无法载入子模版") % (parent.name))
     
     # 在根层次中查找对应名称的那个模板
-    for template in templateNodeList:
-        # 查看是否有子模版
-        nameNode = template.find('template_name')
-        if nameNode != None:
-            if nameNode.text == templateName:
-                __loadTemplateSingle(
-                    buildingObj,
-                    template,
-                    isComboNode, # 是否为复合模版
-                )
-                return
+    template = templates.get(templateName)
+    if template is not None:
+        __loadTemplateSingle(
+            buildingObj,
+            template,
+            isComboNode, # 是否为复合模版
+            overrides,
+        )
+        return
                     
     # 经过经过以上循环，没有符合条件的模板，抛出异常
     raise Exception(_('无法载入模板'))
@@ -769,6 +910,8 @@ def __saveTemplate(buildingObj:bpy.types.Object):
     ET.indent(tree, space="\t", level=0)
     # 保存
     tree.write(path, encoding='UTF-8',xml_declaration=True)
+    # 260501 丢弃模板库缓存
+    __dropXmlCache(xmlFileName)
 
     return {'FINISHED'}
 
@@ -813,6 +956,8 @@ def delTemplate(templateName):
     ET.indent(tree, space="\t", level=0)
     # 保存
     tree.write(path, encoding='UTF-8',xml_declaration=True)
+    # 260501 丢弃模板库缓存
+    __dropXmlCache(xmlFileName)
 
     return {'FINISHED'}
 
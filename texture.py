@@ -6,9 +6,11 @@ from .locale.i18n import _
 import bpy
 import bmesh
 import math
+import numpy as np
 from mathutils import Vector
 
 from . import utils
+from .tools import aca_timer
 from .const import ACA_Consts as con
 from .data import ACA_data_obj as acaData
 from .data import ACA_data_template as tmpData
@@ -81,6 +83,7 @@ def __copyUV(
     return
 
 # 展UV，提供了多种不同的方式
+@aca_timer.timed
 def UvUnwrap(object:bpy.types.Object,
              type=None,
              scale=None,
@@ -102,6 +105,10 @@ def UvUnwrap(object:bpy.types.Object,
     # 非Mesh对象不能展UV
     if object.type not in ('MESH'):
         return
+
+    # 260501 草图模式不展UV
+    if utils.isDraftMode():
+        return
     
     # 260320 applyAllModifier中调用了bpy.ops.object.convert
     # 极大的拖累了blender 5.1下的性能，已经屏蔽
@@ -670,12 +677,11 @@ def __setMatByID(
         object:bpy.types.Object,
         id=0,
 ):
-    bm = bmesh.new()
-    bm.from_mesh(object.data)
-    for face in bm.faces:
-        face.material_index = id
-    bm.to_mesh(object.data)
-    bm.free()
+    # 260501 直接批量写入material_index，不再经过bmesh
+    mesh:bpy.types.Mesh = object.data
+    mesh.polygons.foreach_set('material_index',
+        np.full(len(mesh.polygons), id, dtype=np.int32))
+    mesh.update()
     return
 
 # 平铺材质
@@ -1215,56 +1221,54 @@ def __setShanhua(shanhuaObj:bpy.types.Object,
                       cleanup=True)
     return shanhuaObj
 
+# 按查找表批量切换材质slot
+# lut[原slot] = 新slot，超出查找表的slot不做改变
+def __remapSlot(obj:bpy.types.Object,
+                lut:np.ndarray):
+    mesh:bpy.types.Mesh = obj.data
+    slots = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', slots)
+    inRange = slots < len(lut)
+    slots[inRange] = lut[slots[inRange]]
+    mesh.polygons.foreach_set('material_index', slots)
+    mesh.update()
+    return
+
+# 构造slot查找表
+# slotPairs: [(原slot,新slot),...]
+def __slotLut(slotPairs):
+    lut = np.arange(max(fromSlot for fromSlot,toSlot in slotPairs)+1,
+                    dtype=np.int32)
+    for fromSlot,toSlot in slotPairs:
+        lut[fromSlot] = toSlot
+    return lut
+
 # 切换材质slot
+# 260501 改为foreach批量读写material_index，不再经过bmesh
 def __replaceSlot(obj:bpy.types.Object,
                   fromSlot=None,
                   toSlot=0,):
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
-    for face in bm.faces:
-        # 如果指定fromSlot，则判断原材质是否匹配
-        if (fromSlot != None and 
-            face.material_index != fromSlot):
-                # 不匹配原材质，不做改变
-                pass
-        else:
-            face.material_index = toSlot
-    bm.to_mesh(obj.data)
-    bm.free()
+    if fromSlot == None:
+        # 未指定fromSlot，全部切换
+        __setMatByID(obj,toSlot)
+    else:
+        __remapSlot(obj,__slotLut([(fromSlot,toSlot)]))
     return
 
-# 根据琉璃瓦作配色
-# 根据用户从panel上选择的bData.tile_style，切换obj的材质slot
-# 0-黄琉璃
-# 1-黄琉璃绿剪边
-# 2-绿琉璃
-# 3-绿琉璃黄剪边
-def setGlazeStyle(paintObj:bpy.types.Object,
-                  resetUV=True):
-    # 载入数据
-    aData:tmpData = bpy.context.scene.ACA_temp
-    buildingObj,bData,objData = utils.getRoot(paintObj)
-    paintName = paintObj.data.name
-
-    # 2. override，全局覆盖的着色方式
-    paintStyle = bData.paint_style
-    if paintStyle == '2': 
-        mat = aData.mat_override
-        paintObj = __paintMat(paintObj, mat)
-        return
+# 260501 琉璃配色查找表，{资产网格名称:(slot查找表,激活的slot)}
+# 按配色和资产缓存，一次营造只需构造一次
+__glazeTable = (None,None)
 
+# 获取琉璃配色查找表
+def getGlazeTable(bData:acaData):
+    global __glazeTable
+    aData:tmpData = bpy.context.scene.ACA_temp
     # 1、瓦面（筒瓦/板瓦）颜色
     tileColorIndex = int(bData.tile_color) 
     glazeMain = [
         aData.flatTile_source,      # 板瓦
         aData.circularTile_source,  # 筒瓦
     ]
-    for obj in glazeMain:
-        if obj.data.name in paintName:
-            # 配色从slot0切换到slot1
-            __replaceSlot(paintObj,0,tileColorIndex)
-            paintObj.active_material_index = tileColorIndex
-
     # 2、剪边/屋脊的颜色
     # 2.1、单一材质
     tileAltColorIndex = int(bData.tile_alt_color)
@@ -1288,12 +1292,6 @@ def setGlazeStyle(paintObj:bpy.types.Object,
         aData.paoshou_10_source,    # 跑兽
         aData.baoding_source,       # 宝顶
     ] 
-    for obj in glazeList1:
-        if obj.data.name in paintName:
-            # 配色从slot0切换到slot1
-            __replaceSlot(
-                paintObj,0,tileAltColorIndex)
-            paintObj.active_material_index = tileAltColorIndex
     # 2.2、两个材质
     glazeList2 = [
         aData.dripTile_source,      # 滴水
@@ -1301,14 +1299,96 @@ def setGlazeStyle(paintObj:bpy.types.Object,
         aData.ridgeEnd_source,      # 端头盘子
         aData.chuishou_source,      # 垂兽
     ]
-    for obj in glazeList2:
-        if obj.data.name in paintName:
-            # 两个材质切换到绿色
-            __replaceSlot(
-                paintObj,0,tileAltColorIndex*2)
-            __replaceSlot(
-                paintObj,1,tileAltColorIndex*2+1)
-            paintObj.active_material_index = tileAltColorIndex*2
+    glazeLists = (
+        # 配色从slot0切换到slot1
+        (glazeMain,[(0,tileColorIndex)],tileColorIndex),
+        (glazeList1,[(0,tileAltColorIndex)],tileAltColorIndex),
+        # 两个材质切换到绿色
+        (glazeList2,[(0,tileAltColorIndex*2),
+                     (1,tileAltColorIndex*2+1)],tileAltColorIndex*2),
+    )
+    key = (tileColorIndex,tileAltColorIndex,
+           tuple(obj.data.name 
+                 for objList,slotPairs,activeIndex in glazeLists
+                 for obj in objList))
+    if __glazeTable[0] == key:
+        return __glazeTable[1]
+    
+    table = {}
+    for objList,slotPairs,activeIndex in glazeLists:
+        lut = __slotLut(slotPairs)
+        for obj in objList:
+            table.setdefault(obj.data.name,(lut,activeIndex))
+    __glazeTable = (key,table)
+    return table
+
+# 按网格名称匹配琉璃配色，返回[(slot查找表,激活的slot),...]
+# 复制的网格名称带有'.001'等后缀，先去掉后缀直接查找，
+# 找不到时再逐个资产做名称包含判断
+def __matchGlaze(glazeTable:dict,paintName:str):
+    name = paintName
+    while True:
+        if name in glazeTable:
+            return [glazeTable[name]]
+        base,sep,suffix = name.rpartition('.')
+        if not sep or not suffix.isdigit():
+            break
+        name = base
+    return [glaze for assetName,glaze in glazeTable.items()
+            if assetName in paintName]
+
+# 按资产对象构造琉璃配色的slot查找表，供utils.instanceMesh使用
+# 返回{资产副本名称:slot查找表}，不需要切换配色的对象不在其中
+def getGlazeRemap(buildingObj:bpy.types.Object,
+                  objList:list):
+    bData:acaData = buildingObj.ACA_data
+    glazeTable = getGlazeTable(bData)
+    slotRemap = {}
+    for obj in objList:
+        glazeList = __matchGlaze(glazeTable,obj.data.name)
+        if glazeList:
+            # 多个匹配时依次切换，与逐个替换的结果一致
+            lut = glazeList[0][0]
+            for nextLut,activeIndex in glazeList[1:]:
+                size = max(len(lut),len(nextLut))
+                lut = np.concatenate(
+                    (lut,np.arange(len(lut),size,dtype=np.int32)))
+                inRange = lut < len(nextLut)
+                lut[inRange] = nextLut[lut[inRange]]
+            slotRemap[obj.name] = lut
+    return slotRemap
+
+# 根据琉璃瓦作配色
+# 根据用户从panel上选择的bData.tile_style，切换obj的材质slot
+# 0-黄琉璃
+# 1-黄琉璃绿剪边
+# 2-绿琉璃
+# 3-绿琉璃黄剪边
+# 260501 配色改为查找表，buildingObj已知时可传入，省去getRoot
+def setGlazeStyle(paintObj:bpy.types.Object,
+                  resetUV=True,
+                  buildingObj:bpy.types.Object=None):
+    # 载入数据
+    aData:tmpData = bpy.context.scene.ACA_temp
+    if buildingObj == None:
+        buildingObj,bData,objData = utils.getRoot(paintObj)
+    bData:acaData = buildingObj.ACA_data
+    paintName = paintObj.data.name
+
+    # 2. override，全局覆盖的着色方式
+    paintStyle = bData.paint_style
+    if paintStyle == '2': 
+        mat = aData.mat_override
+        paintObj = __paintMat(paintObj, mat)
+        return
+
+    # 1、瓦面（筒瓦/板瓦）颜色
+    # 2、剪边/屋脊的颜色
+    # 按资产查找配色表，批量切换材质slot
+    glazeTable = getGlazeTable(bData)
+    for lut,activeIndex in __matchGlaze(glazeTable,paintName):
+        __remapSlot(paintObj,lut)
+        paintObj.active_material_index = activeIndex
 
     ''' 260318 在Blender5.1中，这里极大的拖累了屋瓦生成速度
     很奇怪的是在Blender5.0中没有明显的问题，还需后续分析
@@ -0,0 +1,179 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 场景索引，按aca_type、aca_id、splice_id查找对象
+# 260501 替代getObjByID、getAcaChild、组合后处理中对全场景或整棵对象树的线性扫描
+# 索引中只保存对象名称，读取时校验对象是否仍然有效，校验失败时重新扫描，
+# 所以索引过期只会影响效率，不会返回错误的对象
+
+import bpy
+from bpy.app.handlers import persistent
+
+# 各根对象下的子对象索引 {根对象名称: {aca_type: [对象名称]}}
+_children = {}
+# 全场景的aca_id索引 {(aca_type, aca_id): 对象名称}，为None时待扫描
+_ids = None
+# 全场景的splice_id索引 {splice_id: [对象名称]}，为None时待扫描
+_splices = None
+
+
+def clear() -> None:
+    """清空索引，下次查找时重新扫描"""
+    global _ids, _splices
+    _children.clear()
+    _ids = None
+    _splices = None
+
+
+def _is_descendant(obj: bpy.types.Object, root: bpy.types.Object) -> bool:
+    parent = obj.parent
+    while parent is not None:
+        if parent == root:
+            return True
+        parent = parent.parent
+    return False
+
+
+def _scan_children(root: bpy.types.Object) -> dict:
+    # children_recursive只遍历一次场景对象，
+    # 逐级访问children则每一级都要遍历全部对象
+    index = {}
+    for child in root.children_recursive:
+        aca_type = child.ACA_data.aca_type
+        if aca_type:
+            index.setdefault(aca_type, []).append(child.name)
+    _children[root.name] = index
+    return index
+
+
+def _find_in(index: dict, root: bpy.types.Object, aca_type: str):
+    for name in index.get(aca_type, ()):
+        obj = bpy.data.objects.get(name)
+        if obj is None:
+            continue
+        if obj.ACA_data.aca_type != aca_type:
+            continue
+        if not _is_descendant(obj, root):
+            continue
+        return obj
+    return None
+
+
+def find_child(root: bpy.types.Object, aca_type: str):
+    """
+    查找根对象下指定类型的子对象
+
+    使用示例:
+        from .tools import aca_index
+        rafterRoot = aca_index.find_child(buildingObj, con.ACA_TYPE_RAFTER_ROOT)
+
+    Args:
+        root: 根对象，一般为建筑根节点
+        aca_type: 对象类型，如 con.ACA_TYPE_RAFTER_ROOT
+
+    Returns:
+        bpy.types.Object: 找到的对象，找不到时返回 None
+    """
+    index = _children.get(root.name)
+    if index is not None:
+        obj = _find_in(index, root, aca_type)
+        if obj is not None:
+            return obj
+    # 索引中没有，可能是新建的对象，重新扫描该根对象
+    index = _scan_children(root)
+    return _find_in(index, root, aca_type)
+
+
+def _scan_scene() -> None:
+    global _ids, _splices
+    _ids = {}
+    _splices = {}
+    for obj in bpy.data.objects:
+        if not hasattr(obj, 'ACA_data'):
+            continue
+        objData = obj.ACA_data
+        if objData.aca_id:
+            # 与原先的线性查找一致，重复时取第一个
+            _ids.setdefault((objData.aca_type, objData.aca_id), obj.name)
+        if objData.splice_id:
+            _splices.setdefault(objData.splice_id, []).append(obj.name)
+
+
+def find_by_id(aca_id: str, aca_type: str):
+    """
+    按aca_id查找对象
+
+    Args:
+        aca_id: 对象编号
+        aca_type: 对象类型，如 con.ACA_TYPE_BUILDING
+
+    Returns:
+        bpy.types.Object: 找到的对象，找不到时返回 None
+    """
+    rescanned = False
+    if _ids is None:
+        _scan_scene()
+        rescanned = True
+    while True:
+        name = _ids.get((aca_type, aca_id))
+        obj = bpy.data.objects.get(name) if name else None
+        if (obj is not None
+                and obj.ACA_data.aca_type == aca_type
+                and obj.ACA_data.aca_id == aca_id):
+            return obj
+        if rescanned:
+            return None
+        _scan_scene()
+        rescanned = True
+
+
+def find_by_splice_id(splice_id: str):
+    """
+    按splice_id查找建筑
+
+    Args:
+        splice_id: 拼接编号
+
+    Returns:
+        bpy.types.Object: 找到的建筑，找不到时返回 None
+    """
+    rescanned = False
+    if _splices is None:
+        _scan_scene()
+        rescanned = True
+    while True:
+        for name in _splices.get(splice_id, ()):
+            obj = bpy.data.objects.get(name)
+            if obj is not None and obj.ACA_data.splice_id == splice_id:
+                return obj
+        if rescanned:
+            return None
+        _scan_scene()
+        rescanned = True
+
+
+# 撤销、重做、打开文件后，对象可能已被替换，清空索引
+@persistent
+def _on_reload(*args):
+    clear()
+
+
+_HANDLERS = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+)
+
+
+def register() -> None:
+    """注册撤销、重做、打开文件的回调"""
+    for handlers in _HANDLERS:
+        if _on_reload not in handlers:
+            handlers.append(_on_reload)
+
+
+def unregister() -> None:
+    """注销回调，并清空索引"""
+    for handlers in _HANDLERS:
+        if _on_reload in handlers:
+            handlers.remove(_on_reload)
+    clear()
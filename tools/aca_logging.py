@@ -208,6 +208,30 @@ def log_system_info(logger: logging.Logger = None) -> None:
     logger.info(f"Blender: {bpy.app.version_string}")
     logger.debug(f"Python: {platform.python_version()}")
 
+def log_timing_summary(summary: dict, logger: logging.Logger = None) -> None:
+    """
+    记录一次营造的耗时统计
+    
+    使用示例:
+        from .tools import aca_logging
+        aca_logging.log_timing_summary(aca_timer.last_summary)
+    
+    Args:
+        summary: aca_timer.end_session() 返回的统计结果
+        logger: 日志记录器，默认使用 ACA 日志记录器
+    """
+    if logger is None:
+        logger = get_logger()
+    
+    logger.info(f"[timing] {summary['name']} total={summary['total']:.3f}s")
+    for stage, seconds in summary['stages'].items():
+        logger.info(f"[timing]   stage {stage}: {seconds:.3f}s")
+    spans = sorted(summary['spans'].items(),
+                   key=lambda item: item[1]['time'], reverse=True)
+    for name, record in spans:
+        logger.info(f"[timing]   span {name}: {record['time']:.3f}s"
+                    f" x{record['count']}")
+
 # 260310 日志配置选项
 class LoggerPrefsMixin:
     # 260210 日志配置选项
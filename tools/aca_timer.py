@@ -0,0 +1,222 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 计时模块，记录每次营造中各阶段、各热点函数的耗时
+# 260501 营造结束后输出统计日志，供面板显示各图层的耗时分布，
+# 并根据上次营造中各阶段的实际耗时，推算进度条的百分比
+
+import json
+import time
+import functools
+from contextlib import contextmanager
+
+from . import aca_logging
+
+# 阶段权重文件，记录上次营造中各阶段的耗时
+WEIGHTS_FILENAME = "stage_weights.json"
+# 新旧权重的平滑系数
+WEIGHT_SMOOTHING = 0.5
+
+# 当前的计时会话
+_session = None
+# 上次营造的统计结果，供面板显示
+last_summary = None
+# 各会话类型的阶段权重 {会话名称: {阶段名称: 秒}}
+_stage_weights = None
+
+
+class _TimerSession:
+    """一次顶层操作（如新建、更新建筑）的计时数据"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.depth = 1
+        self.start = time.perf_counter()
+        # 阶段 {名称: 秒}，按首次出现的顺序
+        self.stages = {}
+        self.current_stage = None
+        self.stage_start = 0.0
+        # 热点函数 {名称: [总耗时, 调用次数]}
+        self.spans = {}
+
+    def close_stage(self):
+        if self.current_stage is None:
+            return
+        span = time.perf_counter() - self.stage_start
+        self.stages[self.current_stage] = \
+            self.stages.get(self.current_stage, 0.0) + span
+        self.current_stage = None
+
+
+def _weights_path():
+    return aca_logging.get_default_log_path() / WEIGHTS_FILENAME
+
+
+def _load_weights() -> dict:
+    global _stage_weights
+    if _stage_weights is None:
+        _stage_weights = {}
+        try:
+            with open(_weights_path(), encoding='utf-8') as f:
+                _stage_weights = json.load(f)
+        except (OSError, ValueError):
+            pass
+    return _stage_weights
+
+
+def _save_weights(session: _TimerSession):
+    weights = _load_weights()
+    old = weights.get(session.name, {})
+    new = {}
+    for stage, seconds in session.stages.items():
+        if stage in old:
+            seconds = (old[stage] * (1 - WEIGHT_SMOOTHING)
+                       + seconds * WEIGHT_SMOOTHING)
+        new[stage] = seconds
+    weights[session.name] = new
+    try:
+        path = _weights_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(weights, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+def begin_session(name: str) -> None:
+    """
+    开始计时会话，嵌套调用时沿用外层会话
+
+    使用示例:
+        from .tools import aca_timer
+        aca_timer.begin_session('build')
+        ...
+        aca_timer.end_session()
+
+    Args:
+        name: 会话名称，如 'build'、'updateBuilding'
+    """
+    global _session
+    if _session is not None:
+        _session.depth += 1
+        return
+    _session = _TimerSession(name)
+
+
+def end_session() -> dict:
+    """
+    结束计时会话，输出统计日志，并更新阶段权重
+
+    Returns:
+        dict: 统计结果，嵌套调用时返回 None
+    """
+    global _session, last_summary
+    session = _session
+    if session is None:
+        return None
+    session.depth -= 1
+    if session.depth > 0:
+        return None
+    session.close_stage()
+    _session = None
+
+    summary = {
+        'name': session.name,
+        'total': time.perf_counter() - session.start,
+        'stages': dict(session.stages),
+        'spans': {name: {'time': value[0], 'count': value[1]}
+                  for name, value in session.spans.items()},
+    }
+    last_summary = summary
+    aca_logging.log_timing_summary(summary)
+    if session.stages:
+        _save_weights(session)
+    return summary
+
+
+def mark_stage(name: str) -> None:
+    """
+    标记进入新的阶段，上一阶段同时结束
+    同名阶段的耗时累加，如组合建筑中多个单体的同一图层
+
+    Args:
+        name: 阶段名称，一般为图层标识，如 con.LAYER_TILE
+    """
+    if _session is None:
+        return
+    _session.close_stage()
+    _session.current_stage = name
+    _session.stage_start = time.perf_counter()
+
+
+@contextmanager
+def span(name: str):
+    """
+    记录代码块的耗时和调用次数，没有计时会话时不做记录
+
+    使用示例:
+        with aca_timer.span('joinObjects'):
+            ...
+
+    Args:
+        name: 计时项名称
+    """
+    if _session is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # 会话可能已在代码块中结束
+        if _session is not None:
+            record = _session.spans.setdefault(name, [0.0, 0])
+            record[0] += time.perf_counter() - start
+            record[1] += 1
+
+
+def timed(func):
+    """
+    装饰器：记录函数的耗时和调用次数
+    递归调用时只计外层，避免重复累计
+    """
+    name = func.__name__
+    active = [0]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _session is None or active[0] > 0:
+            return func(*args, **kwargs)
+        active[0] += 1
+        try:
+            with span(name):
+                return func(*args, **kwargs)
+        finally:
+            active[0] -= 1
+    return wrapper
+
+
+def get_progress():
+    """
+    根据上次同类会话中各阶段的耗时，推算当前进度
+
+    Returns:
+        float: 0~1 的进度，没有历史权重时返回 None
+    """
+    if _session is None:
+        return None
+    weights = _load_weights().get(_session.name)
+    if not weights:
+        return None
+    total = sum(weights.values())
+    if total <= 0:
+        return None
+
+    # 已完成的阶段计入全部权重，当前阶段按已用时间计入
+    done = 0.0
+    for stage in _session.stages:
+        done += weights.get(stage, 0.0)
+    if _session.current_stage is not None:
+        elapsed = time.perf_counter() - _session.stage_start
+        weight = weights.get(_session.current_stage, 0.0)
+        done += min(elapsed, weight)
+    return min(done / total, 0.99)
@@ -0,0 +1,324 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   后台批量营造，在blender -b中按模板和参数变体批量生成建筑
+#   可选合并、导出，并统计每个建筑的营造耗时
+#   命令行入口见tools/batch_cli.py
+import bpy
+import os
+import csv
+import json
+import time
+import argparse
+from functools import partial
+
+from .. import utils
+from .. import build
+from ..const import ACA_Consts as con
+from ..template import template
+from ..locale.i18n import _
+
+# 可导出的格式，对应插件的导出操作
+EXPORT_TYPES = ('glb', 'fbx')
+
+# 建筑根节点的类型
+ROOT_TYPES = (
+    con.ACA_TYPE_BUILDING,
+    con.ACA_TYPE_YARDWALL,
+    con.ACA_TYPE_COMBO,
+)
+
+# 载入批量任务
+# JSON格式：[{"template":"庑殿","name":"庑殿_1","overrides":{"DK":0.08}}, ...]
+# CSV格式：表头包括template、name（可选），其余列均视为覆盖参数，空值忽略
+def loadJobs(filePath:str):
+    ext = os.path.splitext(filePath)[1].lower()
+    jobs = []
+    if ext == '.json':
+        with open(filePath, encoding='utf-8') as f:
+            content = json.load(f)
+        if isinstance(content, dict):
+            content = content.get('jobs', [])
+        for item in content:
+            if isinstance(item, str):
+                item = {'template': item}
+            jobs.append({
+                'template': item['template'],
+                'name': item.get('name'),
+                'overrides': item.get('overrides', {}),
+            })
+    elif ext == '.csv':
+        with open(filePath, encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                templateName = row.pop('template')
+                name = row.pop('name', None)
+                overrides = {key: value for key, value in row.items()
+                             if key and value not in (None, '')}
+                jobs.append({
+                    'template': templateName,
+                    'name': name or None,
+                    'overrides': overrides,
+                })
+    else:
+        raise Exception(_("无法识别的任务文件：%s") % (filePath))
+    return jobs
+
+# 获取场景中所有建筑根节点的名称
+def getRootNames():
+    rootNames = set()
+    for obj in bpy.data.objects:
+        if obj.parent is not None:
+            continue
+        if not hasattr(obj, 'ACA_data'):
+            continue
+        if obj.ACA_data.aca_type in ROOT_TYPES:
+            rootNames.add(obj.name)
+    return rootNames
+
+# 统计对象层次中的对象数量和顶点数量
+def getHierarchyStats(rootObj:bpy.types.Object):
+    objCount = 0
+    vertCount = 0
+    stack = [rootObj]
+    while stack:
+        obj = stack.pop()
+        objCount += 1
+        if obj.type == 'MESH':
+            vertCount += len(obj.data.vertices)
+        stack.extend(obj.children)
+    return objCount, vertCount
+
+# 选中对象层次，用于导出
+def __selectHierarchy(rootObj:bpy.types.Object):
+    for obj in bpy.context.scene.objects:
+        obj.select_set(False)
+    stack = [rootObj]
+    while stack:
+        obj = stack.pop()
+        if obj.visible_get():
+            obj.select_set(True)
+        stack.extend(obj.children)
+    bpy.context.view_layer.objects.active = rootObj
+    return
+
+# 导出建筑，调用插件的导出操作
+def exportBuilding(rootObj:bpy.types.Object,
+                   exportType:str,
+                   filePath:str):
+    __selectHierarchy(rootObj)
+    if exportType == 'glb':
+        bpy.ops.aca.export_glb(filepath=filePath)
+    elif exportType == 'fbx':
+        bpy.ops.aca.export_fbx(filepath=filePath)
+    else:
+        raise Exception(_("无法识别的导出格式：%s") % (exportType))
+    return
+
+# 执行一个营造任务
+# 返回该任务的统计记录
+def runJob(job:dict,
+           join = False,
+           exportType:str = None,
+           outputDir:str = None,
+           clear = False):
+    record = {
+        'template': job['template'],
+        'name': job.get('name') or job['template'],
+        'overrides': job.get('overrides', {}),
+        'status': 'FINISHED',
+        'build_time': 0.0,
+        'join_time': 0.0,
+        'export_time': 0.0,
+        'objects': 0,
+        'vertices': 0,
+    }
+
+    # 1、营造
+    rootsBefore = getRootNames()
+    timeStart = time.perf_counter()
+    funproxy = partial(build.build,
+                       templateName=job['template'],
+                       overrides=job.get('overrides'))
+    result = utils.fastRun(funproxy)
+    record['build_time'] = time.perf_counter() - timeStart
+    if 'FINISHED' not in result:
+        record['status'] = 'CANCELLED'
+        record['error'] = str(result.get('CANCELLED'))
+        return record
+
+    newRoots = getRootNames() - rootsBefore
+    if len(newRoots) != 1:
+        record['status'] = 'CANCELLED'
+        record['error'] = _("未找到新建的建筑根节点")
+        return record
+    rootObj = bpy.data.objects[newRoots.pop()]
+    if job.get('name'):
+        rootObj.name = job['name']
+    record['name'] = rootObj.name
+    record['objects'], record['vertices'] = getHierarchyStats(rootObj)
+
+    # 2、合并
+    exportObj = rootObj
+    if join:
+        from ..postproc import buildingJoin
+        timeStart = time.perf_counter()
+        funproxy = partial(buildingJoin.joinBuilding,
+                           buildingObj=rootObj)
+        utils.fastRun(funproxy)
+        record['join_time'] = time.perf_counter() - timeStart
+        joinedObj = bpy.data.objects.get(rootObj.name + con.JOIN_SUFFIX)
+        if joinedObj is not None:
+            exportObj = joinedObj
+
+    # 3、导出
+    if exportType is not None:
+        timeStart = time.perf_counter()
+        filePath = os.path.join(outputDir,
+                                f"{rootObj.name}.{exportType}")
+        exportBuilding(exportObj, exportType, filePath)
+        record['export_time'] = time.perf_counter() - timeStart
+        record['file'] = filePath
+
+    # 4、导出后删除，避免场景过大拖慢后续营造
+    if clear:
+        build.delBuilding(rootObj)
+
+    return record
+
+# 批量执行营造任务
+def runBatch(jobs:list,
+             join = False,
+             exportType:str = None,
+             outputDir:str = None,
+             clear = False):
+    # 后台营造，关闭视角跟随和参数修改的自动重建
+    scnData = bpy.context.scene.ACA_data
+    scnData['is_auto_viewall'] = False
+    scnData['is_auto_rebuild'] = False
+    if outputDir is not None:
+        os.makedirs(outputDir, exist_ok=True)
+
+    records = []
+    for index, job in enumerate(jobs):
+        utils.outputMsg(_("批量营造[%d/%d]：%s")
+                        % (index+1, len(jobs), job['template']))
+        record = runJob(job,
+                        join=join,
+                        exportType=exportType,
+                        outputDir=outputDir,
+                        clear=clear)
+        records.append(record)
+        utils.outputMsg(_("批量营造[%d/%d]：%s，%s，营造%.2f秒")
+                        % (index+1, len(jobs), record['name'],
+                           record['status'], record['build_time']))
+    return records
+
+# 输出统计报告
+def printReport(records:list):
+    lines = []
+    lines.append("%-24s %-10s %8s %8s %8s %8s %10s" % (
+        'name', 'status', 'build', 'join', 'export', 'objects', 'vertices'))
+    for record in records:
+        lines.append("%-24s %-10s %8.2f %8.2f %8.2f %8d %10d" % (
+            record['name'], record['status'],
+            record['build_time'], record['join_time'],
+            record['export_time'], record['objects'],
+            record['vertices']))
+    totalTime = sum(record['build_time'] + record['join_time']
+                    + record['export_time'] for record in records)
+    lines.append(_("合计：%d个建筑，%.2f秒") % (len(records), totalTime))
+    print("\n".join(lines))
+    return
+
+def parseArgs(argv:list):
+    parser = argparse.ArgumentParser(
+        prog='blender -b -P tools/batch_cli.py --',
+        description='ACA Builder batch build')
+    parser.add_argument('templates', nargs='*',
+        help='template names in template.xml')
+    parser.add_argument('--jobs',
+        help='JSON/CSV job file with template names and overrides')
+    parser.add_argument('--all', action='store_true',
+        help='build every template in template.xml')
+    parser.add_argument('--set', action='append', default=[],
+        metavar='KEY=VALUE',
+        help='override applied to the positional templates')
+    parser.add_argument('--join', action='store_true',
+        help='join each building before export')
+    parser.add_argument('--export', choices=EXPORT_TYPES,
+        help='export each building to the output directory')
+    parser.add_argument('--output', default='.',
+        help='output directory for exported files')
+    parser.add_argument('--clear', action='store_true',
+        help='delete each building after it is exported')
+    parser.add_argument('--save',
+        help='save the resulting scene to this .blend file')
+    parser.add_argument('--report',
+        help='write per-building timing to this JSON file')
+    parser.add_argument('--workers', type=int, default=1,
+        help='number of background Blender processes to shard the jobs across')
+    parser.add_argument('--merge', choices=('append', 'link'),
+        help='append or link the worker results into this scene')
+    return parser.parse_args(argv)
+
+# 命令行入口
+# 返回失败的任务数量
+def main(argv:list):
+    args = parseArgs(argv)
+
+    overrides = {}
+    for item in args.set:
+        key, _sep, value = item.partition('=')
+        overrides[key] = value
+
+    jobs = []
+    if args.all:
+        args.templates = template.getTemplateList(onlyname=True)
+    for templateName in args.templates:
+        jobs.append({
+            'template': templateName,
+            'name': None,
+            'overrides': overrides,
+        })
+    if args.jobs:
+        jobs += loadJobs(args.jobs)
+    if not jobs:
+        print(_("没有需要营造的模板"))
+        return 0
+
+    # 验证模板名称
+    templateList = template.getTemplateList(onlyname=True)
+    for job in jobs:
+        if job['template'] not in templateList:
+            raise Exception(_("找不到模板：%s") % (job['template']))
+
+    # 260501 多进程并行营造
+    if args.workers > 1:
+        from . import batch_farm
+        records, totalTime = batch_farm.runFarm(
+            jobs,
+            workers=args.workers,
+            join=args.join,
+            exportType=args.export,
+            outputDir=os.path.abspath(args.output),
+            clear=args.clear,
+            mergeType=args.merge)
+        printReport(records)
+        print(_("%d个进程，实际耗时%.2f秒") % (args.workers, totalTime))
+    else:
+        records = runBatch(jobs,
+                           join=args.join,
+                           exportType=args.export,
+                           outputDir=os.path.abspath(args.output),
+                           clear=args.clear)
+        printReport(records)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+    if args.save:
+        bpy.ops.wm.save_as_mainfile(
+            filepath=os.path.abspath(args.save))
+
+    return len([record for record in records
+                if record['status'] != 'FINISHED'])
@@ -0,0 +1,41 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   后台批量营造的命令行入口，不属于插件模块，由blender -P直接运行
+#   启用插件后，转交tools/batch_build.py执行
+#   用法：
+#   blender -b -P "ACA Builder/tools/batch_cli.py" -- 庑殿 歇山 --export glb --output out
+#   blender -b -P "ACA Builder/tools/batch_cli.py" -- --jobs jobs.csv --report report.json
+#   blender -b -P "ACA Builder/tools/batch_cli.py" -- --all --workers 8 --merge append --save all.blend
+#   blender -b -P "ACA Builder/tools/batch_cli.py" -- benchmark --repeat 3 --baseline old.json
+import sys
+import pathlib
+import importlib
+import addon_utils
+
+# 插件目录
+addonDir = pathlib.Path(__file__).resolve().parents[1]
+
+# 查找已安装的插件模块名称（legacy插件或extension）
+addonName = None
+for mod in addon_utils.modules():
+    modFile = getattr(mod, '__file__', None)
+    if modFile and pathlib.Path(modFile).resolve().parent == addonDir:
+        addonName = mod.__name__
+        break
+# 未安装时，直接从插件目录载入
+if addonName is None:
+    sys.path.append(str(addonDir.parent))
+    addonName = addonDir.name
+
+addon_utils.enable(addonName, default_set=False)
+
+argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+# 260501 benchmark子命令，执行性能基准测试
+if argv and argv[0] == 'benchmark':
+    entry = importlib.import_module(addonName + '.tools.benchmark')
+    argv = argv[1:]
+else:
+    entry = importlib.import_module(addonName + '.tools.batch_build')
+failed = entry.main(argv)
+sys.exit(1 if failed else 0)
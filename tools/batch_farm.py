@@ -0,0 +1,173 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   多进程批量营造，将批量任务分片到多个后台Blender进程并行执行
+#   每个进程保存各自的.blend（及导出的GLB/FBX），最后可链接/追加到主场景
+#   由tools/batch_build.py的--workers参数调用
+import bpy
+import os
+import json
+import time
+import pathlib
+import subprocess
+
+from .. import utils
+from ..const import ACA_Consts as con
+from ..locale.i18n import _
+
+# 合并到主场景的方式
+MERGE_TYPES = ('append', 'link')
+
+# 命令行入口脚本
+CLI_PATH = str(pathlib.Path(__file__).resolve().parent / 'batch_cli.py')
+
+# 按轮询分片，使耗时不同的模板在各进程间大致均衡
+def splitJobs(jobs:list, workers:int):
+    shards = [[] for _i in range(workers)]
+    for index, job in enumerate(jobs):
+        shards[index % workers].append(job)
+    return [shard for shard in shards if shard]
+
+# 启动一个后台Blender进程
+def __startWorker(index:int,
+                  shard:list,
+                  workDir:str,
+                  join = False,
+                  exportType:str = None,
+                  outputDir:str = None,
+                  clear = False):
+    jobFile = os.path.join(workDir, f"worker_{index}.json")
+    with open(jobFile, 'w', encoding='utf-8') as f:
+        json.dump(shard, f, ensure_ascii=False)
+
+    reportFile = os.path.join(workDir, f"worker_{index}_report.json")
+    blendFile = os.path.join(workDir, f"worker_{index}.blend")
+    logFile = os.path.join(workDir, f"worker_{index}.log")
+    cmd = [bpy.app.binary_path, '-b', '-P', CLI_PATH, '--',
+           '--jobs', jobFile,
+           '--report', reportFile]
+    if not clear:
+        cmd += ['--save', blendFile]
+    if join:
+        cmd.append('--join')
+    if exportType is not None:
+        cmd += ['--export', exportType, '--output', outputDir]
+    if clear:
+        cmd.append('--clear')
+
+    # 输出写入日志文件，避免管道缓冲区写满导致子进程阻塞
+    log = open(logFile, 'w', encoding='utf-8')
+    process = subprocess.Popen(cmd,
+                               stdout=log,
+                               stderr=subprocess.STDOUT)
+    return {
+        'index': index,
+        'process': process,
+        'log': log,
+        'report': reportFile,
+        'blend': blendFile if not clear else None,
+        'count': len(shard),
+    }
+
+# 将各进程的建筑追加/链接到当前场景
+def mergeBlendFiles(blendFiles:list, mergeType:str = 'append'):
+    rootColl = utils.setCollection(
+        con.COLL_NAME_ROOT, isRoot=True, colorTag=2)
+    collNames = (con.COLL_NAME_ROOT, con.COLL_NAME_ROOT_JOINED)
+    for blendFile in blendFiles:
+        link = (mergeType == 'link')
+        with bpy.data.libraries.load(blendFile, link=link) as (dataFrom, dataTo):
+            dataTo.collections = [name for name in dataFrom.collections
+                                  if name in collNames]
+        for coll in dataTo.collections:
+            if coll is None:
+                continue
+            if link:
+                # 链接的集合不可编辑，以集合实例的方式放入场景
+                instanceObj = bpy.data.objects.new(
+                    os.path.splitext(os.path.basename(blendFile))[0]
+                    + '.' + coll.name, None)
+                instanceObj.instance_type = 'COLLECTION'
+                instanceObj.instance_collection = coll
+                rootColl.objects.link(instanceObj)
+                continue
+            # 追加的集合，将其中各建筑的目录移入主场景的对应目录
+            if coll.name.startswith(con.COLL_NAME_ROOT_JOINED):
+                targetColl = utils.setCollection(
+                    con.COLL_NAME_ROOT_JOINED, isRoot=True, colorTag=3)
+            else:
+                targetColl = rootColl
+            for childColl in list(coll.children):
+                targetColl.children.link(childColl)
+            for obj in list(coll.objects):
+                targetColl.objects.link(obj)
+            bpy.data.collections.remove(coll)
+    utils.focusCollection(rootColl.name)
+    return
+
+# 多进程批量营造
+# 返回各建筑的统计记录，及总耗时
+def runFarm(jobs:list,
+            workers:int,
+            join = False,
+            exportType:str = None,
+            outputDir:str = None,
+            clear = False,
+            mergeType:str = None):
+    timeStart = time.perf_counter()
+    workDir = os.path.join(outputDir, 'workers')
+    os.makedirs(workDir, exist_ok=True)
+
+    # 各进程独立命名，补全建筑名称以免导出文件重名
+    for index, job in enumerate(jobs):
+        if not job.get('name'):
+            job['name'] = f"{job['template']}_{index:03d}"
+
+    workerList = []
+    for index, shard in enumerate(splitJobs(jobs, workers)):
+        workerList.append(__startWorker(
+            index, shard, workDir,
+            join=join,
+            exportType=exportType,
+            outputDir=outputDir,
+            clear=clear))
+        utils.outputMsg(_("启动营造进程[%d]：%d个建筑")
+                        % (index, workerList[-1]['count']))
+
+    records = []
+    blendFiles = []
+    for worker in workerList:
+        returnCode = worker['process'].wait()
+        worker['log'].close()
+        utils.outputMsg(_("营造进程[%d]结束，返回值：%d")
+                        % (worker['index'], returnCode))
+        if os.path.exists(worker['report']):
+            with open(worker['report'], encoding='utf-8') as f:
+                workerRecords = json.load(f)
+            for record in workerRecords:
+                record['worker'] = worker['index']
+            records += workerRecords
+        else:
+            # 进程异常退出，没有输出报告
+            records.append({
+                'template': '',
+                'name': _("营造进程[%d]") % (worker['index']),
+                'status': 'CANCELLED',
+                'error': _("进程异常退出，详见日志：%s")
+                         % (worker['log'].name),
+                'build_time': 0.0,
+                'join_time': 0.0,
+                'export_time': 0.0,
+                'objects': 0,
+                'vertices': 0,
+                'worker': worker['index'],
+            })
+        if worker['blend'] and os.path.exists(worker['blend']):
+            blendFiles.append(worker['blend'])
+
+    if mergeType is not None and blendFiles:
+        utils.outputMsg(_("合并%d个营造结果到当前场景") % (len(blendFiles)))
+        mergeBlendFiles(blendFiles, mergeType)
+
+    totalTime = time.perf_counter() - timeStart
+    return records, totalTime
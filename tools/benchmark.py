@@ -0,0 +1,371 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：
+#   性能基准测试，遍历template.xml中的所有模板，
+#   分别执行新建、更新、重设屋顶、合并、剖视，重复N次，
+#   记录耗时、对象数量、顶点数量和内存峰值，输出为JSON/CSV，
+#   并与之前的基准结果比较，用于发现版本间的性能退化
+#   测试期间关闭图层缓存和磁盘缓存，计时的是实际营造，而非缓存的恢复
+#   内存峰值在计时之后单独测一轮，避免内存跟踪拖慢计时
+import bpy
+import os
+import sys
+import csv
+import json
+import time
+import tracemalloc
+import argparse
+from datetime import datetime
+from functools import partial
+
+from .. import utils
+from .. import build
+from ..const import ACA_Consts as con
+from ..template import template
+from ..locale.i18n import _
+from . import batch_build
+
+# 测试步骤
+STEPS = ('build', 'update', 'resetRoof', 'join', 'section')
+
+# 判断为性能退化的阈值，平均耗时或内存峰值增长超过10%
+REGRESSION_THRESHOLD = 0.1
+
+# 查找可以更新、重设屋顶的单体建筑
+# 组合建筑取第一个子建筑
+def __getSingleBuilding(rootObj:bpy.types.Object):
+    if rootObj.ACA_data.aca_type != con.ACA_TYPE_COMBO:
+        return rootObj
+    for child in rootObj.children:
+        if child.ACA_data.aca_type == con.ACA_TYPE_BUILDING:
+            return child
+    return None
+
+# 执行一个测试步骤，返回耗时
+# 步骤失败时返回None
+def __runStep(step:str,
+              templateName:str,
+              rootObj:bpy.types.Object):
+    if step == 'build':
+        funproxy = partial(build.build,templateName=templateName)
+    elif step == 'update':
+        funproxy = partial(build.updateBuilding,
+                           buildingObj=__getSingleBuilding(rootObj))
+    elif step == 'resetRoof':
+        funproxy = partial(build.resetRoof,
+                           buildingObj=__getSingleBuilding(rootObj))
+    elif step == 'join':
+        from ..postproc import buildingJoin
+        funproxy = partial(buildingJoin.joinBuilding,
+                           buildingObj=rootObj)
+    elif step == 'section':
+        from ..postproc import buildingSection
+        funproxy = partial(buildingSection.addSection,
+                           buildingObj=rootObj,
+                           sectionPlan='X+')
+    else:
+        raise Exception(_("无法识别的测试步骤：%s") % (step))
+
+    timeStart = time.perf_counter()
+    result = utils.fastRun(funproxy)
+    timeSpan = time.perf_counter() - timeStart
+    if isinstance(result, dict) and 'CANCELLED' in result:
+        return None
+    return timeSpan
+
+# 对一个模板执行一轮测试，返回各步骤的测量值
+# traceMemory：记录各步骤的内存峰值(MB)，由tracemalloc统计，
+# 包括Python对象和numpy数组，不含Blender内部的网格数据
+def __runTemplate(templateName:str,
+                  steps:tuple,
+                  traceMemory:bool = False):
+    measures = {}
+    rootObj = None
+    rootsBefore = batch_build.getRootNames()
+    for step in steps:
+        # 新建以外的步骤，都需要已生成的建筑
+        if step != 'build' and rootObj is None:
+            break
+        # 院墙没有屋顶
+        if (step in ('update','resetRoof')
+                and template.getBuildingType(templateName)
+                    == con.ACA_TYPE_YARDWALL):
+            continue
+        if step == 'section' and 'join' in measures:
+            # 剖视会重新合并，先取消合并
+            from ..postproc import buildingJoin
+            joinedObj = bpy.data.objects.get(rootObj.name + con.JOIN_SUFFIX)
+            if joinedObj is not None:
+                buildingJoin.undoJoin(joinedObj)
+
+        if traceMemory:
+            memoryStart = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        timeSpan = __runStep(step, templateName, rootObj)
+        if traceMemory:
+            peakMemory = (tracemalloc.get_traced_memory()[1]
+                          - memoryStart) / 1024 / 1024
+        if timeSpan is None:
+            measures[step] = None
+            break
+
+        if step == 'build':
+            newRoots = batch_build.getRootNames() - rootsBefore
+            if len(newRoots) != 1:
+                measures[step] = None
+                break
+            rootObj = bpy.data.objects[newRoots.pop()]
+
+        objCount = vertCount = 0
+        if rootObj is not None:
+            objCount, vertCount = batch_build.getHierarchyStats(rootObj)
+        measures[step] = {
+            'time': timeSpan,
+            'objects': objCount,
+            'vertices': vertCount,
+        }
+        if traceMemory:
+            measures[step]['peak_memory'] = peakMemory
+
+    # 删除测试建筑，避免影响后续模板
+    if rootObj is not None:
+        build.delBuilding(rootObj)
+    return measures
+
+# 执行基准测试
+# templates为空时，测试所有模板
+def runBenchmark(templates:list = None,
+                 repeat:int = 3,
+                 steps:tuple = STEPS):
+    if not templates:
+        templates = template.getTemplateList(onlyname=True)
+
+    # 关闭视角跟随和参数修改的自动重建
+    scnData = bpy.context.scene.ACA_data
+    scnData['is_auto_viewall'] = False
+    scnData['is_auto_rebuild'] = False
+
+    # 关闭图层缓存和磁盘缓存，否则重复测试和“更新”步骤
+    # 计时的是缓存的恢复，而非营造，测试结束后还原设置
+    from ..buildLayerCache import clearLayerCache
+    addon_main_name = __name__.split('.')[0]
+    prefs = bpy.context.preferences.addons[addon_main_name].preferences
+    cacheSettings = {key: getattr(prefs, key)
+                     for key in ('use_layer_cache', 'use_disk_cache')}
+    clearLayerCache()
+    try:
+        for key in cacheSettings:
+            setattr(prefs, key, False)
+        results = __runTemplates(templates, repeat, steps)
+    finally:
+        for key, value in cacheSettings.items():
+            setattr(prefs, key, value)
+
+    from .. import bl_info
+    return {
+        'addon_version': '.'.join(map(str, bl_info['version'])),
+        'blender_version': bpy.app.version_string,
+        'platform': sys.platform,
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'repeat': repeat,
+        'results': results,
+    }
+
+# 逐个模板执行测试，汇总各步骤的测量值
+def __runTemplates(templates:list,
+                   repeat:int,
+                   steps:tuple):
+    results = []
+    for templateName in templates:
+        samples = {step:[] for step in steps}
+        for i in range(repeat):
+            utils.outputMsg(_("基准测试：%s，第%d次") % (templateName, i+1))
+            measures = __runTemplate(templateName, steps)
+            for step, measure in measures.items():
+                samples[step].append(measure)
+        # 内存峰值单独测一轮，不计入耗时
+        utils.outputMsg(_("基准测试：%s，内存峰值") % (templateName))
+        tracemalloc.start()
+        try:
+            memoryMeasures = __runTemplate(
+                templateName, steps, traceMemory=True)
+        finally:
+            tracemalloc.stop()
+
+        for step in steps:
+            stepSamples = samples[step]
+            if not stepSamples:
+                continue
+            isFailed = any(sample is None for sample in stepSamples)
+            validSamples = [sample for sample in stepSamples
+                            if sample is not None]
+            times = [sample['time'] for sample in validSamples]
+            results.append({
+                'template': templateName,
+                'step': step,
+                'status': 'CANCELLED' if isFailed else 'FINISHED',
+                'times': times,
+                'mean': sum(times) / len(times) if times else 0.0,
+                'min': min(times) if times else 0.0,
+                'objects': validSamples[-1]['objects'] if validSamples else 0,
+                'vertices': validSamples[-1]['vertices'] if validSamples else 0,
+                'peak_memory': (memoryMeasures.get(step) or {}).get(
+                    'peak_memory', 0.0),
+            })
+    return results
+
+# 与之前的基准结果比较
+# 返回比较记录，ratio为平均耗时的增长比例，memory_ratio为内存峰值的增长比例
+# 基准结果中没有内存峰值时（旧版本的结果），不比较内存
+def compareBenchmark(current:dict,
+                     baseline:dict,
+                     threshold:float = REGRESSION_THRESHOLD):
+    baseMap = {(item['template'], item['step']): item
+               for item in baseline.get('results', [])}
+    compares = []
+    for item in current['results']:
+        baseItem = baseMap.get((item['template'], item['step']))
+        if baseItem is None or baseItem['mean'] <= 0:
+            continue
+        ratio = item['mean'] / baseItem['mean'] - 1
+        memoryRatio = None
+        if baseItem.get('peak_memory', 0) > 0:
+            memoryRatio = item['peak_memory'] / baseItem['peak_memory'] - 1
+        compares.append({
+            'template': item['template'],
+            'step': item['step'],
+            'baseline': baseItem['mean'],
+            'current': item['mean'],
+            'ratio': ratio,
+            'memory_baseline': baseItem.get('peak_memory'),
+            'memory_current': item['peak_memory'],
+            'memory_ratio': memoryRatio,
+            'vertices_delta': item['vertices'] - baseItem['vertices'],
+            'regression': (ratio > threshold
+                           or (memoryRatio is not None
+                               and memoryRatio > threshold)),
+        })
+    return compares
+
+# 保存基准结果，同时输出JSON和CSV
+def saveBenchmark(benchmark:dict,
+                  filePath:str,
+                  compares:list = None):
+    basePath = os.path.splitext(filePath)[0]
+    if compares is not None:
+        benchmark = dict(benchmark, compares=compares)
+    with open(basePath + '.json', 'w', encoding='utf-8') as f:
+        json.dump(benchmark, f, ensure_ascii=False, indent=2)
+
+    with open(basePath + '.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['template', 'step', 'status', 'mean', 'min',
+                         'objects', 'vertices', 'peak_memory',
+                         'ratio', 'memory_ratio'])
+        compareMap = {}
+        if compares is not None:
+            compareMap = {(item['template'], item['step']): item
+                          for item in compares}
+        for item in benchmark['results']:
+            compare = compareMap.get((item['template'], item['step']), {})
+            ratio = compare.get('ratio')
+            memoryRatio = compare.get('memory_ratio')
+            writer.writerow([
+                item['template'], item['step'], item['status'],
+                '%.3f' % item['mean'], '%.3f' % item['min'],
+                item['objects'], item['vertices'],
+                '%.1f' % item['peak_memory'],
+                '' if ratio is None else '%+.1f%%' % (ratio * 100),
+                '' if memoryRatio is None else '%+.1f%%' % (memoryRatio * 100),
+            ])
+    return basePath + '.json'
+
+# 输出比较结果
+def printCompares(compares:list):
+    lines = []
+    for item in compares:
+        line = "%s %-16s %-10s %8.2f -> %8.2f  %+6.1f%%" % (
+            '!' if item['regression'] else ' ',
+            item['template'], item['step'],
+            item['baseline'], item['current'], item['ratio'] * 100)
+        if item.get('memory_ratio') is not None:
+            line += "  %8.1fMB -> %8.1fMB  %+6.1f%%" % (
+                item['memory_baseline'], item['memory_current'],
+                item['memory_ratio'] * 100)
+        lines.append(line)
+    regressions = [item for item in compares if item['regression']]
+    lines.append(_("性能退化：%d项") % (len(regressions)))
+    print("\n".join(lines))
+    return
+
+# 获取默认的基准结果目录
+def getBenchmarkDir():
+    benchDir = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                            'test')
+    os.makedirs(benchDir, exist_ok=True)
+    return benchDir
+
+# 查找最近一次的基准结果
+def getLatestBenchmark(benchDir:str):
+    files = sorted(fileName for fileName in os.listdir(benchDir)
+                   if fileName.startswith('benchmark_')
+                   and fileName.endswith('.json'))
+    if not files:
+        return None
+    return os.path.join(benchDir, files[-1])
+
+# 执行基准测试，保存结果，并与基准比较
+# baselinePath为空时，与目录中最近一次的结果比较
+# 返回保存的文件路径，及性能退化的数量
+def benchmark(templates:list = None,
+              repeat:int = 3,
+              baselinePath:str = None,
+              outputDir:str = None):
+    if outputDir is None:
+        outputDir = getBenchmarkDir()
+    if baselinePath is None:
+        baselinePath = getLatestBenchmark(outputDir)
+
+    current = runBenchmark(templates, repeat)
+
+    compares = None
+    if baselinePath is not None and os.path.exists(baselinePath):
+        with open(baselinePath, encoding='utf-8') as f:
+            baseline = json.load(f)
+        compares = compareBenchmark(current, baseline)
+        printCompares(compares)
+
+    timestamp = datetime.now().strftime("%y%m%d%H%M%S")
+    filePath = saveBenchmark(
+        current,
+        os.path.join(outputDir, f"benchmark_{timestamp}.json"),
+        compares)
+    utils.outputMsg(_("基准测试结果已保存至: %s") % (filePath))
+
+    regressions = 0
+    if compares is not None:
+        regressions = len([item for item in compares if item['regression']])
+    return filePath, regressions
+
+# 命令行入口
+# blender -b -P tools/batch_cli.py -- benchmark --repeat 3 --baseline old.json
+def main(argv:list):
+    parser = argparse.ArgumentParser(
+        prog='blender -b -P tools/batch_cli.py -- benchmark',
+        description='ACA Builder benchmark')
+    parser.add_argument('templates', nargs='*',
+        help='template names, default all templates in template.xml')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of runs per template')
+    parser.add_argument('--baseline',
+        help='previous benchmark JSON to compare against')
+    parser.add_argument('--output',
+        help='directory for the benchmark JSON/CSV')
+    args = parser.parse_args(argv)
+
+    filePath, regressions = benchmark(
+        templates=args.templates,
+        repeat=args.repeat,
+        baselinePath=args.baseline,
+        outputDir=os.path.abspath(args.output) if args.output else None)
+    return regressions
@@ -21,25 +21,27 @@ def update_boundbox(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
-        buildingObj = None
         # 找到单体建筑
         if args and hasattr(args[0], 'ACA_data'):
-            buildingObj = args[0]
-        
-        if buildingObj is not None:
-            # 查找combo父节点
-            from .. import utils
-            comboObj = utils.getComboRoot(buildingObj)
-            if comboObj == None:
-                # 如果有combo，只显示/更新combo边框
-                fitBoundBox(buildingObj)
-            else:
-                # 如果没有combo，只显示/更新building边框
-                fitBoundBox(comboObj)
-        
+            fitBuildingBoundBox(args[0])
         return result
     return wrapper
 
+# 260501 从装饰器中提取，供分步营造的生成器在最后一步调用
+def fitBuildingBoundBox(buildingObj:bpy.types.Object):
+    """
+    更新单体建筑的边框，有combo时更新combo边框
+    """
+    # 查找combo父节点
+    comboObj = utils.getComboRoot(buildingObj)
+    if comboObj == None:
+        # 如果没有combo，只显示/更新building边框
+        fitBoundBox(buildingObj)
+    else:
+        # 如果有combo，只显示/更新combo边框
+        fitBoundBox(comboObj)
+    return
+
 # 计算合适的边框cube大小
 def fitBoundBox(boundObj:bpy.types.Object):
     """
@@ -0,0 +1,335 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 沿曲线平铺构件，代替Array、Curve、Mirror修改器
+# 260501 屋脊、排山勾滴原先复制构件后叠加Array(FIT_CURVE)、Curve、Mirror修改器，
+# 直到最后合并时才应用，期间每次依赖图更新都要重新计算这些修改器。
+# 现在直接在numpy中阵列构件，沿曲线变形后写入网格，镜像也用bmesh直接完成。
+# 曲线上各处的位置和朝向，由一个探针网格经Curve修改器求值一次得到，
+# 与修改器的半径、倾斜、包围盒等规则一致，变形结果按曲线签名缓存
+
+import hashlib
+from collections import OrderedDict
+
+import bmesh
+import bpy
+import numpy as np
+from mathutils import Matrix, Vector
+
+from .. import utils
+
+# 每个构件沿曲线的采样数
+STATIONS_PER_UNIT = 16
+# 沿曲线的最少采样数
+MIN_STATIONS = 64
+# 缓存的构件数量
+CACHE_SIZE = 32
+# 与Array修改器一致的浮点容差
+_EPSILON = 1e-6
+# 与Mirror修改器一致的裁剪容差
+_BISECT_DISTANCE = 0.001
+
+# 变形结果缓存 {签名: 顶点数组}
+_cache = OrderedDict()
+
+
+def clear_cache() -> None:
+    """清空变形结果缓存"""
+    _cache.clear()
+
+
+def _read_co(mesh: bpy.types.Mesh) -> np.ndarray:
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get('co', co)
+    return co.reshape(-1, 3)
+
+
+def _local_matrix(obj: bpy.types.Object) -> Matrix:
+    # matrix_basis直接由位置、旋转、缩放计算，不依赖场景刷新
+    return obj.matrix_parent_inverse @ obj.matrix_basis
+
+
+def relative_matrix(obj: bpy.types.Object,
+                    target: bpy.types.Object) -> Matrix:
+    """
+    对象局部坐标到目标对象局部坐标的变换
+    同一父对象下直接由位置、旋转、缩放计算，不必刷新场景
+
+    Args:
+        obj: 对象
+        target: 目标对象，如曲线、镜像对象
+
+    Returns:
+        Matrix: 4x4变换矩阵
+    """
+    if obj.parent == target:
+        return _local_matrix(obj)
+    if obj.parent == target.parent:
+        return _local_matrix(target).inverted() @ _local_matrix(obj)
+    utils.updateScene()
+    return target.matrix_world.inverted() @ obj.matrix_world
+
+
+def curve_signature(curve_obj: bpy.types.Object,
+                    precision: int = 6) -> str:
+    """
+    计算曲线数据的签名，包括控制点、半径、倾斜及影响曲线变形的设置
+    坐标按精度取整，避免浮点误差导致缓存失效
+    """
+    curve: bpy.types.Curve = curve_obj.data
+    digest = hashlib.sha1()
+    digest.update(repr((curve.twist_mode,
+                        curve.twist_smooth,
+                        curve.use_radius,
+                        curve.use_stretch,
+                        curve.use_deform_bounds,
+                        curve.resolution_u)).encode())
+    values = []
+    for spline in curve.splines:
+        digest.update(repr((spline.type,
+                            spline.order_u,
+                            spline.resolution_u,
+                            spline.use_endpoint_u,
+                            spline.use_bezier_u,
+                            spline.use_cyclic_u)).encode())
+        for point in spline.points:
+            values.extend(point.co)
+            values += [point.radius, point.tilt]
+        for point in spline.bezier_points:
+            values.extend(point.co)
+            values.extend(point.handle_left)
+            values.extend(point.handle_right)
+            values += [point.radius, point.tilt]
+    digest.update(np.round(np.array(values, dtype=np.float64),
+                           precision).tobytes())
+    return digest.hexdigest()
+
+
+def _fit_count(curve_obj: bpy.types.Object,
+               offset: np.ndarray,
+               count: int,
+               fit_length: float) -> int:
+    # 与Array修改器的FIT_CURVE、FIT_LENGTH一致：
+    # 首个构件的起点到最后一个构件的起点，不超过曲线长度
+    if count > 0:
+        return count
+    if fit_length > 0:
+        length = fit_length
+    else:
+        # 按曲线对象的缩放折算曲线长度
+        scale = (curve_obj.matrix_world.to_3x3()
+                 @ Vector((1.0, 1.0, 1.0)).normalized()).length
+        length = scale * curve_obj.data.splines[0].calc_length()
+    dist = np.linalg.norm(offset)
+    if dist <= _EPSILON:
+        return 1
+    return max(1, int((length + _EPSILON) / dist) + 1)
+
+
+def _probe_frames(curve_obj: bpy.types.Object,
+                  deform_axis: str,
+                  stations: np.ndarray):
+    # 探针网格：每个采样点三个顶点，即原点和Y、Z方向的单位偏移
+    # 探针与曲线坐标系重合，采样点覆盖构件的全部范围，
+    # 所以Curve修改器按包围盒计算的曲线位置与构件完全一致
+    co = np.zeros((len(stations), 3, 3), dtype=np.float64)
+    co[:, :, 0] = stations[:, None]
+    co[:, 1, 1] = 1.0
+    co[:, 2, 2] = 1.0
+    mesh = bpy.data.meshes.new('curve_probe')
+    mesh.vertices.add(len(stations) * 3)
+    mesh.vertices.foreach_set('co', co.astype(np.float32).ravel())
+    probe = bpy.data.objects.new('curve_probe', mesh)
+    bpy.context.collection.objects.link(probe)
+    probe.parent = curve_obj.parent
+    probe.matrix_parent_inverse = curve_obj.matrix_parent_inverse
+    probe.matrix_basis = curve_obj.matrix_basis
+    modCurve: bpy.types.CurveModifier = \
+        probe.modifiers.new('curve', 'CURVE')
+    modCurve.object = curve_obj
+    modCurve.deform_axis = deform_axis
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        probeEval = probe.evaluated_get(depsgraph)
+        frames = _read_co(probeEval.to_mesh()).reshape(-1, 3, 3)
+        probeEval.to_mesh_clear()
+    finally:
+        bpy.data.objects.remove(probe)
+        bpy.data.meshes.remove(mesh)
+    origin = frames[:, 0]
+    return origin, frames[:, 1] - origin, frames[:, 2] - origin
+
+
+def _deform(verts: np.ndarray,
+            stations: np.ndarray,
+            origin: np.ndarray,
+            axis_y: np.ndarray,
+            axis_z: np.ndarray) -> np.ndarray:
+    # 曲线变形在同一截面上是仿射的：位置 + y*Y轴 + z*Z轴
+    # 截面沿X方向在采样点之间线性插值
+    x = verts[:, 0]
+
+    def lerp(values):
+        return np.stack([np.interp(x, stations, values[:, axis])
+                         for axis in range(3)], axis=1)
+
+    return (lerp(origin)
+            + verts[:, 1:2] * lerp(axis_y)
+            + verts[:, 2:3] * lerp(axis_z))
+
+
+def _write_array(obj: bpy.types.Object,
+                 count: int,
+                 offset: np.ndarray,
+                 verts: np.ndarray) -> None:
+    # 以平移矩阵实例化得到阵列的拓扑，再写入变形后的顶点
+    mesh: bpy.types.Mesh = obj.data
+    matrices = np.tile(np.eye(4), (count, 1, 1))
+    matrices[:, :3, 3] = np.arange(count)[:, None] * offset
+    tempObj = utils.instanceMesh([(obj, matrices)], obj.name)
+    newMesh: bpy.types.Mesh = tempObj.data
+    newMesh.vertices.foreach_set('co', verts.astype(np.float32).ravel())
+
+    # 材质slot与原网格保持一致，setGlazeStyle按slot序号切换配色
+    faceMats = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', faceMats)
+    newMesh.materials.clear()
+    for mat in mesh.materials:
+        newMesh.materials.append(mat)
+    newMesh.polygons.foreach_set('material_index', np.tile(faceMats, count))
+    newMesh.update()
+
+    # 替换网格，保留原网格名称，setGlazeStyle按网格名称匹配资产
+    meshName = mesh.name
+    obj.data = newMesh
+    bpy.data.objects.remove(tempObj)
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+    newMesh.name = meshName
+
+
+def array_along_curve(obj: bpy.types.Object,
+                      curve_obj: bpy.types.Object,
+                      count: int = 0,
+                      fit_length: float = 0.0,
+                      relative_offset=(0.0, 0.0, 0.0),
+                      constant_offset=(0.0, 0.0, 0.0),
+                      deform_axis: str = 'POS_X') -> bpy.types.Object:
+    """
+    沿曲线平铺构件，等同于依次应用Array、Curve修改器，直接写入对象网格
+    相同的曲线、构件、位置和平铺参数，直接使用缓存的变形结果
+
+    使用示例:
+        from .tools import curve_array
+        curve_array.array_along_curve(
+            ridgeObj, ridgeCurve,
+            relative_offset=(1.001,0,0))
+
+    Args:
+        obj: 构件对象，网格须为单用户，且已按瓦片缩放应用了缩放
+        curve_obj: 曲线对象
+        count: 阵列数量，为0时按曲线长度或fit_length计算
+        fit_length: 阵列长度，为0时按曲线长度计算
+        relative_offset: 相对偏移，按构件包围盒尺寸的倍数
+        constant_offset: 固定偏移
+        deform_axis: 变形轴，与Curve修改器相同，如 'POS_X'、'NEG_X'
+
+    Returns:
+        bpy.types.Object: 构件对象
+    """
+    if len(obj.modifiers) > 0:
+        utils.applyAllModifer(obj)
+    co = _read_co(obj.data)
+    if len(co) == 0:
+        return obj
+
+    # 1、阵列间距，相对偏移按构件包围盒的尺寸折算
+    offset = (np.asarray(relative_offset, dtype=np.float64)
+              * np.ptp(co, axis=0)
+              + np.asarray(constant_offset, dtype=np.float64))
+    count = _fit_count(curve_obj, offset, count, fit_length)
+
+    # 2、沿曲线变形，构件已按瓦片缩放，顶点签名即包含了缩放
+    toCurve = np.array(relative_matrix(obj, curve_obj))
+    key = (curve_signature(curve_obj),
+           hashlib.sha1(np.round(co, 6).tobytes()).hexdigest(),
+           count,
+           tuple(np.round(offset, 6)),
+           deform_axis,
+           tuple(np.round(toCurve, 6).ravel()))
+    verts = _cache.get(key)
+    if verts is not None:
+        _cache.move_to_end(key)
+    else:
+        arrayed = (co[None, :, :]
+                   + np.arange(count)[:, None, None] * offset).reshape(-1, 3)
+        local = arrayed @ toCurve[:3, :3].T + toCurve[:3, 3]
+        stations = np.linspace(local[:, 0].min(), local[:, 0].max(),
+                               max(MIN_STATIONS, STATIONS_PER_UNIT * count))
+        origin, axisY, axisZ = _probe_frames(
+            curve_obj, deform_axis, stations)
+        deformed = _deform(local, stations, origin, axisY, axisZ)
+        fromCurve = np.linalg.inv(toCurve)
+        verts = deformed @ fromCurve[:3, :3].T + fromCurve[:3, 3]
+        verts.setflags(write=False)
+        _cache[key] = verts
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    # 3、写入网格
+    _write_array(obj, count, offset, verts)
+    return obj
+
+
+def mirror_mesh(obj: bpy.types.Object,
+                mirror_obj: bpy.types.Object,
+                use_axis=(False, False, False),
+                use_bisect=(False, False, False),
+                use_merge: bool = False,
+                merge_threshold: float = 0.0001) -> bpy.types.Object:
+    """
+    以镜像对象的坐标轴镜像网格，等同于应用utils.addModifierMirror添加的修改器
+    按X、Y、Z依次处理，裁剪时保留正方向的一侧
+
+    Args:
+        obj: 对象，网格须为单用户
+        mirror_obj: 镜像对象
+        use_axis: 镜像轴
+        use_bisect: 镜像前是否沿镜像面裁剪
+        use_merge: 是否合并镜像面上的顶点
+        merge_threshold: 合并距离
+
+    Returns:
+        bpy.types.Object: 对象
+    """
+    if not any(use_axis):
+        return obj
+    toMirror = relative_matrix(obj, mirror_obj)
+    bm = bmesh.new()
+    bm.from_mesh(obj.data)
+    bmesh.ops.transform(bm, matrix=toMirror, verts=bm.verts)
+    for axis, axisName in enumerate('XYZ'):
+        if not use_axis[axis]:
+            continue
+        if use_bisect[axis]:
+            normal = Vector((0.0, 0.0, 0.0))
+            normal[axis] = 1.0
+            bmesh.ops.bisect_plane(
+                bm,
+                geom=bm.verts[:] + bm.edges[:] + bm.faces[:],
+                dist=_BISECT_DISTANCE,
+                plane_co=(0.0, 0.0, 0.0),
+                plane_no=normal,
+                clear_inner=True)
+        bmesh.ops.mirror(
+            bm,
+            geom=bm.verts[:] + bm.edges[:] + bm.faces[:],
+            axis=axisName)
+        if use_merge:
+            seam = [v for v in bm.verts
+                    if abs(v.co[axis]) <= merge_threshold]
+            bmesh.ops.remove_doubles(bm, verts=seam, dist=merge_threshold)
+    bmesh.ops.transform(bm, matrix=toMirror.inverted(), verts=bm.verts)
+    bm.to_mesh(obj.data)
+    bm.free()
+    obj.data.update()
+    return obj
@@ -0,0 +1,330 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 属性依赖分析，生成属性与图层的依赖关系表 prop_layers.py
+# 260501 属性与图层的依赖关系原先手工登记，容易遗漏，
+# 如柱高依赖屋顶样式、斗栱，斗栱和瓦作依赖柱径，遗漏后分层重建会残留旧的构件。
+# 现在解析营造模块的源码，从各图层的营造函数出发，沿调用关系收集读取的属性名称，
+# 生成依赖关系表并随源码提交，修改营造模块后重新生成：
+#   python tools/prop_deps.py
+# 名称解析宁多勿少：同名函数都计入，所有属性访问都计入，最后按建筑属性列表过滤
+# 本模块不依赖bpy，可以在Blender之外单独测试
+
+import ast
+import os
+
+# 参与分析的营造模块，相对插件目录
+SCAN_MODULES = (
+    'buildFloor.py',
+    'buildPlatform.py',
+    'buildWall.py',
+    'buildDoor.py',
+    'buildBalcony.py',
+    'buildDougong.py',
+    'buildBeam.py',
+    'buildRoof.py',
+    'buildRooftile.py',
+    'buildOther/buildLoggia.py',
+    'buildOther/buildTerrace.py',
+    'utils.py',
+    'texture.py',
+    'template/template.py',
+)
+
+# 各图层的营造入口 {图层常量名: 入口函数}，按输出顺序排列
+LAYER_ENTRIES = (
+    ('LAYER_PLATFORM', ('buildPlatform.buildPlatform',)),
+    ('LAYER_PILLAR', ('buildFloor.buildPillars',)),
+    ('LAYER_WALL', ('buildWall.buildWallLayout',)),
+    ('LAYER_DOUGONG', ('buildDougong.buildDougong',)),
+    ('LAYER_BALCONY', ('buildBalcony.buildBalcony',)),
+    ('LAYER_BEAM', ('buildBeam.buildBeamFrame',)),
+    ('LAYER_RAFTER', ('buildRoof.__buildRafterFrame',)),
+    ('LAYER_TILE', ('buildRooftile.buildTile',)),
+)
+
+# 营造流程中直接读取的属性（如屋顶样式决定做梁架还是平坐），修改后整体重建
+FLOW_ENTRIES = (
+    'buildFloor.iterBuildFloor',
+    'buildRoof.iterBuildRoof',
+    'buildRoof.__checkRoofSettings',
+)
+
+# 图层跟随：装修层沿柱网排布，影响柱网的属性同时重建装修层
+LAYER_FOLLOW = {
+    'LAYER_WALL': ('LAYER_PILLAR',),
+}
+
+# 无法从源码推导的属性，手工登记，优先于推导结果，None表示整体重建
+_ROOF_LAYERS = ('LAYER_DOUGONG', 'LAYER_BALCONY', 'LAYER_BEAM',
+                'LAYER_RAFTER', 'LAYER_TILE')
+PROP_LAYERS_FIXED = {
+    # 图层显示
+    'is_showPlatform': ('LAYER_PLATFORM',),
+    'is_showPillars': ('LAYER_PILLAR',),
+    'is_showWalls': ('LAYER_WALL',),
+    'is_showDougong': ('LAYER_DOUGONG',),
+    'is_showBeam': ('LAYER_BEAM',),
+    'is_showRafter': ('LAYER_RAFTER',),
+    'is_showTiles': ('LAYER_TILE',),
+    'is_showBalcony': ('LAYER_BALCONY',),
+    # 台基高度影响所有图层的标高
+    'platform_height': None,
+    # 斗栱样式通过资产生效，营造时读取的是载入的斗栱资产
+    'dg_style': _ROOF_LAYERS,
+}
+
+# 建筑属性的定义
+DATA_MODULE = 'data.py'
+DATA_CLASS = 'ACA_data_obj'
+
+# 生成的依赖关系表
+OUTPUT_MODULE = 'tools/prop_layers.py'
+
+
+class _FunctionInfo:
+    """单个函数读取的名称和调用的函数"""
+
+    def __init__(self):
+        # 读取的属性名称
+        self.reads = set()
+        # 调用 [(模块别名或None, 函数名)]
+        self.calls = set()
+
+
+def _scan_function(node: ast.AST) -> _FunctionInfo:
+    info = _FunctionInfo()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Attribute):
+            if isinstance(child.ctx, ast.Load):
+                info.reads.add(child.attr)
+        elif isinstance(child, ast.Subscript):
+            # bData['xxx']
+            key = child.slice
+            if (isinstance(child.ctx, ast.Load)
+                    and isinstance(key, ast.Constant)
+                    and isinstance(key.value, str)):
+                info.reads.add(key.value)
+        elif isinstance(child, ast.Call):
+            func = child.func
+            if isinstance(func, ast.Name):
+                info.calls.add((None, func.id))
+                # getattr(bData,'xxx')
+                if (func.id == 'getattr' and len(child.args) > 1
+                        and isinstance(child.args[1], ast.Constant)
+                        and isinstance(child.args[1].value, str)):
+                    info.reads.add(child.args[1].value)
+            elif (isinstance(func, ast.Attribute)
+                    and isinstance(func.value, ast.Name)):
+                info.calls.add((func.value.id, func.attr))
+    return info
+
+
+def _parse(path: str) -> ast.Module:
+    with open(path, encoding='utf-8') as f:
+        return ast.parse(f.read(), filename=path)
+
+
+def _scan_module(path: str):
+    functions = {}
+    aliases = {}
+    for node in _parse(path).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions[node.name] = _scan_function(node)
+        elif isinstance(node, ast.ImportFrom):
+            # from . import texture as mat
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = alias.name
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                name = alias.name.split('.')[-1]
+                aliases[alias.asname or name] = name
+    return functions, aliases
+
+
+def scan_package(package_dir: str, module_paths=SCAN_MODULES) -> dict:
+    """
+    解析营造模块
+
+    Args:
+        package_dir: 插件目录
+        module_paths: 参与分析的模块，相对插件目录
+
+    Returns:
+        dict: {模块名: (函数表, 导入别名表)}
+    """
+    modules = {}
+    for module_path in module_paths:
+        name = os.path.splitext(os.path.basename(module_path))[0]
+        if name in modules:
+            # 按模块名解析调用关系，不能重名
+            raise ValueError("duplicate module name: %s" % module_path)
+        modules[name] = _scan_module(
+            os.path.join(package_dir, *module_path.split('/')))
+    return modules
+
+
+def _resolve(modules: dict, module: str, call) -> list:
+    alias, name = call
+    functions, aliases = modules[module]
+    if alias is None:
+        # 同一模块的函数，或以from ... import导入的函数
+        if name in functions:
+            return [(module, name)]
+        source = aliases.get(name)
+        return [(other, source) for other in modules
+                if source in modules[other][0]]
+    target = aliases.get(alias)
+    if target in modules and name in modules[target][0]:
+        return [(target, name)]
+    return []
+
+
+def collect_reads(modules: dict, entries, follow_calls: bool = True) -> set:
+    """
+    收集从入口函数出发读取的属性名称
+
+    使用示例:
+        from .tools import prop_deps
+        modules = prop_deps.scan_package(packageDir)
+        reads = prop_deps.collect_reads(
+            modules, ['buildFloor.buildPillars'])
+
+    Args:
+        modules: scan_package的结果
+        entries: 入口函数，如 'buildFloor.buildPillars'
+        follow_calls: 是否沿调用关系收集，否则只收集入口函数本身
+
+    Returns:
+        set: 读取的属性名称，包括非建筑属性，调用方自行过滤
+    """
+    reads = set()
+    pending = []
+    for entry in entries:
+        module, name = entry.split('.', 1)
+        if module not in modules or name not in modules[module][0]:
+            raise ValueError("unknown entry: %s" % entry)
+        pending.append((module, name))
+    visited = set(pending)
+    while pending:
+        module, name = pending.pop()
+        info = modules[module][0][name]
+        reads |= info.reads
+        if not follow_calls:
+            continue
+        for call in info.calls:
+            for target in _resolve(modules, module, call):
+                if target not in visited:
+                    visited.add(target)
+                    pending.append(target)
+    return reads
+
+
+def data_props(package_dir: str) -> list:
+    """
+    读取建筑属性的名称，即ACA_data_obj中声明的属性
+
+    Args:
+        package_dir: 插件目录
+
+    Returns:
+        list: 属性名称，按声明顺序
+    """
+    for node in _parse(os.path.join(package_dir, DATA_MODULE)).body:
+        if isinstance(node, ast.ClassDef) and node.name == DATA_CLASS:
+            return [item.target.id for item in node.body
+                    if isinstance(item, ast.AnnAssign)
+                    and isinstance(item.target, ast.Name)]
+    raise ValueError("%s not found in %s" % (DATA_CLASS, DATA_MODULE))
+
+
+def build_prop_layers(package_dir: str) -> dict:
+    """
+    推导属性与图层的依赖关系
+
+    Args:
+        package_dir: 插件目录
+
+    Returns:
+        dict: {属性: 图层常量名元组或None}，None表示整体重建，
+            未读取的属性不在其中，同样按整体重建处理
+    """
+    prop_names = set(data_props(package_dir))
+    modules = scan_package(package_dir)
+    layer_reads = {
+        layer: collect_reads(modules, entries) & prop_names
+        for layer, entries in LAYER_ENTRIES}
+    for layer, follow_layers in LAYER_FOLLOW.items():
+        for follow_layer in follow_layers:
+            layer_reads[layer] |= layer_reads[follow_layer]
+
+    prop_layers = {}
+    for layer, _entries in LAYER_ENTRIES:
+        for key in layer_reads[layer]:
+            prop_layers.setdefault(key, ())
+            prop_layers[key] += (layer,)
+    flow_reads = collect_reads(
+        modules, FLOW_ENTRIES, follow_calls=False) & prop_names
+    for key in flow_reads:
+        prop_layers[key] = None
+    prop_layers.update(PROP_LAYERS_FIXED)
+    return prop_layers
+
+
+def render_prop_layers(prop_layers: dict) -> str:
+    """
+    输出依赖关系表的源码
+
+    Args:
+        prop_layers: build_prop_layers的结果
+
+    Returns:
+        str: prop_layers.py的内容
+    """
+    lines = [
+        "# 作者：willimxp",
+        "# 所属插件：ACA Builder",
+        "# 功能概述：ACA Builder 属性与图层的依赖关系，用于分层重建和图层缓存",
+        "# 本文件由tools/prop_deps.py生成，请勿手工修改，修改营造模块后重新生成：",
+        "#   python tools/prop_deps.py",
+        "",
+        "from ..const import ACA_Consts as con",
+        "",
+        "# {属性: 图层元组}，None表示整体重建，未登记的属性同样整体重建",
+        "PROP_LAYERS = {",
+    ]
+    for key in sorted(prop_layers, key=str.lower):
+        layers = prop_layers[key]
+        if layers is None:
+            lines.append("    %r: None," % key)
+            continue
+        lines.append("    %r: (" % key)
+        for layer in layers:
+            lines.append("        con.%s," % layer)
+        lines.append("    ),")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def generate(package_dir: str) -> str:
+    """
+    生成依赖关系表的源码
+
+    使用示例:
+        source = prop_deps.generate(packageDir)
+
+    Args:
+        package_dir: 插件目录
+
+    Returns:
+        str: prop_layers.py的内容
+    """
+    return render_prop_layers(build_prop_layers(package_dir))
+
+
+if __name__ == '__main__':
+    _package_dir = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__)))
+    _output = os.path.join(_package_dir, *OUTPUT_MODULE.split('/'))
+    with open(_output, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(generate(_package_dir))
+    print(_output)
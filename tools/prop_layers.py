@@ -0,0 +1,397 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 属性与图层的依赖关系，用于分层重建和图层缓存
+# 本文件由tools/prop_deps.py生成，请勿手工修改，修改营造模块后重新生成：
+#   python tools/prop_deps.py
+
+from ..const import ACA_Consts as con
+
+# {属性: 图层元组}，None表示整体重建，未登记的属性同样整体重建
+PROP_LAYERS = {
+    'aca_type': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'chong': (
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'combo_location': None,
+    'combo_rotation': None,
+    'combo_type': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dg_extend': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dg_gap': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dg_height': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dg_scale': (
+        con.LAYER_DOUGONG,
+    ),
+    'dg_style': (
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dg_withbeam': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_BEAM,
+    ),
+    'DK': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'dk_scale': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_BALCONY,
+    ),
+    'geshan_list': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'is_showBalcony': (
+        con.LAYER_BALCONY,
+    ),
+    'is_showBeam': (
+        con.LAYER_BEAM,
+    ),
+    'is_showDougong': (
+        con.LAYER_DOUGONG,
+    ),
+    'is_showPillars': (
+        con.LAYER_PILLAR,
+    ),
+    'is_showPlatform': (
+        con.LAYER_PLATFORM,
+    ),
+    'is_showRafter': (
+        con.LAYER_RAFTER,
+    ),
+    'is_showTiles': (
+        con.LAYER_TILE,
+    ),
+    'is_showWalls': (
+        con.LAYER_WALL,
+    ),
+    'juzhe': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'juzhe_var': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'liangtou': (
+        con.LAYER_RAFTER,
+    ),
+    'luding_rafterspan': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'maindoor_list': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'paint_style': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'paoshou_count': (
+        con.LAYER_TILE,
+    ),
+    'pillar_diameter': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BEAM,
+        con.LAYER_TILE,
+    ),
+    'pillar_height': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'pillar_insert': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'pillar_net': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'platform_extend': (
+        con.LAYER_PLATFORM,
+    ),
+    'platform_height': None,
+    'qiqiao': (
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'rafter_count': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'railing_list': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'roof_height': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'roof_qiao_point': (
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'roof_style': None,
+    'shoushan': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'step_list': (
+        con.LAYER_PLATFORM,
+    ),
+    'tile_alt_color': (
+        con.LAYER_TILE,
+    ),
+    'tile_color': (
+        con.LAYER_TILE,
+    ),
+    'tile_length': (
+        con.LAYER_TILE,
+    ),
+    'tile_scale': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'tile_width': (
+        con.LAYER_TILE,
+    ),
+    'tile_width_real': (
+        con.LAYER_TILE,
+    ),
+    'tuishan': (
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'use_balcony_railing': (
+        con.LAYER_BALCONY,
+    ),
+    'use_dg': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'use_double_eave': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+    ),
+    'use_flyrafter': (
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'use_hallway': None,
+    'use_pie': (
+        con.LAYER_RAFTER,
+    ),
+    'use_pingbanfang': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'use_smallfang': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'use_terrace': (
+        con.LAYER_PLATFORM,
+    ),
+    'use_wangban': (
+        con.LAYER_RAFTER,
+    ),
+    'wall_list': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'window_list': (
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+    ),
+    'x_1': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'x_2': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'x_3': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'x_4': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'x_rooms': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'x_total': (
+        con.LAYER_PLATFORM,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'y_1': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'y_2': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'y_3': (
+        con.LAYER_PLATFORM,
+        con.LAYER_PILLAR,
+        con.LAYER_WALL,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+    'y_rooms': None,
+    'y_total': (
+        con.LAYER_PLATFORM,
+        con.LAYER_DOUGONG,
+        con.LAYER_BALCONY,
+        con.LAYER_BEAM,
+        con.LAYER_RAFTER,
+        con.LAYER_TILE,
+    ),
+}
@@ -0,0 +1,239 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 自动重建调度，合并连续的参数修改
+# 260501 拖动滑块时，每个中间值都会同步触发一次重建，界面卡顿
+# 现在参数修改只登记待重建的建筑和图层，等输入停止一段时间后，
+# 每个建筑只执行一次重建，期间更新的修改直接覆盖排队中的旧重建
+# 260501 可选先以草图模式快速预览，输入停止较长时间后再完整重建
+
+import time
+import bpy
+from bpy.app.handlers import persistent
+
+from .. import utils
+from ..locale.i18n import _
+
+# 待执行的重建 {(建筑名称, 重建项): (执行函数, 撤销提示)}
+# 重建项为None时表示整体重建，按登记顺序执行
+_jobs = {}
+# 已做草图预览、待完整重建的项，结构同_jobs
+_refines = {}
+# 最近一次参数修改的时间
+_last_change = 0.0
+# 定时器是否正在执行，执行中的重建引起的修改由本次定时器继续处理
+_in_timer = False
+
+
+class RebuildPrefsMixin:
+    """自动重建配置项混入类"""
+
+    rebuild_delay: bpy.props.FloatProperty(
+        default=0.3,
+        min=0.0, max=5.0,
+        step=10,
+        name=_("自动重建延迟(秒)"),
+        description=_("参数修改停止后等待的时间，期间的连续修改只重建一次，为0时立即重建"),
+    ) # type: ignore
+
+    use_draft_preview: bpy.props.BoolProperty(
+        default=True,
+        name=_("草图预览"),
+        description=_("调整参数时先快速生成草图：斗栱以包围盒代替，瓦面以整片壳体代替，不做倒角和UV，停止调整后再完整重建"),
+    ) # type: ignore
+
+    refine_delay: bpy.props.FloatProperty(
+        default=1.5,
+        min=0.1, max=30.0,
+        step=10,
+        name=_("完整重建延迟(秒)"),
+        description=_("草图预览后，参数修改停止多久再完整重建"),
+    ) # type: ignore
+
+    def draw_rebuild_prefs(self, layout):
+        """绘制自动重建配置UI"""
+        row = layout.row()
+        row.prop(self, 'rebuild_delay')
+        row = layout.row()
+        row.prop(self, 'use_draft_preview')
+        sub = row.row()
+        sub.enabled = self.use_draft_preview
+        sub.prop(self, 'refine_delay')
+
+
+def _get_prefs():
+    addonName = __package__.split('.')[0]
+    addon = bpy.context.preferences.addons.get(addonName)
+    if addon is None:
+        return None
+    return addon.preferences
+
+
+def _get_delay() -> float:
+    prefs = _get_prefs()
+    if prefs is None:
+        return 0.0
+    return prefs.rebuild_delay
+
+
+def request_rebuild(building_name: str,
+                    run,
+                    key=None,
+                    message: str = '') -> None:
+    """
+    登记一次重建，输入停止后执行
+    同一建筑的同一重建项只保留最新的一次，整体重建覆盖该建筑的各项局部重建
+    延迟为0或后台运行时，立即执行
+
+    使用示例:
+        from .tools import rebuild_scheduler
+        rebuild_scheduler.request_rebuild(
+            buildingObj.name,
+            partial(bpy.ops.aca.build_roof, buildingName=buildingObj.name),
+            key='roof',
+            message=_("生成屋顶"))
+
+    Args:
+        building_name: 建筑根节点名称
+        run: 无参数的执行函数，执行时自行按名称查找对象
+        key: 重建项，如图层、墙体名称，None表示整体重建
+        message: 撤销记录的提示，带UNDO标记的操作符以操作符名称记录
+    """
+    global _last_change
+    delay = _get_delay()
+    # 后台运行时没有事件循环，定时器不会触发
+    if delay <= 0 or bpy.app.background:
+        run()
+        return
+
+    # 新的修改覆盖待完整重建的同一项，完整重建随新的预览重新排队
+    _refines.pop((building_name, key), None)
+    if key is None:
+        # 整体重建已包含各项局部重建
+        for jobs in (_jobs, _refines):
+            for jobKey in [jobKey for jobKey in jobs
+                           if jobKey[0] == building_name]:
+                del jobs[jobKey]
+    elif (building_name, None) in _jobs:
+        # 已有排队的整体重建
+        return
+    was_idle = not _jobs
+    _jobs[(building_name, key)] = (run, message)
+    _last_change = time.perf_counter()
+
+    if bpy.app.timers.is_registered(_on_timer):
+        if not was_idle or _in_timer:
+            return
+        # 草图预览后，定时器按完整重建延迟等待，
+        # 新的修改须重新按重建延迟计时，否则下一次预览要等到完整重建时
+        bpy.app.timers.unregister(_on_timer)
+    bpy.app.timers.register(_on_timer, first_interval=delay)
+
+
+def _on_timer():
+    global _in_timer
+    _in_timer = True
+    try:
+        return _check_jobs()
+    finally:
+        _in_timer = False
+
+
+def _check_jobs():
+    # 260501 分步营造进行中，待其结束后再重建
+    from .. import build
+    if not build.isFinished:
+        return _get_delay() or 0.1
+    # 输入尚未停止，推迟到最后一次修改之后
+    if _jobs:
+        remaining = _last_change + _get_delay() - time.perf_counter()
+        if remaining > 0.01:
+            return remaining
+        prefs = _get_prefs()
+        if prefs is not None and prefs.use_draft_preview:
+            _run_jobs(_jobs, draft=True)
+        else:
+            _run_jobs(_jobs)
+    if _refines:
+        remaining = (_last_change + _get_prefs().refine_delay
+                     - time.perf_counter())
+        if remaining > 0.01:
+            return remaining
+        _run_jobs(_refines)
+    return None
+
+
+def _run_jobs(jobs: dict, draft: bool = False) -> None:
+    while jobs:
+        items = list(jobs.items())
+        jobs.clear()
+        for jobKey, (run, message) in items:
+            # 单个重建失败（如建筑已被删除）不影响其余排队的重建，
+            # 异常抛出定时器会被注销，排队的重建全部丢失
+            try:
+                if draft:
+                    with utils.draftMode():
+                        _execute(run, message)
+                    # 草图预览后，登记完整重建
+                    _refines[jobKey] = (run, message)
+                else:
+                    _execute(run, message)
+            except Exception as e:
+                utils.outputMsg(_("自动重建失败：%s") % str(e))
+
+
+def _execute(run, message: str) -> None:
+    # 定时器中执行的重建不在属性修改的撤销记录中，须记录撤销
+    # 带UNDO标记的操作符以undo=True执行，由操作符自行记录，不再重复记录
+    func = getattr(run, 'func', run)
+    if 'UNDO' in getattr(func, 'bl_options', ()):
+        func('EXEC_DEFAULT', True,
+             *getattr(run, 'args', ()), **getattr(run, 'keywords', {}))
+        return
+    run()
+    if message:
+        bpy.ops.ed.undo_push(message=message)
+
+
+def flush() -> None:
+    """立即以完整质量执行所有排队中的重建，包括草图预览后待完整重建的项"""
+    for jobKey in list(_refines):
+        if jobKey not in _jobs:
+            _jobs[jobKey] = _refines.pop(jobKey)
+    _refines.clear()
+    _run_jobs(_jobs)
+
+
+def cancel() -> None:
+    """丢弃所有排队中的重建"""
+    _jobs.clear()
+    _refines.clear()
+    if bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.unregister(_on_timer)
+
+
+# 撤销、重做、打开文件后，排队的重建已经过期
+@persistent
+def _on_reload(*args):
+    cancel()
+
+
+_HANDLERS = (
+    bpy.app.handlers.load_pre,
+    bpy.app.handlers.undo_pre,
+    bpy.app.handlers.redo_pre,
+)
+
+
+def register() -> None:
+    """注册撤销、重做、打开文件的回调"""
+    for handlers in _HANDLERS:
+        if _on_reload not in handlers:
+            handlers.append(_on_reload)
+
+
+def unregister() -> None:
+    """注销回调，并丢弃排队中的重建"""
+    for handlers in _HANDLERS:
+        if _on_reload in handlers:
+            handlers.remove(_on_reload)
+    cancel()
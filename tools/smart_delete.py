@@ -182,11 +182,10 @@ class ACA_OT_smart_delete(bpy.types.Operator):
             self._select_objects(classified['normal'])
         
         if classified['normal']:
-            try:
-                self._select_objects(classified['normal'])
-                result = bpy.ops.object.delete(use_global=False, confirm=False)
-            except RuntimeError:
-                pass
+            # 批量删除，对象及其独占的数据一次释放
+            utils.deleteObjects(
+                self._filter_valid_objs(classified['normal']))
+            result = {'FINISHED'}
         
         return result
 
@@ -0,0 +1,52 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：属性依赖分析的单元测试，不依赖bpy，可在Blender之外运行
+#   python -m pytest tools/test_prop_deps.py
+
+import difflib
+import importlib.util
+import os
+
+# 按文件路径载入，避免导入依赖bpy的插件包
+_spec = importlib.util.spec_from_file_location(
+    "prop_deps", os.path.join(os.path.dirname(__file__), "prop_deps.py"))
+prop_deps = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(prop_deps)
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_prop_layers_up_to_date():
+    # 营造模块修改后，须重新生成依赖关系表：python tools/prop_deps.py
+    path = os.path.join(PACKAGE_DIR, *prop_deps.OUTPUT_MODULE.split('/'))
+    with open(path, encoding='utf-8') as f:
+        current = f.read()
+    generated = prop_deps.generate(PACKAGE_DIR)
+    diff = ''.join(difflib.unified_diff(
+        current.splitlines(True), generated.splitlines(True),
+        'prop_layers.py', 'generated'))
+    assert not diff, diff
+
+
+def test_known_dependencies():
+    prop_layers = prop_deps.build_prop_layers(PACKAGE_DIR)
+    # 柱高随屋顶样式、斗栱变化
+    for key in ('use_dg', 'dg_height', 'dg_extend',
+                'dg_withbeam', 'use_pingbanfang'):
+        assert 'LAYER_PILLAR' in prop_layers[key], key
+        assert 'LAYER_WALL' in prop_layers[key], key
+    # 斗栱、瓦作随柱径变化
+    assert 'LAYER_DOUGONG' in prop_layers['pillar_diameter']
+    assert 'LAYER_TILE' in prop_layers['pillar_diameter']
+    # 营造流程直接读取的属性，整体重建
+    assert prop_layers['roof_style'] is None
+    # 瓦作颜色只影响瓦作层
+    assert prop_layers['tile_color'] == ('LAYER_TILE',)
+
+
+def test_entries_and_fixed_props_exist():
+    modules = prop_deps.scan_package(PACKAGE_DIR)
+    for _layer, entries in prop_deps.LAYER_ENTRIES:
+        prop_deps.collect_reads(modules, entries)
+    prop_names = set(prop_deps.data_props(PACKAGE_DIR))
+    assert set(prop_deps.PROP_LAYERS_FIXED) <= prop_names
@@ -0,0 +1,94 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：瓦面网格求解的单元测试，只依赖numpy，可在Blender之外运行
+#   python -m pytest tools/test_tile_grid.py
+
+import importlib.util
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# 按文件路径载入，避免导入依赖bpy的插件包
+_spec = importlib.util.spec_from_file_location(
+    "tile_grid", os.path.join(os.path.dirname(__file__), "tile_grid.py"))
+tile_grid = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(tile_grid)
+
+
+def _polyline(*points):
+    return np.array(points, dtype=np.float64)
+
+
+@pytest.mark.parametrize("order", [2, 3, 4, 6])
+def test_evaluate_nurbs_interpolates_endpoints(order):
+    points = _polyline((0, 0, 0), (1, 2, 0), (3, 2, 1), (4, 0, 2), (6, 1, 2))
+    polyline = tile_grid._evaluate_nurbs(points, order, resolution=8)
+    assert len(polyline) == (len(points) - 1) * 8 + 1
+    np.testing.assert_allclose(polyline[0], points[0], atol=1e-9)
+    np.testing.assert_allclose(polyline[-1], points[-1], atol=1e-9)
+
+
+def test_evaluate_nurbs_order2_is_polyline():
+    points = _polyline((0, 0, 0), (2, 0, 0), (2, 2, 0))
+    polyline = tile_grid._evaluate_nurbs(points, 2, resolution=4)
+    # 一阶曲线经过每个控制点
+    np.testing.assert_allclose(polyline[4], points[1], atol=1e-9)
+    np.testing.assert_allclose(polyline[2], (1, 0, 0), atol=1e-9)
+
+
+def test_resample_polyline_even_arc_length():
+    # 长度不等的两段：1 + 3
+    polyline = _polyline((0, 0, 0), (1, 0, 0), (1, 3, 0))
+    points = tile_grid.resample_polyline(polyline, 9)
+    assert points.shape == (9, 3)
+    np.testing.assert_allclose(points[0], polyline[0])
+    np.testing.assert_allclose(points[-1], polyline[-1])
+    # 拐角处的弦长小于弧长，只检查同一段内的点
+    np.testing.assert_allclose(points[:3, 0], (0.0, 0.5, 1.0))
+    np.testing.assert_allclose(points[2:, 1], np.arange(7) * 0.5)
+    np.testing.assert_allclose(points[2:, 0], 1.0)
+
+
+def test_solve_tile_grid_boundaries():
+    cols, rows = 5, 4
+    eave = _polyline((0, 0, 0), (4, 0, 0))
+    tile = _polyline((0, 0, 0), (0, 3, 1.5))
+    side = _polyline((4, 0, 0), (5, 3, 2))
+    grid = tile_grid.solve_tile_grid(tile, eave, side, cols, rows)
+    assert grid.shape == (rows * cols, 3)
+    grid = grid.reshape(rows, cols, 3)
+    # 第一行为檐口线，第一列为正身坡线，最后一列为翼角坡线
+    np.testing.assert_allclose(
+        grid[0], tile_grid.resample_polyline(eave, cols))
+    np.testing.assert_allclose(
+        grid[:, 0], tile_grid.resample_polyline(tile, rows))
+    np.testing.assert_allclose(
+        grid[:, -1], tile_grid.resample_polyline(side, rows))
+
+
+def test_grid_topology_order_and_winding():
+    cols, rows = 3, 3
+    loop_verts, face_starts, face_totals = tile_grid.grid_topology(cols, rows)
+    faces = loop_verts.reshape(-1, 4)
+    # 面按行排列，每个面的第一条边沿坡面向上
+    np.testing.assert_array_equal(faces, [
+        (0, 3, 4, 1),
+        (1, 4, 5, 2),
+        (3, 6, 7, 4),
+        (4, 7, 8, 5),
+    ])
+    np.testing.assert_array_equal(face_starts, (0, 4, 8, 12))
+    np.testing.assert_array_equal(face_totals, 4)
+
+    # 所有面的朝向一致
+    grid = tile_grid.solve_tile_grid(
+        _polyline((0, 0, 0), (0, 2, 1)),
+        _polyline((0, 0, 0), (2, 0, 0)),
+        _polyline((2, 0, 0), (2, 2, 1)),
+        cols, rows)
+    corners = grid[faces]
+    normals = np.cross(corners[:, 1] - corners[:, 0],
+                       corners[:, 3] - corners[:, 0])
+    assert np.all(normals @ normals[0] > 0)
@@ -0,0 +1,66 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：隔断构件缓存键的单元测试，须在启用了插件的Blender中运行
+#   blender -b --python-expr "import pytest; pytest.main(['tools/test_wall_fingerprint.py'])"
+
+import importlib
+import os
+import sys
+
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+
+def _find_addon():
+    # 插件以安装时的目录名注册，按文件路径查找
+    root = os.path.normcase(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if ('.' not in name and path
+                and os.path.normcase(os.path.dirname(path)) == root):
+            return name
+    pytest.skip("插件未启用")
+
+
+@pytest.fixture
+def addon():
+    name = _find_addon()
+    return (importlib.import_module(name + '.build'),
+            importlib.import_module(name + '.const').ACA_Consts)
+
+
+@pytest.fixture
+def wall_proxy(addon):
+    build, con = addon
+    buildingObj = bpy.data.objects.new('test_building', None)
+    bpy.context.scene.collection.objects.link(buildingObj)
+    buildingObj.ACA_data['aca_type'] = con.ACA_TYPE_BUILDING
+    wallProxy = bpy.data.objects.new('test_wallproxy', None)
+    bpy.context.scene.collection.objects.link(wallProxy)
+    wallProxy.parent = buildingObj
+    wallProxy.ACA_data['aca_type'] = con.ACA_WALLTYPE_GESHAN
+    wallProxy.ACA_data['wallID'] = con.ACA_WALLTYPE_GESHAN + '#test'
+    yield wallProxy
+    bpy.data.objects.remove(wallProxy)
+    bpy.data.objects.remove(buildingObj)
+
+
+def test_wall_fingerprint_follows_building_dk(addon, wall_proxy):
+    build, con = addon
+    bData = wall_proxy.parent.ACA_data
+    bData.DK = 0.08
+    key = build.getWallFingerprint(wall_proxy)
+    assert build.getWallFingerprint(wall_proxy) == key
+    # 斗口不同的建筑，不能复用彼此的门窗、栏杆
+    bData.DK = 0.096
+    assert build.getWallFingerprint(wall_proxy) != key
+
+
+def test_wall_fingerprint_follows_pillar_size(addon, wall_proxy):
+    build, con = addon
+    bData = wall_proxy.parent.ACA_data
+    key = build.getWallFingerprint(wall_proxy)
+    bData.pillar_diameter = bData.pillar_diameter + 0.1
+    assert build.getWallFingerprint(wall_proxy) != key
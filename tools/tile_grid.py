@@ -0,0 +1,262 @@
+# 作者：willimxp
+# 所属插件：ACA Builder
+# 功能概述：ACA Builder 瓦面网格求解，代替资产库中的TileGrid几何节点
+# 260501 原先每个坡面都要载入TileGrid资产、传入三条辅助线、应用几何节点，
+# 现在直接在numpy中求解：按弧长重采样檐口线、正身坡线、翼角坡线，
+# 以三条边界线插值出均匀的瓦面网格，并按曲线数据缓存结果
+# 本模块不依赖bpy，可以在Blender之外单独测试
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# 曲线求值的精度，每段控制点之间的采样数
+CURVE_RESOLUTION = 64
+# 缓存的瓦面网格数量
+CACHE_SIZE = 16
+
+# 瓦面网格缓存 {曲线签名: 顶点数组}
+_cache = OrderedDict()
+
+
+def clear_cache() -> None:
+    """清空瓦面网格缓存"""
+    _cache.clear()
+
+
+def nurbs_curve(points, order: int) -> dict:
+    """
+    构造NURBS曲线数据，与utils.addCurveByPoints一致（端点插值、权重为1）
+
+    Args:
+        points: (n,3) 控制点
+        order: 阶数，超过控制点数量时按控制点数量计
+
+    Returns:
+        dict: 曲线数据，供 evaluate_curve、build_tile_grid 使用
+    """
+    return {
+        'type': 'NURBS',
+        'points': np.asarray(points, dtype=np.float64).reshape(-1, 3),
+        'order': int(order),
+    }
+
+
+def bezier_curve(points, handles_left, handles_right) -> dict:
+    """
+    构造贝塞尔曲线数据
+
+    Args:
+        points: (n,3) 控制点
+        handles_left: (n,3) 左手柄
+        handles_right: (n,3) 右手柄
+
+    Returns:
+        dict: 曲线数据，供 evaluate_curve、build_tile_grid 使用
+    """
+    return {
+        'type': 'BEZIER',
+        'points': np.asarray(points, dtype=np.float64).reshape(-1, 3),
+        'handles_left': np.asarray(
+            handles_left, dtype=np.float64).reshape(-1, 3),
+        'handles_right': np.asarray(
+            handles_right, dtype=np.float64).reshape(-1, 3),
+    }
+
+
+def _clamped_knots(count: int, order: int) -> np.ndarray:
+    # 端点插值的均匀节点向量，两端各重复order次
+    inner = np.arange(1, count - order + 1, dtype=np.float64)
+    return np.concatenate((np.zeros(order), inner,
+                           np.full(order, count - order + 1.0)))
+
+
+def _evaluate_nurbs(points: np.ndarray, order: int,
+                    resolution: int) -> np.ndarray:
+    count = len(points)
+    order = max(2, min(order, count))
+    knots = _clamped_knots(count, order)
+    samples = (count - 1) * resolution + 1
+    # 最后一个节点区间为开区间，终点略向内收
+    u = np.linspace(knots[0], knots[-1], samples)
+    u[-1] = np.nextafter(knots[-1], knots[0])
+
+    # Cox-de Boor递推，一次计算所有采样点的基函数
+    basis = ((knots[:-1] <= u[:, None])
+             & (u[:, None] < knots[1:])).astype(np.float64)
+    for degree in range(1, order):
+        span = len(knots) - 1 - degree
+        left = knots[degree:degree + span] - knots[:span]
+        right = knots[degree + 1:degree + 1 + span] - knots[1:1 + span]
+        leftWeight = np.divide(u[:, None] - knots[:span], left,
+                               out=np.zeros((len(u), span)),
+                               where=left > 0)
+        rightWeight = np.divide(knots[degree + 1:degree + 1 + span]
+                                - u[:, None], right,
+                                out=np.zeros((len(u), span)),
+                                where=right > 0)
+        basis = (leftWeight * basis[:, :span]
+                 + rightWeight * basis[:, 1:1 + span])
+    return basis @ points
+
+
+def _evaluate_bezier(curve: dict, resolution: int) -> np.ndarray:
+    points = curve['points']
+    p0 = points[:-1]
+    p1 = curve['handles_right'][:-1]
+    p2 = curve['handles_left'][1:]
+    p3 = points[1:]
+    t = np.linspace(0.0, 1.0, resolution + 1)[:-1, None, None]
+    s = 1.0 - t
+    # (采样, 段, 3)，转为按段依次排列
+    segments = (s**3 * p0 + 3 * s**2 * t * p1
+                + 3 * s * t**2 * p2 + t**3 * p3)
+    polyline = segments.transpose(1, 0, 2).reshape(-1, 3)
+    return np.concatenate((polyline, points[-1:]))
+
+
+def evaluate_curve(curve: dict,
+                   resolution: int = CURVE_RESOLUTION) -> np.ndarray:
+    """
+    将曲线求值为折线
+
+    Args:
+        curve: nurbs_curve 或 bezier_curve 构造的曲线数据
+        resolution: 每段控制点之间的采样数
+
+    Returns:
+        np.ndarray: (m,3) 折线顶点
+    """
+    if curve['type'] == 'BEZIER':
+        return _evaluate_bezier(curve, resolution)
+    return _evaluate_nurbs(curve['points'], curve['order'], resolution)
+
+
+def resample_polyline(polyline, count: int) -> np.ndarray:
+    """
+    按弧长将折线均匀重采样，与几何节点的Resample Curve一致
+
+    Args:
+        polyline: (m,3) 折线顶点
+        count: 重采样的点数，包括首尾两点
+
+    Returns:
+        np.ndarray: (count,3) 重采样后的顶点
+    """
+    polyline = np.asarray(polyline, dtype=np.float64).reshape(-1, 3)
+    segment = np.linalg.norm(np.diff(polyline, axis=0), axis=1)
+    length = np.concatenate(([0.0], np.cumsum(segment)))
+    target = np.linspace(0.0, length[-1], count)
+    return np.stack([np.interp(target, length, polyline[:, axis])
+                     for axis in range(3)], axis=1)
+
+
+def solve_tile_grid(tile_polyline,
+                    eave_polyline,
+                    side_polyline,
+                    cols: int,
+                    rows: int) -> np.ndarray:
+    """
+    以三条边界线插值瓦面网格
+    檐口线为第一行，正身坡线为第一列，翼角坡线为最后一列，
+    中间各列的坡面形状，按所在檐口位置在正身与翼角之间线性过渡
+
+    Args:
+        tile_polyline: 正身坡线折线，起点在檐口线起点
+        eave_polyline: 檐口线折线
+        side_polyline: 翼角坡线折线，起点在檐口线终点
+        cols: 沿檐口的划线数
+        rows: 沿坡面的划线数
+
+    Returns:
+        np.ndarray: (rows*cols,3) 顶点，按行排列，每行沿檐口方向
+    """
+    tile = resample_polyline(tile_polyline, rows)
+    side = resample_polyline(side_polyline, rows)
+    eave = resample_polyline(eave_polyline, cols)
+    weight = np.linspace(0.0, 1.0, cols)[None, :, None]
+    grid = (eave[None, :, :]
+            + (1.0 - weight) * (tile - tile[0])[:, None, :]
+            + weight * (side - side[0])[:, None, :])
+    return grid.reshape(-1, 3)
+
+
+def grid_topology(cols: int, rows: int):
+    """
+    瓦面网格的面，与几何节点Grid相同的排列：
+    面按行排列，第一行为檐口；每个面的第一条边沿坡面向上
+
+    Returns:
+        tuple: (loop_verts, face_starts, face_totals)
+    """
+    row = np.arange(rows - 1)[:, None]
+    col = np.arange(cols - 1)[None, :]
+    vert = (row * cols + col).ravel()
+    loop_verts = np.stack((vert, vert + cols, vert + cols + 1, vert + 1),
+                          axis=1).ravel()
+    face_count = len(vert)
+    face_starts = np.arange(face_count) * 4
+    face_totals = np.full(face_count, 4)
+    return loop_verts, face_starts, face_totals
+
+
+def curve_signature(*curves, precision: int = 6) -> str:
+    """
+    计算曲线数据的签名，用作缓存键
+    坐标按精度取整，避免浮点误差导致缓存失效
+    """
+    digest = hashlib.sha1()
+    for curve in curves:
+        if isinstance(curve, dict):
+            digest.update(curve['type'].encode())
+            for key in ('points', 'handles_left', 'handles_right'):
+                if key in curve:
+                    digest.update(np.round(curve[key], precision).tobytes())
+            digest.update(str(curve.get('order')).encode())
+        else:
+            digest.update(repr(curve).encode())
+    return digest.hexdigest()
+
+
+def build_tile_grid(tile_curve: dict,
+                    eave_curve: dict,
+                    side_curve: dict,
+                    cols: int,
+                    rows: int) -> np.ndarray:
+    """
+    求解瓦面网格顶点，相同的曲线和划线数直接返回缓存结果
+
+    使用示例:
+        from .tools import tile_grid
+        verts = tile_grid.build_tile_grid(
+            tile_grid.nurbs_curve(tilePoints, 4),
+            tile_grid.bezier_curve(eavePoints, eaveLeft, eaveRight),
+            tile_grid.nurbs_curve(sidePoints, 4),
+            cols=GridCols, rows=tileRows)
+
+    Args:
+        tile_curve: 正身坡线
+        eave_curve: 檐口线
+        side_curve: 翼角坡线
+        cols: 沿檐口的划线数
+        rows: 沿坡面的划线数
+
+    Returns:
+        np.ndarray: (rows*cols,3) 顶点，调用方不应修改
+    """
+    key = curve_signature(tile_curve, eave_curve, side_curve, cols, rows)
+    verts = _cache.get(key)
+    if verts is not None:
+        _cache.move_to_end(key)
+        return verts
+
+    verts = solve_tile_grid(evaluate_curve(tile_curve),
+                            evaluate_curve(eave_curve),
+                            evaluate_curve(side_curve),
+                            cols, rows)
+    verts.setflags(write=False)
+    _cache[key] = verts
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return verts
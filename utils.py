@@ -13,8 +13,11 @@ import traceback
 from mathutils import Vector,Euler,Matrix,geometry
 import numpy as np
 from typing import List
+from contextlib import contextmanager
 from . import data
 from .const import ACA_Consts as con
+from .tools import aca_timer
+from .tools import aca_index
 
 # 获取console窗口的context
 # 以便在console_print中override
@@ -75,6 +78,10 @@ def popMessageBox(message = "", icon = 'INFO'):
     # 输出到debug console(同时记入日志)
     outputMsg(message)
 
+    # 260501 后台模式（blender -b）没有窗口，仅输出日志
+    if bpy.app.background:
+        return
+
     bpy.ops.aca.show_message_box('INVOKE_DEFAULT', 
         message=message, 
         icon=icon, 
@@ -247,7 +254,8 @@ def copySimplyObject(
     if dimensions != None:
         newObj.dimensions = dimensions
         # 缩放后需要更新数据，以便生效
-        updateScene()
+        # 260501 dimensions直接写入了scale，矩阵由后续读取时统一刷新
+        markSceneDirty()
     if parentObj != None:
         newObj.parent = parentObj
     showObj(newObj)
@@ -289,7 +297,8 @@ def copyObject(
     if dimensions != None:
         newObj.dimensions = dimensions
         # 缩放后需要更新数据，以便生效
-        updateScene()
+        # 260501 dimensions直接写入了scale，矩阵由后续读取时统一刷新
+        markSceneDirty()
     if parentObj != None:
         newObj.parent = parentObj
     # 复制子对象
@@ -442,14 +451,8 @@ def getAcaSibling(object:bpy.types.Object,
 def getAcaChild(object:bpy.types.Object,
                   acaObj_type:str) -> bpy.types.Object:
     # 260323 用栈stack来代替原来的递归，提高效率
-    stack = list(object.children)
-    while stack:
-        child = stack.pop()
-        child_aca_data = child.ACA_data
-        if child_aca_data.aca_type == acaObj_type:
-            return child
-        stack.extend(child.children)
-    return None
+    # 260501 改为查找场景索引，避免每次都遍历整棵对象树
+    return aca_index.find_child(object, acaObj_type)
 
 # 递归查找父节点，输入对象类型
 def getAcaParent(object:bpy.types.Object,
@@ -573,39 +576,61 @@ def focusObj(object:bpy.types.Object):
     object.select_set(True)
     return
 
+# 260501 批量删除对象
+# 对象、以及只被这些对象使用的mesh/curve数据，在一次batch_remove中释放
+# 材质等其他数据块先登记，由延迟清理统一释放
+# 返回删除的对象数量
+def deleteObjects(objList):
+    objs = {}
+    for obj in objList:
+        if obj is None: continue
+        try:
+            objs[obj.as_pointer()] = obj
+        except ReferenceError:
+            # 对象已被删除
+            continue
+    if not objs:
+        return 0
+    objs = list(objs.values())
+
+    # 统计各数据块被待删对象使用的次数
+    dataUses = {}
+    for obj in objs:
+        trackOrphan(obj)
+        data = obj.data
+        if data is None or data.library is not None:
+            continue
+        entry = dataUses.setdefault(data.as_pointer(), [data, 0])
+        entry[1] += 1
+
+    # 没有其他用户的数据块，随对象一并释放
+    blocks = list(objs)
+    for data, count in dataUses.values():
+        if data.users == count and not data.use_fake_user:
+            blocks.append(data)
+    bpy.data.batch_remove(blocks)
+
+    # 不在延迟清理的作用域中，立即释放登记的材质等数据块
+    if __purgeDepth == 0:
+        flushOrphans()
+    # 删除对象不影响其他对象的矩阵，标记待刷新即可
+    markSceneDirty()
+    return len(objs)
+
 # 删除树状层次下的所有对象
 def deleteHierarchy(parent_obj:bpy.types.Object,del_parent=False):
     #utils.outputMsg("deleting...")
     if parent_obj == None:
         # 没有可删除的对象
         return
-    # 260318 避免使用bpy.ops操作，提高效率
-    # bpy.ops.object.select_all(action='DESELECT')
-    objects = bpy.context.scene.objects
-    for obj in objects:
-        obj.select_set(False)
-    obj = bpy.data.objects[parent_obj.name]
-    obj.animation_data_clear()
-    names = set()
-    # Go over all the objects in the hierarchy like @zeffi suggested:
-    def get_child_names(obj):
-        for child in obj.children:
-            names.add(child.name)
-            if child.children:
-                get_child_names(child)
-    get_child_names(obj)
-    
+    parent_obj.animation_data_clear()
+    # 260501 children_recursive只遍历一次场景对象，
+    # 不再逐级访问children（每次都要遍历全部对象），也不再取消全场景的选择
+    objList = parent_obj.children_recursive
     # 是否删除根节点？
     if del_parent:
-        names.add(parent_obj.name)
-    objects = bpy.data.objects
-    if names:
-        for child_name in names:
-            bpy.data.objects.remove(objects[child_name])
-
-    delOrphan()
-    # 数据清理
-    updateScene()
+        objList.append(parent_obj)
+    deleteObjects(objList)
 
 # 删除树状层次下的所有对象
 def deleteByName(
@@ -616,34 +641,14 @@ def deleteByName(
     if parent_obj == None:
         # 没有可删除的对象
         return
-    # 260318 避免使用bpy.ops操作，提高效率
-    # bpy.ops.object.select_all(action='DESELECT')
-    objects = bpy.context.scene.objects
-    for obj in objects:
-        obj.select_set(False)
-    obj = bpy.data.objects[parent_obj.name]
-    obj.animation_data_clear()
-    names = set()
-    # Go over all the objects in the hierarchy like @zeffi suggested:
-    def get_child_names(obj):
-        for child in obj.children:
-            if child.name.startswith(name):
-                names.add(child.name)
-            if child.children:
-                get_child_names(child)
-    get_child_names(obj)
-    
+    parent_obj.animation_data_clear()
+    # 260501 同deleteHierarchy，批量删除
+    objList = [child for child in parent_obj.children_recursive
+               if child.name.startswith(name)]
     # 是否删除根节点？
     if del_parent:
-        names.add(parent_obj.name)
-    objects = bpy.data.objects
-    if names:
-        for child_name in names:
-            bpy.data.objects.remove(objects[child_name])
-
-    delOrphan()
-    # 数据清理
-    updateScene()
+        objList.append(parent_obj)
+    deleteObjects(objList)
 
 # 计算两个点之间距离
 # 使用blender提供的mathutils库中的Vector类
@@ -661,6 +666,34 @@ def alignToVector(vector) -> Vector:
     euler = quaternion.to_euler('XYZ')
     return euler
 
+# 260501 批量计算对齐向量的旋转，结果与alignToVector相同
+# 长边指向向量方向，不做x轴翻转，返回(n,3)的欧拉角数组
+def alignToVectors(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    length = np.linalg.norm(vectors, axis=1)
+    length[length == 0] = 1.0
+    eulers = np.zeros_like(vectors)
+    eulers[:, 1] = -np.arcsin(np.clip(vectors[:, 2] / length, -1.0, 1.0))
+    eulers[:, 2] = np.arctan2(vectors[:, 1], vectors[:, 0])
+    return eulers
+
+# 260501 将alignToVectors的欧拉角批量转换为(n,3,3)的旋转矩阵
+# 矩阵的第0列为长边方向，第2列为上方向
+def eulersToMatrices(eulers) -> np.ndarray:
+    eulers = np.asarray(eulers, dtype=np.float64).reshape(-1, 3)
+    sinY, cosY = np.sin(eulers[:, 1]), np.cos(eulers[:, 1])
+    sinZ, cosZ = np.sin(eulers[:, 2]), np.cos(eulers[:, 2])
+    matrices = np.zeros((len(eulers), 3, 3), dtype=np.float64)
+    matrices[:, 0, 0] = cosZ * cosY
+    matrices[:, 0, 1] = -sinZ
+    matrices[:, 0, 2] = cosZ * sinY
+    matrices[:, 1, 0] = sinZ * cosY
+    matrices[:, 1, 1] = cosZ
+    matrices[:, 1, 2] = sinZ * sinY
+    matrices[:, 2, 0] = -sinY
+    matrices[:, 2, 2] = cosY
+    return matrices
+
 # 添加一个empty对象
 def addEmpty(name=None,
             type='PLAIN_AXES',
@@ -956,17 +989,25 @@ def drawHexagon(dimensions:Vector,
 # https://projects.blender.org/blender/blender/pulls/145344
 # 经过测试，这个写法并不会导致Blender 5.1报错、或性能下降，所以暂不做修改
 def fastRun(func):
-    # 清理垃圾数据
-    delOrphan()
+    # 260501 开始计时会话，记录各阶段和热点函数的耗时
+    __beginRun(func.func.__name__)
+    try:
+        with __fastContext():
+            result = func()
+        # 260501 操作结束前，完成待刷新的场景修改
+        ensureSceneUpdated()
+        outputMsg(_("%s 执行成功-------------------------") % (func.func.__name__))
+    except Exception as e:
+        # 返回给上层调用
+        return __runFailed(e)
 
-    # 禁用细分
-    # 防止由于频繁调用evaluated_depsgraph_get导致的内存泄漏
-    # 比如，点击更新建筑7次以后，内存突然耗尽，导致blender失去响应，最终崩溃
-    # 经过反复的实验，启用simplify以后可以有效规避此问题，具体原因不详
-    bpy.context.scene.render.use_simplify = True
-    bpy.context.scene.render.simplify_subdivision = 0
-    # bpy.context.preferences.edit.use_global_undo = False
+    __endRun()
+    return result
 
+# 260501 fastRun的运行环境
+# 关闭viewlayer的刷新，并在结束时一次性释放登记的垃圾数据
+@contextmanager
+def __fastContext():
     # 关闭viewlayer的刷新
     from bpy.ops import _BPyOpsSubModOp
     view_layer_update = _BPyOpsSubModOp._view_layer_update
@@ -974,31 +1015,55 @@ def fastRun(func):
         pass
     try:
         _BPyOpsSubModOp._view_layer_update = dummy_view_layer_update
-        result = func()
-        outputMsg(_("%s 执行成功-------------------------") % (func.func.__name__))
-    except Exception as e:
-        # 输出到console
-        print(e)
+        # 260501 操作过程中不再反复清理垃圾数据，
+        # 在操作结束时一次性释放登记的数据块
+        with deferPurge():
+            yield
+    finally:
+        _BPyOpsSubModOp._view_layer_update = view_layer_update
 
-        # 输出到日志文件
-        logError(e)
+# 操作开始前的准备
+def __beginRun(name:str):
+    aca_timer.begin_session(name)
 
-        # 输入到前端弹窗
-        message = (_("插件在运行中发生了一个异常错误：|- “")
-                + str(e)
-                + _("”|请联系开发者，并提供日志文件"))
-        popMessageBox(message)
+    # 禁用细分
+    # 防止由于频繁调用evaluated_depsgraph_get导致的内存泄漏
+    # 比如，点击更新建筑7次以后，内存突然耗尽，导致blender失去响应，最终崩溃
+    # 经过反复的实验，启用simplify以后可以有效规避此问题，具体原因不详
+    bpy.context.scene.render.use_simplify = True
+    bpy.context.scene.render.simplify_subdivision = 0
+    # bpy.context.preferences.edit.use_global_undo = False
+    return
+
+# 操作异常时，提示用户并结束计时会话
+def __runFailed(e:Exception):
+    # 输出到console
+    print(e)
+
+    # 输出到日志文件
+    logError(e)
+
+    # 输入到前端弹窗
+    message = (_("插件在运行中发生了一个异常错误：|- “")
+            + str(e)
+            + _("”|请联系开发者，并提供日志文件"))
+    popMessageBox(message)
+
+    # 结束计时会话
+    aca_timer.end_session()
+    return {'CANCELLED':e}
+
+# 操作结束后的清理
+def __endRun():
+    # 260501 后处理单独计时
+    aca_timer.mark_stage('cleanup')
 
-        # 返回给上层调用
-        return {'CANCELLED':e}
-    finally:
-        _BPyOpsSubModOp._view_layer_update = view_layer_update
-    
     # 清理重复的材质
     cleanDupMat()
     
     # 再次清理数据
-    delOrphan()
+    # 260501 只释放登记的数据块（如被替换的重复材质），不做全量扫描
+    delOrphan(fullScan=False)
 
     # 回收内存
     import gc
@@ -1009,7 +1074,92 @@ def fastRun(func):
     bpy.context.scene.render.simplify_subdivision = 6
     # bpy.context.preferences.edit.use_global_undo = True
 
-    return result
+    # 260501 操作结束时刷新界面，并设置一次视角
+    if not bpy.app.background:
+        try:
+            redrawViewport()
+        except Exception:
+            pass
+
+    # 结束计时会话，输出耗时统计
+    aca_timer.end_session()
+    return
+
+# 260501 分步执行，供模态操作逐步推进营造
+# steps为生成器，如build.iterBuild()，每次推进一步（一个图层）
+# 步与步之间把控制权交还blender，界面可以刷新、响应Esc
+# 分步执行中不再由outputMsg强制重绘界面
+# 正在分步执行的操作名称，空字符串表示没有
+__stepping = ''
+
+# 开始分步执行
+def beginSteps(name:str):
+    global __stepping
+    __stepping = name
+    __beginRun(name)
+    return
+
+# 推进一步
+# 返回(是否结束, 结果)，结果与fastRun相同
+def runStep(steps):
+    global __stepping
+    try:
+        with __fastContext():
+            next(steps)
+        return False, None
+    except StopIteration as e:
+        name = __stepping
+        __stepping = ''
+        ensureSceneUpdated()
+        outputMsg(_("%s 执行成功-------------------------") % (name))
+        __endRun()
+        return True, e.value
+    except Exception as e:
+        __stepping = ''
+        steps.close()
+        return True, __runFailed(e)
+
+# 取消分步执行
+# 关闭生成器，执行其中的finally清理，由调用者负责回滚场景
+def cancelSteps(steps):
+    global __stepping
+    __stepping = ''
+    try:
+        with __fastContext():
+            steps.close()
+    finally:
+        __endRun()
+    return
+
+# 执行生成器的全部步骤，返回生成器的返回值
+# 用于同步调用分步的营造函数
+def runAllSteps(steps):
+    while True:
+        try:
+            next(steps)
+        except StopIteration as e:
+            return e.value
+
+# 260501 界面刷新的最小间隔（秒），即每秒最多刷新4次
+REDRAW_INTERVAL = 0.25
+# 上次界面刷新的时间
+__lastRedraw = 0.0
+
+# 260501 限频的界面刷新，供营造过程中的状态提示使用
+# 仅重绘窗口，不评估depsgraph、不设置视角，视角在操作结束时统一设置
+# 后台运行（blender -b）没有窗口，直接跳过
+def requestRedraw(force=False):
+    global __lastRedraw
+    if bpy.app.background or bpy.context.screen is None:
+        return
+    now = time.perf_counter()
+    if not force and now - __lastRedraw < REDRAW_INTERVAL:
+        return
+    __lastRedraw = now
+    # 窗口刷新显示
+    if bpy.context.scene.ACA_data.is_auto_redraw:
+        bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
+    return
 
 # 格式化输出内容
 def outputMsg(msg:str):
@@ -1029,21 +1179,34 @@ def outputMsg(msg:str):
     logger = logging.getLogger('ACA')
     logger.info(msg)
 
+    # 260501 后台运行时没有界面，不更新进度和刷新界面
+    if bpy.app.background:
+        return
+
     # 更新到build进度中
     from . import build
     build.buildStatus = msg
     # 更新进度条
-    if build.progress < 0.5:
+    # 260501 优先根据上次营造中各阶段的实际耗时推算
+    progress = aca_timer.get_progress()
+    if progress is not None:
+        build.progress = max(build.progress, progress)
+    elif build.progress < 0.5:
         build.progress += 0.05
     elif build.progress < 0.8:
         build.progress += 0.02
     else:
         build.progress += 0.01
     
+    # 260501 分步执行时，界面在步与步之间自行刷新
+    if __stepping:
+        return
+
     # 界面刷新
+    # 260501 限频刷新，不再每条提示都评估depsgraph、设置视角
     try:
         #console_print(strout)
-        redrawViewport()
+        requestRedraw()
         return 
     except Exception as e:
         # print(e)
@@ -1090,6 +1253,108 @@ def showHierarchy(obj:bpy.types.Object):
     for child in obj.children:
         showHierarchy(child)
             
+# 260501 低层次的圆柱体网格，不使用bpy.ops.mesh.primitive_cylinder_add
+# 避免operator的context和undo开销，椽、桁、柱等大量构件都经过这里
+# 用numpy直接生成顶点、面和UV，圆柱轴向为Z轴，
+# matrix为烘焙到顶点中的变换，用于横放圆柱、偏移origin等
+def __cylinderMesh(name:str,
+                   radius:float,
+                   depth:float,
+                   edge_num:int,
+                   matrix:Matrix=None):
+    n = edge_num
+    # 与primitive_cylinder_add相同，从+Y方向开始顺时针排列
+    phi = np.arange(n) * (2 * math.pi / n)
+    sinPhi = np.sin(phi)
+    cosPhi = np.cos(phi)
+
+    # 顶点：底面一圈，顶面一圈
+    verts = np.empty((2*n, 3), dtype=np.float64)
+    verts[:n, 0] = verts[n:, 0] = radius * sinPhi
+    verts[:n, 1] = verts[n:, 1] = radius * cosPhi
+    verts[:n, 2] = -depth/2
+    verts[n:, 2] = depth/2
+    if matrix is not None:
+        mat = np.array(matrix, dtype=np.float64)
+        verts = verts @ mat[:3, :3].T + mat[:3, 3]
+
+    loopVerts, faceStarts, faceTotals, uv = __cylinderTopology(n)
+    return __writeCylinderMesh(name, verts, loopVerts,
+                               faceStarts, faceTotals, uv)
+
+# 260501 圆柱体的面和UV，与顶点坐标无关，
+# 顶点顺序为底面一圈、顶面一圈，单个圆柱和批量圆柱共用
+def __cylinderTopology(n:int):
+    phi = np.arange(n) * (2 * math.pi / n)
+    sinPhi = np.sin(phi)
+    cosPhi = np.cos(phi)
+
+    # 面：n个侧面，顶面、底面各一个NGON，所有面朝外
+    i = np.arange(n)
+    j = (i + 1) % n
+    sideLoops = np.stack((i, i+n, j+n, j), axis=1).ravel()
+    loopVerts = np.concatenate((sideLoops, n + i[::-1], i))
+    faceStarts = np.concatenate((i * 4, (4*n, 5*n)))
+    faceTotals = np.concatenate((np.full(n, 4), (n, n)))
+
+    # UV：侧面展开在下半部，顶面、底面在上半部的左右两侧
+    u0 = i / n
+    u1 = (i + 1) / n
+    zeros = np.zeros(n)
+    halfs = np.full(n, 0.5)
+    sideUV = np.stack((u0, zeros, u0, halfs, u1, halfs, u1, zeros),
+                      axis=1).ravel()
+    topUV = np.stack((0.25 + 0.25 * sinPhi[::-1],
+                      0.75 + 0.25 * cosPhi[::-1]), axis=1).ravel()
+    bottomUV = np.stack((0.75 + 0.25 * sinPhi,
+                         0.75 + 0.25 * cosPhi), axis=1).ravel()
+    uv = np.concatenate((sideUV, topUV, bottomUV))
+    return loopVerts, faceStarts, faceTotals, uv
+
+# 260501 将顶点、面、UV一次写入新的mesh
+def __writeCylinderMesh(name:str,
+                        verts:np.ndarray,
+                        loopVerts:np.ndarray,
+                        faceStarts:np.ndarray,
+                        faceTotals:np.ndarray,
+                        uv:np.ndarray):
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set('co', verts.astype(np.float32).ravel())
+    mesh.loops.add(len(loopVerts))
+    mesh.loops.foreach_set('vertex_index', loopVerts.astype(np.int32))
+    mesh.polygons.add(len(faceStarts))
+    mesh.polygons.foreach_set('loop_start', faceStarts.astype(np.int32))
+    mesh.polygons.foreach_set('loop_total', faceTotals.astype(np.int32))
+    mesh.update(calc_edges=True)
+    uvLayer = mesh.uv_layers.new(name='UVMap')
+    uvLayer.data.foreach_set('uv', uv.astype(np.float32))
+    return mesh
+
+# 260501 将圆柱体网格放入场景
+def __addCylinderObject(mesh:bpy.types.Mesh,
+                        name:str,
+                        root_obj:bpy.types.Object,
+                        location,
+                        rotation):
+    cylinderObj = bpy.data.objects.new(name, mesh)
+    cylinderObj.location = location
+    cylinderObj.rotation_euler = rotation
+    cylinderObj.parent = root_obj
+    bpy.context.collection.objects.link(cylinderObj)
+    cylinderObj.ACA_data.aca_obj = True
+
+    # 侧面平滑、端面保持锐边，与shaderSmooth的按角度平滑效果相同
+    if bpy.app.version >= (4, 1, 0):
+        mesh.shade_smooth()
+        mesh.set_sharp_from_angle(angle=math.radians(30))
+    else:
+        shaderSmooth(cylinderObj)
+
+    # 强制聚焦，与原先primitive_cylinder_add返回context.object的行为一致
+    focusObj(cylinderObj)
+    return cylinderObj
+
 # 创建一个基本圆柱体，可用于柱等直立构件
 def addCylinder(radius=0.5,
                 depth=1,
@@ -1100,34 +1365,17 @@ def addCylinder(radius=0.5,
                 edge_num = 16,
                 origin_at_bottom = False):
     # 定义圆柱体圆周面上的面数，不宜太高造成面数负担，也不宜太低影响美观
-    bpy.ops.mesh.primitive_cylinder_add(
-                        vertices = edge_num, 
-                        radius = radius, 
-                        depth = depth,
-                        end_fill_type='NGON', 
-                        calc_uvs=True, 
-                        enter_editmode=False, 
-                        align='WORLD', 
-                        location=location, 
-                        rotation=rotation, 
-                        scale=(1,1,1)
-                    )
-    cylinderObj = bpy.context.object
-    cylinderObj.name = name
-    cylinderObj.data.name = name
-    cylinderObj.parent = root_obj
-    cylinderObj.ACA_data.aca_obj = True
-    shaderSmooth(cylinderObj)
-
+    location = Vector(location)
+    matrix = None
     # 将Origin置于底部
+    # 260501 直接偏移顶点，并相应移动对象位置，不再调用setOrigin
     if origin_at_bottom :
-        # bpy.ops.object.mode_set(mode = 'EDIT')
-        # bpy.ops.mesh.select_all(action = 'SELECT')
-        # bpy.ops.transform.translate(value=(0,0,depth/2))
-        # bpy.ops.object.mode_set(mode = 'OBJECT')    
-        setOrigin(cylinderObj,Vector((0,0,-depth/2)))
+        origin = Vector((0,0,-depth/2))
+        matrix = Matrix.Translation(-origin)
+        location = location + Euler(rotation).to_matrix() @ origin
 
-    return cylinderObj
+    mesh = __cylinderMesh(name, radius, depth, edge_num, matrix)
+    return __addCylinderObject(mesh, name, root_obj, location, rotation)
 
 # 创建一个水平放置的圆柱体，可用于桁、椽等构件
 def addCylinderHorizontal(radius,depth,name,root_obj,
@@ -1135,20 +1383,11 @@ def addCylinderHorizontal(radius,depth,name,root_obj,
                 rotation=(0,0,0),
                 edge_num=16):
     # 圆柱旋转到横向摆放（默认为相对World垂直摆放）
-    rotation_default = (0,math.radians(90),0)
-    cylinder = addCylinder(radius=radius,
-        depth=depth,
-        location=location,
-        rotation=rotation_default,
-        name=name,
-        root_obj=root_obj,
-        edge_num=edge_num
-    )
-    # apply rotation
-    applyTransform(cylinder,use_rotation=True)
+    # 260501 横放的旋转直接烘焙到顶点中，不再需要applyTransform
+    matrix = Euler((0,math.radians(90),0)).to_matrix().to_4x4()
+    mesh = __cylinderMesh(name, radius, depth, edge_num, matrix)
     # 旋转到实际角度
-    cylinder.rotation_euler = rotation
-    return cylinder
+    return __addCylinderObject(mesh, name, root_obj, location, rotation)
 
 # 根据起始点，创建连接的圆柱体
 # 注意，该圆柱体已经经过翻转，长度指向+X轴
@@ -1156,23 +1395,77 @@ def addCylinderBy2Points(radius:float,
                          start_point:Vector,
                          end_point:Vector,
                          name:str,
-                         root_obj:bpy.types.Object):
+                         root_obj:bpy.types.Object,
+                         edge_num=16):
     depth = getVectorDistance(start_point,end_point)
     location = (start_point+end_point)/2
     rotation = alignToVector(end_point-start_point)
     rotation.x = 0 # 避免x轴翻转
-    cylinder = addCylinderHorizontal(
-        radius=radius,
-        depth=depth,
-        location=location,
-        rotation=rotation,
-        name=name,
-        root_obj=root_obj
-    )
     # 设置origin到椽头，便于后续向外檐出
-    origin = locationTrans(start_point,root_obj,cylinder)
-    setOrigin(cylinder,origin)
-    return cylinder
+    # 260501 椽头在圆柱局部坐标中的位置，直接计算，
+    # 不再经过locationTrans、setOrigin两次刷新场景
+    origin = rotation.to_matrix().transposed() @ (start_point - location)
+    matrix = (Matrix.Translation(-origin)
+              @ Euler((0,math.radians(90),0)).to_matrix().to_4x4())
+    mesh = __cylinderMesh(name, radius, depth, edge_num, matrix)
+    return __addCylinderObject(mesh, name, root_obj,
+                               start_point.copy(), rotation)
+
+# 260501 批量创建连接起止点的圆柱体，如一组翼角椽
+# 在numpy中一次计算所有圆柱的顶点，写入同一个mesh，不产生逐根的对象
+# 每根圆柱与addCylinderBy2Points的结果相同，对象本身不做变换，
+# 可选按平面裁剪：平面法线正向一侧的部分（同addBisect的clear_outer）
+# 沿圆柱轴向收回到平面上，整根都在正向一侧的圆柱直接舍弃
+def addCylinderField(radius:float,
+                     start_points,
+                     end_points,
+                     name:str,
+                     root_obj:bpy.types.Object,
+                     edge_num=16,
+                     clip_co=None,
+                     clip_no=None):
+    starts = np.asarray(start_points, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(end_points, dtype=np.float64).reshape(-1, 3)
+    dirs = ends - starts
+    depth = np.linalg.norm(dirs, axis=1)
+    rotations = eulersToMatrices(alignToVectors(dirs))
+
+    # 局部坐标：长边沿+X，起点为原点，与addCylinderBy2Points的顶点一致
+    n = edge_num
+    phi = np.arange(n) * (2 * math.pi / n)
+    count = len(starts)
+    local = np.zeros((count, 2*n, 3), dtype=np.float64)
+    local[:, n:, 0] = depth[:, None]
+    local[:, :, 1] = np.tile(radius * np.cos(phi), 2)
+    local[:, :, 2] = np.tile(-radius * np.sin(phi), 2)
+    verts = (np.einsum('mij,mvj->mvi', rotations, local)
+             + starts[:, None, :])
+
+    if clip_co is not None:
+        clip_co = np.asarray(clip_co, dtype=np.float64)
+        clip_no = np.asarray(clip_no, dtype=np.float64)
+        clip_no = clip_no / np.linalg.norm(clip_no)
+        # 各顶点到裁剪面的距离，正值为需要裁掉的一侧
+        dist = (verts - clip_co) @ clip_no
+        # 轴向与法线的夹角，收回时沿轴向移动的比例
+        axisDot = rotations[:, :, 0] @ clip_no
+        axisDot = np.where(axisDot < 0, axisDot, np.nan)
+        shift = np.nan_to_num(np.clip(dist, 0, None) / axisDot[:, None])
+        verts = verts - rotations[:, None, :, 0] * shift[:, :, None]
+        verts = verts[~np.all(dist > 0, axis=1)]
+        count = len(verts)
+
+    # 各圆柱共用同一套面和UV，按顶点数偏移
+    loopVerts, faceStarts, faceTotals, uv = __cylinderTopology(n)
+    offsets = np.arange(count)[:, None]
+    faceStarts = (faceStarts[None, :] + offsets * len(loopVerts)).ravel()
+    loopVerts = (loopVerts[None, :] + offsets * 2*n).ravel()
+    faceTotals = np.tile(faceTotals, count)
+    uv = np.tile(uv, count)
+    mesh = __writeCylinderMesh(name, verts.reshape(-1, 3), loopVerts,
+                               faceStarts, faceTotals, uv)
+    return __addCylinderObject(mesh, name, root_obj,
+                               (0,0,0), (0,0,0))
 
 # 添加阵列修改器
 def addModifierArray(object:bpy.types.Object,
@@ -1213,6 +1506,28 @@ def addModifierMirror(object:bpy.types.Object,
     # 修改了阈值，兼顾合角吻和纵向围脊
     mod.merge_threshold = merge_threshold
 
+# 260501 草图模式，用于参数调整过程中的快速预览
+# 斗栱以包围盒代替，瓦面以整片壳体代替，不做倒角、不展UV
+# 草图模式的嵌套深度
+__draftDepth = 0
+
+# 是否处于草图模式
+def isDraftMode():
+    return __draftDepth > 0
+
+# 草图模式的作用域
+# 使用示例:
+#   with utils.draftMode():
+#       build.updateBuilding(buildingObj)
+@contextmanager
+def draftMode():
+    global __draftDepth
+    __draftDepth += 1
+    try:
+        yield
+    finally:
+        __draftDepth -= 1
+
 # 添加倒角修改器
 def addModifierBevel(object:bpy.types.Object,
                         width=0.1,
@@ -1229,6 +1544,9 @@ def addModifierBevel(object:bpy.types.Object,
     use_bevel = addon_prefs.use_bevel    
     if not use_bevel:
         return None
+    # 260501 草图模式不做倒角
+    if isDraftMode():
+        return None
     
     # 250613 倒角随斗口缩放
     buildingObj = getAcaParent(object,con.ACA_TYPE_BUILDING)
@@ -1493,24 +1811,50 @@ def setOrigin(object:bpy.types.Object,origin:Vector):
     # 再次正向移动，回归到原来位置
     object.matrix_world.translation = origin_world
 
+# 260501 合并场景刷新
+# 删除对象、刷新界面等操作并不需要立即读取矩阵，只标记场景待刷新，
+# 由下一个需要读取matrix_world、dimensions、评估网格的操作统一刷新
+# 场景是否有待刷新的修改
+__sceneDirty = False
+
+# 标记场景待刷新，不立即评估depsgraph
+def markSceneDirty():
+    global __sceneDirty
+    __sceneDirty = True
+    return
+
+# 场景有待刷新的修改时，才评估depsgraph
+def ensureSceneUpdated():
+    if __sceneDirty:
+        updateScene()
+    return
+
 # 场景数据刷新
 # 特别在fastrun阻塞过程中，bpy.ops等操作的数据无法及时更新，导致执行的错误
 # 这时可以手工刷新一次
 # 老中医，药到病除的办法
+@aca_timer.timed
 def updateScene():
+    global __sceneDirty
     # bpy.context.view_layer.update() 
     # 260225 view_layer.update更快(<1ms)，但是只能刷新视图中对象的位置和大小
     # depsgraph.update稍慢(1~10ms)，但可以及时获取matrix_world的变化
     dg = bpy.context.evaluated_depsgraph_get() 
     dg.update()
+    __sceneDirty = False
 
 # 刷新viewport，避免长时间卡死，并可见到建造过程
 def redrawViewport():
-    updateScene()
+    # 260501 outputMsg每次都会调用，不再每次评估depsgraph
+    # 窗口重绘时会自行评估，只在需要设置视角时刷新
+    markSceneDirty()
 
     # 设置窗口视角
     lockView = bpy.context.scene.ACA_data.is_auto_viewall
-    if lockView:
+    # 260501 后台模式（blender -b）没有窗口，跳过视角设置
+    if lockView and bpy.context.screen is not None:
+        # 视角需要准确的包围盒
+        ensureSceneUpdated()
         areas  = [area for area 
                   in bpy.context.screen.areas 
                   if area.type == 'VIEW_3D']
@@ -1573,8 +1917,98 @@ def redrawViewport():
     if do:
         bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
 
+# 260501 延迟清理垃圾数据
+# 原先每次删除、合并对象后都调用orphans_purge，全量扫描bpy.data，
+# 一次更新建筑会触发数十次全量清理
+# 现在由各删除函数登记被删对象的数据块，在顶层操作结束时一次性释放
+# 延迟清理的嵌套深度
+__purgeDepth = 0
+# 待检查的数据块 {(bpy.data中的集合名称, 数据块名称)}
+# 合并等操作会由blender直接释放对象，所以不保留数据块的引用，而是按名称查找
+__purgeCandidates = set()
+# 可登记的数据块类型
+__PURGE_TYPES = {
+    'OBJECT': 'objects',
+    'MESH': 'meshes',
+    'CURVE': 'curves',
+    'MATERIAL': 'materials',
+}
+
+# 登记可能成为孤儿的数据块：对象本身、及其mesh/curve数据和材质
+def trackOrphan(obj:bpy.types.Object):
+    try:
+        blocks = [obj]
+        data = obj.data
+        if data is not None:
+            blocks.append(data)
+            if hasattr(data, 'materials'):
+                blocks += [mat for mat in data.materials
+                           if mat is not None]
+        for block in blocks:
+            trackOrphanData(block)
+    except ReferenceError:
+        # 对象已被删除
+        pass
+    return
+
+# 登记可能成为孤儿的单个数据块
+def trackOrphanData(block:bpy.types.ID):
+    collName = __PURGE_TYPES.get(block.id_type)
+    if collName is not None and block.library is None:
+        __purgeCandidates.add((collName, block.name))
+    return
+
+# 释放登记的数据块中，已没有用户的部分
+# 释放对象会使其数据的用户减少，所以循环直到没有可释放的数据块
+@aca_timer.timed
+def flushOrphans():
+    global __purgeCandidates
+    candidates = __purgeCandidates
+    __purgeCandidates = set()
+    removed = 0
+    while candidates:
+        orphans = []
+        for key in list(candidates):
+            collName, name = key
+            block = getattr(bpy.data, collName).get(name)
+            if block is None:
+                # 数据块已被其他方式删除
+                candidates.discard(key)
+            elif block.users == 0:
+                orphans.append(block)
+                candidates.discard(key)
+        if not orphans:
+            break
+        bpy.data.batch_remove(orphans)
+        removed += len(orphans)
+    return removed
+
+# 延迟清理的作用域，作用域内的delOrphan不做清理
+# 最外层作用域结束时，一次性释放作用域内登记的数据块
+# 使用示例:
+#   with utils.deferPurge():
+#       build.build(...)
+@contextmanager
+def deferPurge():
+    global __purgeDepth
+    __purgeDepth += 1
+    try:
+        yield
+    finally:
+        __purgeDepth -= 1
+        if __purgeDepth == 0:
+            flushOrphans()
+
 # 删除所有无用数据，以免拖累性能
-def delOrphan():
+# 260501 在延迟清理的作用域内不做清理，由作用域结束时统一释放
+# fullScan为False时，只释放登记的数据块，不做全量扫描
+@aca_timer.timed
+def delOrphan(fullScan=True):
+    if __purgeDepth > 0:
+        return
+    flushOrphans()
+    if not fullScan:
+        return
     bpy.ops.outliner.orphans_purge(
                 do_local_ids=True, 
                 do_linked_ids=True, 
@@ -1783,20 +2217,17 @@ def getBezierSegment(curveObj,count,
         bez_points[1].co,
         count * accuracy)
     
+    # 260501 插值点的X坐标一次读入numpy，查找最接近的插值点不再逐点比较
+    pointsX = np.array([point[0] for point in tile_on_curveF])
     segments = []
     # X方向等分间距
     span = (bez_points[0].co[0] - bez_points[1].co[0]) /(count+1)
     for n in range(count):
         # 等分点的X坐标
         pX = bez_points[0].co[0] - span * (n+1)
-        # 在插值点中查找最接近的插值点
-        near1 = 99999 # 一个超大的值
-        for point in tile_on_curveF:
-            near = math.fabs(point[0] - pX)
-            if near < near1 :
-                nearPoint = point
-                near1 = near
-        segments.append(nearPoint)
+        # 在插值点中查找最接近的插值点，相同距离时取靠前的点
+        nearIndex = int(np.argmin(np.abs(pointsX - pX)))
+        segments.append(tile_on_curveF[nearIndex])
     
     # 是否在结果中包括曲线两头的端点？
     # 在通过檐口线计算椽头定位点时，不需要包括曲线端点
@@ -1920,6 +2351,7 @@ def setGN_Input(mod:bpy.types.NodesModifier,
 # 合并对个对象
 # https://blender.stackexchange.com/questions/13986/how-to-join-objects-with-python
 # https://docs.blender.org/api/current/bpy.ops.html#overriding-context
+@aca_timer.timed
 def joinObjects1(objList:List[bpy.types.Object],
                 newName=None,
                 baseObj=None,
@@ -1939,6 +2371,8 @@ def joinObjects1(objList:List[bpy.types.Object],
     # 2、选择需要转换的曲线或需要应用修改器的对象
     for ob in objList:
         if ob == None: continue
+        # 260501 转换和合并后，原有的曲线、网格数据成为孤儿，登记后延迟清理
+        trackOrphan(ob)
         if ob.type == 'CURVE':
             ob.select_set(True)
         if ob.modifiers:
@@ -1998,6 +2432,7 @@ def joinObjects1(objList:List[bpy.types.Object],
     return joinedObj
 
 # 低层次的合并方法
+@aca_timer.timed
 def joinObjects(objList: List[bpy.types.Object],
                            newName: str = None,
                            baseObj: bpy.types.Object = None,
@@ -2355,6 +2790,231 @@ def joinObjects(objList: List[bpy.types.Object],
     
     return baseObj
 
+# 260501 按变换矩阵批量实例化网格
+# 不再逐个复制对象后再joinObjects，
+# 直接在numpy中生成所有实例的顶点、边、环、面、UV和材质，写入同一个mesh
+def instanceMesh(instanceList:list,
+                 newName:str,
+                 parent:bpy.types.Object=None,
+                 materials:list=None,
+                 slotRemap:dict=None,
+                 ) -> bpy.types.Object:
+    '''
+    低层次的网格实例化函数，不产生任何中间对象
+    
+    参数:
+        instanceList: [(sourceObj, matrices), ...]
+            sourceObj: 源网格对象，直接使用其mesh数据（修改器需预先应用）
+            matrices: numpy数组(n,4,4)，每个实例在新对象坐标系中的变换矩阵
+        newName: 新对象的名称
+        parent: 父对象，新对象的坐标系与父对象重合
+        materials: 预设的材质列表，按此顺序排列slot，
+            以免部分源对象没有实例时，各slot的顺序发生变化
+        slotRemap: {源对象名称: slot查找表}，按源对象的slot切换材质，
+            如琉璃配色，不必修改源对象
+    
+    返回:
+        合并后的对象
+    '''
+    all_verts = []
+    all_edges = []
+    all_loop_verts = []
+    all_loop_edges = []
+    all_face_starts = []
+    all_face_totals = []
+    all_face_mats = []
+    all_sharp_faces = []
+    all_sharp_edges = []
+    
+    material_index_map = {}
+    material_slots = []
+    if materials is not None:
+        for mat in materials:
+            if mat is not None and mat.name not in material_index_map:
+                material_index_map[mat.name] = len(material_slots)
+                material_slots.append(mat)
+    
+    # 先收集所有UV层名称，缺失的UV层以(0,0)填充
+    uv_names = []
+    for sourceObj,matrices in instanceList:
+        if sourceObj is None or len(matrices) == 0: continue
+        for uv_layer in sourceObj.data.uv_layers:
+            if uv_layer.name not in uv_names:
+                uv_names.append(uv_layer.name)
+    uv_layer_data = {uv_name:[] for uv_name in uv_names}
+    
+    vert_offset = 0
+    loop_offset = 0
+    edge_offset = 0
+    
+    for sourceObj,matrices in instanceList:
+        if sourceObj is None or len(matrices) == 0:
+            continue
+        mesh = sourceObj.data
+        nVert = len(mesh.vertices)
+        nEdge = len(mesh.edges)
+        nLoop = len(mesh.loops)
+        nFace = len(mesh.polygons)
+        if nVert == 0:
+            continue
+        matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+        nInst = len(matrices)
+        instIndex = np.arange(nInst, dtype=np.int64)[:, None]
+
+        # 1、顶点：(n,V,3)，一次完成所有实例的变换
+        co = np.empty(nVert * 3, dtype=np.float64)
+        mesh.vertices.foreach_get('co', co)
+        co = co.reshape(-1, 3)
+        verts = (np.einsum('nij,vj->nvi', matrices[:, :3, :3], co)
+                 + matrices[:, None, :3, 3])
+        all_verts.append(verts.reshape(-1, 3))
+
+        # 2、边
+        if nEdge > 0:
+            edges = np.empty(nEdge * 2, dtype=np.int64)
+            mesh.edges.foreach_get('vertices', edges)
+            edges = (edges.reshape(1, -1, 2)
+                     + instIndex[:, :, None] * nVert + vert_offset)
+            all_edges.append(edges.reshape(-1, 2))
+            
+            sharp_edge_attr = mesh.attributes.get('sharp_edge')
+            sharp_edges = np.zeros(nEdge, dtype=bool)
+            if sharp_edge_attr is not None:
+                sharp_edge_attr.data.foreach_get('value', sharp_edges)
+            all_sharp_edges.append(np.tile(sharp_edges, nInst))
+
+        # 3、环与面
+        if nLoop > 0 and nFace > 0:
+            loop_verts = np.empty(nLoop, dtype=np.int64)
+            mesh.loops.foreach_get('vertex_index', loop_verts)
+            loop_edges = np.empty(nLoop, dtype=np.int64)
+            mesh.loops.foreach_get('edge_index', loop_edges)
+            face_starts = np.empty(nFace, dtype=np.int64)
+            face_totals = np.empty(nFace, dtype=np.int64)
+            mesh.polygons.foreach_get('loop_start', face_starts)
+            mesh.polygons.foreach_get('loop_total', face_totals)
+
+            # 镜像变换（行列式为负）的实例，需要翻转面内环序以纠正法线
+            # 翻转后第j个环的边，为原序中下一个环的边
+            start_rep = np.repeat(face_starts, face_totals)
+            total_rep = np.repeat(face_totals, face_totals)
+            pos = np.arange(nLoop) - start_rep
+            loop_flip = start_rep + total_rep - 1 - pos
+            loop_flip_next = start_rep + total_rep - 1 - (pos + 1) % total_rep
+            isFlip = np.linalg.det(matrices[:, :3, :3]) < 0
+            loop_order = np.where(isFlip[:, None],
+                                  loop_flip[None, :],
+                                  np.arange(nLoop)[None, :])
+            edge_order = np.where(isFlip[:, None],
+                                  loop_flip_next[None, :],
+                                  np.arange(nLoop)[None, :])
+
+            all_loop_verts.append(
+                (loop_verts[loop_order] + instIndex * nVert
+                 + vert_offset).reshape(-1))
+            all_loop_edges.append(
+                (loop_edges[edge_order] + instIndex * nEdge
+                 + edge_offset).reshape(-1))
+            all_face_starts.append(
+                (face_starts[None, :] + instIndex * nLoop
+                 + loop_offset).reshape(-1))
+            all_face_totals.append(np.tile(face_totals, nInst))
+
+            # 材质：按材质名称映射到新网格的slot
+            slot_map = np.arange(max(len(sourceObj.material_slots), 1))
+            for slot_index,slot in enumerate(sourceObj.material_slots):
+                mat = slot.material
+                if mat is None: continue
+                if mat.name not in material_index_map:
+                    material_index_map[mat.name] = len(material_slots)
+                    material_slots.append(mat)
+                slot_map[slot_index] = material_index_map[mat.name]
+            face_mats = np.empty(nFace, dtype=np.int64)
+            mesh.polygons.foreach_get('material_index', face_mats)
+            if slotRemap is not None and sourceObj.name in slotRemap:
+                lut = slotRemap[sourceObj.name]
+                inLut = face_mats < len(lut)
+                face_mats[inLut] = lut[face_mats[inLut]]
+            inRange = face_mats < len(slot_map)
+            face_mats[inRange] = slot_map[face_mats[inRange]]
+            all_face_mats.append(np.tile(face_mats, nInst))
+
+            sharp_face_attr = mesh.attributes.get('sharp_face')
+            sharp_faces = np.zeros(nFace, dtype=bool)
+            if sharp_face_attr is not None:
+                sharp_face_attr.data.foreach_get('value', sharp_faces)
+            all_sharp_faces.append(np.tile(sharp_faces, nInst))
+
+            # UV，与环序保持一致
+            source_uvs = {uv.name:uv for uv in mesh.uv_layers}
+            for uv_name in uv_names:
+                uv_coords = np.zeros(nLoop * 2, dtype=np.float32)
+                if uv_name in source_uvs:
+                    source_uvs[uv_name].data.foreach_get('uv', uv_coords)
+                uv_coords = uv_coords.reshape(-1, 2)
+                uv_layer_data[uv_name].append(
+                    uv_coords[loop_order].reshape(-1))
+
+        vert_offset += nVert * nInst
+        edge_offset += nEdge * nInst
+        loop_offset += nLoop * nInst
+
+    # 创建新网格
+    new_mesh = bpy.data.meshes.new(newName)
+    if all_verts:
+        merged_verts = np.concatenate(all_verts).astype(np.float32)
+        new_mesh.vertices.add(len(merged_verts))
+        new_mesh.vertices.foreach_set('co', merged_verts.reshape(-1))
+    if all_edges:
+        merged_edges = np.concatenate(all_edges).astype(np.int32)
+        new_mesh.edges.add(len(merged_edges))
+        new_mesh.edges.foreach_set('vertices', merged_edges.reshape(-1))
+    if all_loop_verts:
+        merged_loop_verts = np.concatenate(all_loop_verts).astype(np.int32)
+        new_mesh.loops.add(len(merged_loop_verts))
+        new_mesh.loops.foreach_set('vertex_index', merged_loop_verts)
+        new_mesh.loops.foreach_set('edge_index',
+            np.concatenate(all_loop_edges).astype(np.int32))
+    if all_face_starts:
+        merged_face_starts = np.concatenate(all_face_starts).astype(np.int32)
+        new_mesh.polygons.add(len(merged_face_starts))
+        new_mesh.polygons.foreach_set('loop_start', merged_face_starts)
+        new_mesh.polygons.foreach_set('loop_total',
+            np.concatenate(all_face_totals).astype(np.int32))
+        new_mesh.polygons.foreach_set('material_index',
+            np.concatenate(all_face_mats).astype(np.int32))
+
+        merged_sharp_faces = np.concatenate(all_sharp_faces)
+        if np.any(merged_sharp_faces):
+            sharp_face_attr = new_mesh.attributes.new(
+                'sharp_face', 'BOOLEAN', 'FACE')
+            sharp_face_attr.data.foreach_set('value', merged_sharp_faces)
+    if all_sharp_edges:
+        merged_sharp_edges = np.concatenate(all_sharp_edges)
+        if np.any(merged_sharp_edges):
+            sharp_edge_attr = new_mesh.attributes.new(
+                'sharp_edge', 'BOOLEAN', 'EDGE')
+            sharp_edge_attr.data.foreach_set('value', merged_sharp_edges)
+    
+    for mat in material_slots:
+        new_mesh.materials.append(mat)
+    
+    for uv_name,uv_arrays in uv_layer_data.items():
+        if not uv_arrays: continue
+        new_uv_layer = new_mesh.uv_layers.new(name=uv_name)
+        if new_uv_layer:
+            new_uv_layer.data.foreach_set('uv', np.concatenate(uv_arrays))
+    
+    new_mesh.update()
+
+    # 创建对象，与父对象坐标系重合
+    newObj = bpy.data.objects.new(newName, new_mesh)
+    bpy.context.collection.objects.link(newObj)
+    newObj.ACA_data.aca_obj = True
+    if parent is not None:
+        newObj.parent = parent
+    return newObj
+
 # 返回根对象
 def getRoot(object:bpy.types.Object):
     buildingObj = None
@@ -2418,7 +3078,8 @@ def hideLayer(buildingObj,name,isShow):
     # 恢复聚焦到根节点
     focusObj(buildingObj)
     # 立即刷新显示，否则可能因为需要刷新所有panel而有延迟感
-    redrawViewport()
+    # 260501 营造中也会调用，改为限频刷新
+    requestRedraw()
     return 
 
 # 删除对象的边
@@ -2580,7 +3241,8 @@ def subdivideObject(object:bpy.types.Object,level=1):
 
 # 封装对象删除
 def delObject(object:bpy.types.Object):
-    bpy.data.objects.remove(object)
+    # 260501 与批量删除共用，一并释放对象独占的数据
+    deleteObjects([object])
     return
 
 # 更换对象的父节点
@@ -2623,6 +3285,9 @@ def cleanDupMat():
         for slt in obj.material_slots:
             part = slt.name.rpartition('.')
             if part[2].isnumeric() and part[0] in mats:
+                # 260501 被替换的重复材质，登记后延迟清理
+                if slt.material is not None:
+                    trackOrphanData(slt.material)
                 slt.material = mats.get(part[0])
     return
 
@@ -2687,59 +3352,191 @@ def merge_points(points, threshold):
             merged_points.append(point)
     return merged_points
 
+# 260501 numpy批量读取一组对象的世界坐标顶点
+# 返回(n,3)的numpy数组，非网格对象忽略
+def getWorldVerts(objectList:List[bpy.types.Object]) -> np.ndarray:
+    # 刷新一次即可，不必每个顶点都刷新
+    updateScene()
+    chunks = []
+    for obj in objectList:
+        if obj.type != 'MESH': continue
+        mesh = obj.data
+        co = np.empty(len(mesh.vertices)*3, dtype=np.float64)
+        mesh.vertices.foreach_get('co', co)
+        matrix = np.array(obj.matrix_world)
+        chunks.append(co.reshape(-1,3) @ matrix[:3,:3].T + matrix[:3,3])
+    if not chunks:
+        return np.empty((0,3))
+    return np.concatenate(chunks)
+
+# 260501 投影面上的坐标系
+# 返回投影面的两个轴向(3,2)，法线为Z轴时即为世界坐标的X/Y轴
+def __getPlaneAxes(projectNormal:Vector) -> np.ndarray:
+    rotation = Vector((0,0,1)).rotation_difference(
+        projectNormal.normalized()).to_matrix()
+    return np.array(rotation)[:,:2]
+
+# 260501 按空间哈希合并距离相近的点
+# 落在同一个threshold网格中的点合并为其平均值，替代逐点比较的merge_points
+def mergePointsByGrid(points:np.ndarray,
+                      threshold=0.001) -> np.ndarray:
+    if len(points) == 0:
+        return points
+    keys = np.floor(points / threshold).astype(np.int64)
+    keys, inverse, counts = np.unique(
+        keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    merged = np.zeros((len(counts), points.shape[1]))
+    np.add.at(merged, inverse, points)
+    return merged / counts[:,None]
+
+# 260501 二维凸包，Andrew单调链算法，返回逆时针排列的轮廓点
+def __convexHull2D(points:np.ndarray) -> np.ndarray:
+    # 先剔除四个极值点围成的四边形内部的点，大幅减少参与循环的点
+    if len(points) > 64:
+        extremes = points[[
+            np.argmin(points[:,0]+points[:,1]),
+            np.argmax(points[:,0]-points[:,1]),
+            np.argmax(points[:,0]+points[:,1]),
+            np.argmin(points[:,0]-points[:,1]),
+        ]]
+        inside = np.ones(len(points), dtype=bool)
+        for i in range(4):
+            a = extremes[i]
+            b = extremes[(i+1)%4]
+            cross = ((b[0]-a[0])*(points[:,1]-a[1])
+                     - (b[1]-a[1])*(points[:,0]-a[0]))
+            inside &= cross > 0
+        points = points[~inside]
+
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+    def halfHull(sequence):
+        hull = []
+        for p in sequence:
+            while len(hull) >= 2:
+                o, a = hull[-2], hull[-1]
+                if ((a[0]-o[0])*(p[1]-o[1])
+                        - (a[1]-o[1])*(p[0]-o[0])) > 0:
+                    break
+                hull.pop()
+            hull.append(p)
+        return hull
+    lower = halfHull(points)
+    upper = halfHull(points[::-1])
+    return np.array(lower[:-1] + upper[:-1])
+
+# 260501 二维凹包，基于delaunay三角化的alpha shape
+# 去掉最长边大于maxEdge的三角形，取剩余三角形的最大外轮廓
+# 无法得到单一轮廓时返回None
+def __concaveHull2D(points:np.ndarray,
+                    maxEdge:float) -> np.ndarray:
+    coords = [Vector((p[0],p[1])) for p in points]
+    result = geometry.delaunay_2d_cdt(coords, [], [], 0, 1e-6)
+    verts = np.array([tuple(v) for v in result[0]])
+    tris = np.array([f for f in result[2] if len(f) == 3], dtype=np.int64)
+    if len(tris) == 0:
+        return None
+
+    # 按最长边筛选三角形
+    edgeLen = np.stack([
+        np.linalg.norm(verts[tris[:,i]] - verts[tris[:,(i+1)%3]], axis=1)
+        for i in range(3)], axis=1)
+    tris = tris[edgeLen.max(axis=1) <= maxEdge]
+    if len(tris) == 0:
+        return None
+
+    # 只属于一个三角形的边为轮廓边
+    edges = np.sort(np.concatenate(
+        [tris[:,[0,1]], tris[:,[1,2]], tris[:,[2,0]]]), axis=1)
+    edges, counts = np.unique(edges, axis=0, return_counts=True)
+    boundary = edges[counts == 1]
+
+    # 串联轮廓边，取面积最大的环
+    neighbors = {}
+    for a, b in boundary.tolist():
+        neighbors.setdefault(a, []).append(b)
+        neighbors.setdefault(b, []).append(a)
+    # 存在共点的多个环时，无法确定唯一的走向
+    if any(len(n) != 2 for n in neighbors.values()):
+        return None
+    visited = set()
+    bestLoop = None
+    bestArea = 0.0
+    for startIndex in neighbors:
+        if startIndex in visited: continue
+        loop = [startIndex]
+        visited.add(startIndex)
+        prev, current = startIndex, neighbors[startIndex][0]
+        while current != startIndex:
+            loop.append(current)
+            visited.add(current)
+            a, b = neighbors[current]
+            prev, current = current, (b if a == prev else a)
+        loopCo = verts[loop]
+        area = 0.5 * np.sum(loopCo[:,0]*np.roll(loopCo[:,1],-1)
+                            - np.roll(loopCo[:,0],-1)*loopCo[:,1])
+        if abs(area) > abs(bestArea):
+            bestLoop, bestArea = loopCo, area
+    # 统一为逆时针
+    if bestLoop is not None and bestArea < 0:
+        bestLoop = bestLoop[::-1]
+    return bestLoop
+
+# 260501 计算一组实体在平面上的投影轮廓
+# 供拼接、月台、剖视等需要建筑平面轮廓的场合复用
+# 返回投影面坐标系中逆时针排列的(n,2)轮廓点，原点为projectCenter，
+# 法线为Z轴时两轴即世界坐标的X/Y轴
+# concavity为凹包的最长边，None时返回凸包
+def getFootprint(objectList:List[bpy.types.Object],
+                 projectNormal = Vector((0,0,1)),
+                 projectCenter = Vector((0,0,0)),
+                 threshold = 0.001,
+                 concavity:float = None) -> np.ndarray:
+    verts = getWorldVerts(objectList)
+    if len(verts) == 0:
+        return np.empty((0,2))
+    # 一次矩阵运算投影到平面坐标系
+    axes = __getPlaneAxes(projectNormal)
+    points = (verts - np.array(projectCenter)) @ axes
+    # 点清理
+    points = mergePointsByGrid(points, threshold)
+    if len(points) < 3:
+        return points
+    if concavity is not None:
+        outline = __concaveHull2D(points, concavity)
+        if outline is not None:
+            return outline
+    return __convexHull2D(points)
+
 # 将一组实体投影到一个平面，并返回组合的轮廓
+# 260501 改为numpy批量投影、空间哈希合并，并以凸包/凹包代替极角排序
+# 极角排序只适用于星形轮廓，且原先的合并为O(n²)
 def unionProject(
         name = 'projectObj',
         projectNormal = Vector((0,0,1)),
         projectCenter = Vector((0,0,0)),
         objectList = [bpy.types.Object],
         insetThickness = 0,
+        concavity:float = None,
 ):
-    # 定义投影面Ax+By+Cz+D=0
-    A,B,C = projectNormal
-    # 常量为向量与原点做点积
-    D = -projectNormal.dot(projectCenter)
-    plane_coeffs = (A,B,C,D)
-
-    # 收集实体的坐标点
-    vertices = []
-    
-    for obj in objectList:
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-        for v in bm.verts:
-            # 复制点，避免bm.free后v失效
-            updateScene()
-            vWorld = obj.matrix_world @ v.co
-            vertices.append(vWorld.copy())
-        bm.free() 
-
-    # 投影到切面
-    vOnPlane = []
-    for v in vertices:
-        vNew = project_point_to_plane(
-            v,plane_coeffs)
-        v2D = ((vNew.x,vNew.y))
-        vOnPlane.append(v2D)
-
-    # 点清理
-    vMerged = merge_points(
-        points=vOnPlane,
-        threshold=0.001)
+    outline = getFootprint(objectList,
+                           projectNormal=projectNormal,
+                           projectCenter=projectCenter,
+                           concavity=concavity)
+    if len(outline) < 3:
+        return None
 
-    # 点排序
-    reference_point = (projectCenter.x,projectCenter.y)
-    vSorted = polar_angle_sort(vMerged,reference_point)
+    # 转换回投影面上的3D坐标
+    axes = __getPlaneAxes(projectNormal)
+    verts = outline @ axes.T + np.array(projectCenter)
 
     # 创建平面
     bm = bmesh.new()
-    # 3D坐标转换
-    verts3D = []
-    for v in vSorted:
-        v3D = bm.verts.new(Vector((v[0],v[1],0)))
-        verts3D.append(v3D)
+    verts3D = [bm.verts.new(Vector(v)) for v in verts.tolist()]
     # 创建面
-    face = bm.faces.new((verts3D[:]))
+    bm.faces.new(verts3D)
     # 创建内缩
     bm.normal_update()  # 试了很多次，发现必须做这一步，否则无法内缩
     if insetThickness != 0:
@@ -2759,8 +3556,7 @@ def unionProject(
     projectObj = bpy.data.objects.new(name, mesh)
     bpy.context.collection.objects.link(projectObj) 
 
-
-    return
+    return projectObj
 
 # 输出异常信息
 def logError(e):
@@ -3210,6 +4006,7 @@ def getBoundCenter(obj):
 
 # 应用集合中的所有对象的修改器
 # 以免再复制或导出时，因为丢失mirror的参考对象等异常情况
+@aca_timer.timed
 def applyCollModifier(buildingObj):
     ObjList = []
     def addChild(buildingObj):
@@ -3528,18 +4325,8 @@ def getObjByID(aca_id,
     if aca_id is None or aca_id=='':
         return None
     
-    obj = None
-    for obj in bpy.data.objects:
-        if not hasattr(obj,'ACA_data'):
-            continue
-
-        if obj.ACA_data.aca_type != aca_type:
-            continue
-        
-        if obj.ACA_data.aca_id == aca_id:
-            break
-    
-    return obj
+    # 260501 改为查找场景索引，不再遍历全部对象
+    return aca_index.find_by_id(aca_id, aca_type)
 
 def intersect_curve_mesh(curve_obj:bpy.types.Object,
                          mesh_obj:bpy.types.Object,
@@ -4215,6 +5002,7 @@ def curveToMesh_low(curveObj: bpy.types.Object):
         return None
 
 # 低层次应用修改器
+@aca_timer.timed
 def applyModifier_low(ob: bpy.types.Object):
     try:
         # 如果对象数据被其他对象引用，先复制
@@ -4264,6 +5052,8 @@ def delObjectsFast(objList: List[bpy.types.Object]):
 
     # 2. 把所有要删的对象丢进去（超快）
     for obj in objList:
+        # 260501 删除集合后对象成为孤儿，登记后延迟清理
+        trackOrphan(obj)
         # 从原集合移出
         if obj.users_collection:
             for coll in obj.users_collection: